@@ -1,40 +1,45 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Query, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Any
+from typing import Annotated, List, Any, Literal, Optional
 import pandas as pd
 import numpy as np
 import json
 from dotenv import load_dotenv
 import os
+import asyncio
+import threading
+import time
 import joblib
+from datetime import datetime, timezone
 
 load_dotenv()
 
-import psycopg2
-import psycopg2.extras
-
 # --------------------------------------
-# DATABASE CONNECTION
+# DATABASE (pooled, opened lazily on first query)
 # --------------------------------------
-conn = psycopg2.connect(
-    host=os.getenv("DB_HOST"),
-    database=os.getenv("DB_NAME"),
-    user=os.getenv("DB_USER"),
-    password=os.getenv("DB_PASSWORD")
-)
+import db
+from db import execute_query
+from write_behind import WriteBehindQueue, persist_records
+import metrics
+from metrics import STAGE_LATENCY, REQUEST_LATENCY, DECISIONS, ERRORS
 
-def execute_query(query, params=None):
-    with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-        cur.execute(query, params)
-        conn.commit()
-        return cur.fetchall() if cur.description else None
+# Optional write-behind mode: scored txns are queued and bulk-inserted in the background
+WRITE_BEHIND = os.getenv("WRITE_BEHIND", "0") == "1"
+PERSIST_QUEUE = WriteBehindQueue(
+    max_size=int(os.getenv("WRITE_BEHIND_MAX_QUEUE", "10000")),
+    flush_size=int(os.getenv("WRITE_BEHIND_FLUSH_SIZE", "500")),
+    flush_interval=float(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL", "0.5"))
+) if WRITE_BEHIND else None
 
 
 # --------------------------------------
 # IMPORT ML PIPELINE (for functions)
 # --------------------------------------
-import financial_transaction_fraud_detection as ml_pipeline
+import fraud_pipeline as ml_pipeline
 from fraud_rules import RuleEngine
+import scoring
+from scoring import decide
 
 MODEL_PATH = "model.pkl"
 SCALER_PATH = "scaler.pkl"
@@ -48,47 +53,125 @@ ISO_META_PATH = "iso_metadata.pkl"
 # Initialize Rule Engine
 RULE_ENGINE = RuleEngine()
 
+# SHAP explanation policy (EXPLAIN_MODE)
+from explanations import create_explanation_policy
+EXPLAIN_POLICY = create_explanation_policy()
+
+# Per-user velocity state (last txn time, rolling counts); warmed from the DB on a miss
+from user_state import create_user_state_store
+USER_STATE = create_user_state_store()
+
 
 # --------------------------------------
 # LOAD / TRAIN ARTIFACTS
 # --------------------------------------
+import model_bundle
+
+MODEL_BUNDLE_PATH = os.getenv("MODEL_BUNDLE_PATH", model_bundle.DEFAULT_BUNDLE_PATH)
+TRAIN_LOCK_PATH = os.getenv("TRAIN_LOCK_PATH", "artifacts.lock")
+
+# SHAP backend (explainer | pred_contribs); pred_contribs needs no TreeExplainer at all
+EXPLAIN_BACKEND = os.getenv("EXPLAIN_BACKEND", "explainer")
+
+
+def _load_bundle():
+    bundle = model_bundle.load_bundle(
+        MODEL_BUNDLE_PATH,
+        build_explainer=EXPLAIN_BACKEND != "pred_contribs"
+    )
+    print(f"Loaded model bundle {bundle['manifest']['model_version']}.")
+    return (
+        bundle["model"],
+        bundle["scaler"],
+        bundle["explainer"],
+        bundle["iso_model"],
+        bundle["iso_scaler"],
+        bundle["iso_meta"]
+    )
+
+
 def load_or_train_artifacts():
+    # Fast path: versioned bundle (native booster + manifest, no big pickles)
+    if model_bundle.bundle_exists(MODEL_BUNDLE_PATH):
+        return _load_bundle()
+
+    # Slow path under a host-wide lock: only one process may ever train
+    with model_bundle.artifact_lock(TRAIN_LOCK_PATH):
+        # Another worker may have finished while we waited for the lock
+        if model_bundle.bundle_exists(MODEL_BUNDLE_PATH):
+            return _load_bundle()
+        return _load_pickles_or_train()
+
+
+def _load_pickles_or_train():
     try:
         model = joblib.load(MODEL_PATH)
         scaler = joblib.load(SCALER_PATH)
-        explainer = joblib.load(EXPLAINER_PATH)
+        # Unpickling the TreeExplainer imports shap; pred_contribs doesn't need it
+        explainer = joblib.load(EXPLAINER_PATH) if EXPLAIN_BACKEND != "pred_contribs" else None
 
         iso_model = joblib.load(ISO_MODEL_PATH)
         iso_scaler = joblib.load(ISO_SCALER_PATH)
         iso_meta = joblib.load(ISO_META_PATH)
 
         print("Loaded existing model artifacts.")
-        return model, scaler, explainer, iso_model, iso_scaler, iso_meta
 
     except FileNotFoundError:
         print("Artifacts not found; training pipeline will run.")
-        model, scaler, explainer, _, iso_components = ml_pipeline.run_full_ml_pipeline()
+        artifacts = ml_pipeline.run_pipeline(ml_pipeline.create_pipeline_config(models=("xgb", "iso")))
+        model, scaler, explainer = artifacts.model, artifacts.scaler, artifacts.explainer
 
         joblib.dump(model, MODEL_PATH)
         joblib.dump(scaler, SCALER_PATH)
         joblib.dump(explainer, EXPLAINER_PATH)
 
-        return (
-            model,
-            scaler,
-            explainer,
-            iso_components["model"],
-            iso_components["scaler"],
-            {
-                "score_min": iso_components["score_min"],
-                "score_max": iso_components["score_max"],
-            }
-        )
+        iso_model = artifacts.iso["model"]
+        iso_scaler = artifacts.iso["scaler"]
+        iso_meta = artifacts.iso_meta
+
+    # Best effort: the next start loads the bundle instead
+    try:
+        manifest = model_bundle.save_bundle(MODEL_BUNDLE_PATH, model, scaler, iso_model, iso_scaler, iso_meta)
+        print(f"Wrote model bundle {manifest['model_version']} to {MODEL_BUNDLE_PATH}.")
+    except Exception as e:
+        print(f"Warning: could not write model bundle: {e}")
+
+    return model, scaler, explainer, iso_model, iso_scaler, iso_meta
 
 
 
 MODEL, SCALER, EXPLAINER, ISO_MODEL, ISO_SCALER, ISO_META = load_or_train_artifacts()
 
+# Components passed to compute_risk_score, with scaler vectors precomputed once
+COMPONENTS = scoring.build_components(MODEL, SCALER, ISO_MODEL, ISO_SCALER, ISO_META)
+
+# Part of the result-cache key, so a new model never serves old cached decisions
+MODEL_VERSION = (
+    model_bundle.read_manifest(MODEL_BUNDLE_PATH)["model_version"]
+    if model_bundle.bundle_exists(MODEL_BUNDLE_PATH) else "legacy"
+)
+
+# Live decision feed (SSE) for dashboards, fed straight from the scoring paths
+from decision_feed import create_decision_feed
+DECISION_FEED = create_decision_feed()
+
+# Rolling decision statistics for /stats, checkpointed to fraud.decision_stats
+import decision_stats
+from decision_stats import DecisionStats, create_stats_checkpointer
+DECISION_STATS = DecisionStats()
+STATS_CHECKPOINTER = create_stats_checkpointer(DECISION_STATS)
+
+# Idempotency / replay cache for /score_transaction (RESULT_CACHE=off|key|payload)
+from result_cache import IdempotencyConflict, create_result_cache, payload_hash
+RESULT_CACHE = create_result_cache()
+
+
+
+def set_inference_threads(n_threads):
+    """Caps XGBoost threads, e.g. cpu_count // workers when several workers share a host."""
+    MODEL.set_params(n_jobs=n_threads)
+    COMPONENTS["xgb"]["booster"].set_param({"nthread": n_threads})
+
 
 
 # --------------------------------------
@@ -147,191 +230,614 @@ class Transaction(BaseModel):
 # --------------------------------------
 # HELPER: GET LAST TRANSACTION TIME
 # --------------------------------------
+# The velocity rule compares a transaction's `Time` with the previous one's,
+# so user state holds transaction Time (not insert wall-clock), as in the
+# stream scorer, bulk re-scoring and the back-tester.
+LAST_TXN_QUERY = """
+    SELECT raw_payload FROM fraud.transactions_raw
+    WHERE user_id = %s
+    ORDER BY timestamp DESC
+    LIMIT 1
+"""
+
+def _payload_time(row):
+    payload = row['raw_payload']
+    payload = json.loads(payload) if isinstance(payload, str) else payload
+    return float(payload['Time']) if payload and payload.get('Time') is not None else None
+
+def _last_txn_time(res):
+    return _payload_time(res[0]) if res else None
+
 def get_user_last_txn_time(user_id):
-    """Fetches the timestamp of the last transaction for the user."""
-    res = execute_query("""
-        SELECT timestamp FROM fraud.transactions_raw
-        WHERE user_id = %s
+    """Fetches the Time of the user's last transaction."""
+    state = USER_STATE.get(user_id)
+    if state is None:
+        # Cache miss: one indexed lookup, then the user is served from memory
+        state = USER_STATE.seed(user_id, _last_txn_time(execute_query(LAST_TXN_QUERY, (user_id,))))
+    return state.last_txn_time
+
+async def aget_user_last_txn_time(user_id):
+    """Async variant of get_user_last_txn_time, runs the DB lookup on the DB executor."""
+    state = USER_STATE.get(user_id)
+    if state is None:
+        state = USER_STATE.seed(user_id, _last_txn_time(await db.aexecute_query(LAST_TXN_QUERY, (user_id,))))
+    return state.last_txn_time
+
+def warm_user_state(limit=10000):
+    """Preloads the last transaction time of the most recently active users."""
+    rows = execute_query("""
+        SELECT user_id, raw_payload FROM (
+            SELECT DISTINCT ON (user_id) user_id, raw_payload, timestamp
+            FROM fraud.transactions_raw
+            ORDER BY user_id, timestamp DESC
+        ) last_txn
         ORDER BY timestamp DESC
-        LIMIT 1
-    """, (user_id,))
-    
-    if res and res[0]['timestamp']:
-        return res[0]['timestamp'].timestamp() # Return as float timestamp
-    return None
+        LIMIT %s
+    """, (limit,)) or []
+    for row in rows:
+        last_txn_time = _payload_time(row)
+        if last_txn_time is not None:
+            USER_STATE.seed(row["user_id"], last_txn_time)
+    print(f"Warmed user state for {len(rows)} users.")
+
+
+# --------------------------------------
+# HELPER: MODEL INFERENCE
+# --------------------------------------
+def explain_batch(X, top_k=5):
+    """SHAP top-k per row, from the pickled TreeExplainer or XGBoost's pred_contribs."""
+    if EXPLAIN_BACKEND == "pred_contribs":
+        return ml_pipeline.contrib_explain_batch(COMPONENTS, X, top_k=top_k)
+    return ml_pipeline.shap_explain_batch(scaler=SCALER, explainer=EXPLAINER, X=X, top_k=top_k)
+
+
+def score_models(X, endpoint):
+    """
+    Both ML channels for an (n, 30) matrix, one vectorized call each. The
+    `ml` stage times the pair; `iso` and `xgb` time each model on its own.
+    """
+    buf = ml_pipeline.new_feature_buffer(len(X))
+    buf[:] = X
+    with STAGE_LATENCY.time(endpoint=endpoint, stage="ml"):
+        # IsolationForest reads the raw buffer; XGBoost then scales it in place
+        with STAGE_LATENCY.time(endpoint=endpoint, stage="iso"):
+            iso = ml_pipeline.score_feature_buffer(buf, {"iso": COMPONENTS["iso"]}, {"iso": 1.0})["iso"]
+        with STAGE_LATENCY.time(endpoint=endpoint, stage="xgb"):
+            xgb = ml_pipeline.score_feature_buffer(buf, {"xgb": COMPONENTS["xgb"]}, {"xgb": 1.0})["xgb"]
+    return {"xgb": xgb, "iso": iso}
+
+
+def run_models_batch(datas, explain=True):
+    """
+    CPU-bound part of scoring (ML channels, optionally SHAP) for a list of
+    transaction dicts, one vectorized call per model. Runs off the event loop.
+    """
+    X = np.array([[d[c] for c in ml_pipeline.FEATURE_COLUMNS] for d in datas], dtype=np.float64)
+    ml_scores = score_models(X, "score_transaction")
+
+    # SHAP explanation (only when the policy explains everything up front)
+    if explain:
+        with STAGE_LATENCY.time(endpoint="score_transaction", stage="shap"):
+            explanations = explain_batch(X)
+    else:
+        explanations = [None] * len(datas)
+
+    return [
+        ({"xgb": float(ml_scores["xgb"][i]), "iso": float(ml_scores["iso"][i])}, explanations[i])
+        for i in range(len(datas))
+    ]
+
+
+def run_models(data, explain=True):
+    return run_models_batch([data], explain)[0]
+
+
+# Optional request coalescing: concurrent /score_transaction calls share one model call
+from batcher import MicroBatcher
+
+MODEL_BATCHER = MicroBatcher(
+    lambda datas: run_models_batch(datas, EXPLAIN_POLICY.mode == "always"),
+    max_batch_size=int(os.getenv("BATCH_MAX_SIZE", "64")),
+    max_wait_ms=float(os.getenv("BATCH_MAX_WAIT_MS", "2"))
+) if os.getenv("BATCH_COALESCE", "0") == "1" else None
+
+
+async def timed(coro, endpoint, stage):
+    """Awaits `coro` and records its duration as one pipeline stage."""
+    start = time.perf_counter()
+    try:
+        return await coro
+    finally:
+        STAGE_LATENCY.observe(time.perf_counter() - start, endpoint=endpoint, stage=stage)
+
+
+# --------------------------------------
+# HELPER: PERSISTENCE
+# --------------------------------------
+def feed_event(txn_id, user_id, data, risk_score, decision, rule_details):
+    """What /decisions/stream subscribers receive for one scored transaction."""
+    return {
+        "txn_id": txn_id,
+        "user_id": user_id,
+        "amount": data["Amount"],
+        "risk_score": risk_score,
+        "decision": decision,
+        "rule_details": rule_details,
+        "decision_time": datetime.now(timezone.utc).isoformat()
+    }
+
+def make_record(txn_id, user_id, data, risk_score, decision):
+    """One row each for transactions_raw, ml_scores and decisions (see persist_records)."""
+    return {
+        "txn_id": txn_id,
+        "user_id": user_id,
+        "device_id": "device_demo",
+        "ip": "127.0.0.1",
+        "amount": data["Amount"],
+        "timestamp": datetime.now(timezone.utc),
+        "raw_payload": json.dumps(data),
+        "risk_score": risk_score,
+        "decision": decision,
+        "reason": "XGBoost-based scoring"
+    }
+
+async def apersist(records):
+    """Queues records in write-behind mode, otherwise writes them in one transaction."""
+    if PERSIST_QUEUE is not None:
+        await PERSIST_QUEUE.aput_many(records)
+    else:
+        await db.run_in_db_executor(persist_records, records)
+
+def persist(records):
+    if PERSIST_QUEUE is not None:
+        for record in records:
+            PERSIST_QUEUE.put(record)
+    else:
+        persist_records(records)
+
 
 # --------------------------------------
 # SCORE TRANSACTION
 # --------------------------------------
 @app.post("/score_transaction")
-def score_transaction(transaction: Transaction):
+async def score_transaction(
+    transaction: Transaction,
+    idempotency_key: Annotated[Optional[str], Header()] = None
+):
+    data = transaction.model_dump()
+
+    # Gateway retries / replays: return the stored decision, no inference and no inserts
+    cache_key = RESULT_CACHE.key_for(
+        data, idempotency_key, MODEL_VERSION, RULE_ENGINE.version
+    ) if RESULT_CACHE is not None else None
+    if cache_key is None:
+        return await _score_transaction(data)
+
+    # A reused Idempotency-Key must carry the payload it was first used with
     try:
-        # Convert input → DataFrame
-        data = transaction.model_dump()
-        df = pd.DataFrame([data])
-
-        # Enforce correct column order
-        cols = ['Time'] + [f'V{i}' for i in range(1, 29)] + ['Amount']
-        df = df[cols]
-
-        # Components passed to compute_risk_score
-        components = {
-            "xgb": {"model": MODEL, "scaler": SCALER},
-            "iso": {"model": ISO_MODEL , "scaler": ISO_SCALER, "score_min" : ISO_META["score_min"]
-            , "score_max": ISO_META["score_max"]},
-            "graph": {},
-            "reputation": {},
-            "rules": {}
-        }
+        response, cached = await RESULT_CACHE.aget_or_compute(
+            cache_key, lambda: _score_transaction(data), payload_hash(data)
+        )
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return {**response, "cached": True} if cached else response
 
-        # Compute unified risk score
-        
-        # 1. Get history for Rules
-        # In a real app, user_id would come from the request. 
-        # Hardcoding 'user_demo' as per existing insert logic for now.
-        user_id = "user_demo" 
-        last_txn_time = get_user_last_txn_time(user_id)
 
-        # 2. Evaluate Rules (Dynamic)
-        rule_score, rule_details = RULE_ENGINE.evaluate(data, last_txn_time)
+async def _score_transaction(data):
+    started = time.perf_counter()
+    try:
+        # In a real app, user_id would come from the request.
+        # Hardcoding 'user_demo' as per existing insert logic for now.
+        user_id = "user_demo"
 
-        # 3. ML Models
-        ml_score = ml_pipeline.compute_risk_score(
-            transaction_df=df,
-             components=components,
-            weights={"xgb": 1.0, "iso": 1.0}  # TEMP, see Change 2
+        # 1. History lookup (DB) and ML models + SHAP (CPU) run concurrently
+        loop = asyncio.get_running_loop()
+        if MODEL_BATCHER is not None:
+            models_call = MODEL_BATCHER.submit(data)
+        else:
+            models_call = loop.run_in_executor(None, run_models, data, EXPLAIN_POLICY.mode == "always")
+        last_txn_time, (ml_score, explanation) = await asyncio.gather(
+            timed(aget_user_last_txn_time(user_id), "score_transaction", "history"),
+            models_call
         )
 
+        # 2. Evaluate Rules (Dynamic)
+        with STAGE_LATENCY.time(endpoint="score_transaction", stage="rules"):
+            rule_score, rule_details = RULE_ENGINE.evaluate(data, last_txn_time)
+        metrics.record_rule_hits(rule_details)
+
         xgb_score = float(ml_score["xgb"])
         iso_score = float(ml_score["iso"])
 
-        
-        # 4. Combine Scores (Simple Weighted Avg for now)
-        # You can tune this blend. 
-        # ML is powerful, but Rules are precise constraints.
-        final_risk = (
-            0.6 * xgb_score +
-            0.2 * iso_score +
-            0.2 * rule_score
-        )
-
-       
-        
-        # Clip to [0, 1]
-        risk_score = min(max(final_risk, 0.0), 1.0)
-
-        # SHAP explanation
-        explanation = ml_pipeline.shap_explain_transaction(
-            model=MODEL,
-            scaler=SCALER,
-            explainer=EXPLAINER,
-            transaction_df=df,
-            top_k=5
-        )
+        # 3. Combine Scores (weighted blend clipped to [0, 1], see scoring.BLEND_WEIGHTS)
+        risk_score = float(scoring.blend_risk(xgb_score, iso_score, rule_score))
 
         # Generate transaction ID
         from uuid import uuid4
         txn_id = f"txn_{uuid4().hex}"
 
-        # Insert into raw table
-        execute_query("""
-            INSERT INTO fraud.transactions_raw
-            (txn_id, user_id, device_id, ip, amount, timestamp, raw_payload)
-            VALUES (%s, %s, %s, %s, %s, NOW(), %s)
-        """, (
-            txn_id,
-            "user_demo",
-            "device_demo",
-            "127.0.0.1",
-            data["Amount"],
-            json.dumps(data)
-        ))
-
-        # Insert ML scores
-        execute_query("""
-            INSERT INTO fraud.ml_scores
-            (txn_id, xgb_score, iso_score, combined_risk)
-            VALUES (%s, %s, %s, %s)
-        """, (
-            txn_id,
-            risk_score,
-            None,
-            risk_score
-        ))
-
-        # Decision logic
-        if risk_score > 0.8:
-            decision = "BLOCK"
-        elif risk_score > 0.6:
-            decision = "REVIEW"
-        else:
-            decision = "ALLOW"
-
-        # Insert decision
-        execute_query("""
-            INSERT INTO fraud.decisions
-            (txn_id, final_risk, decision, reason)
-            VALUES (%s, %s, %s, %s)
-        """, (
-            txn_id,
-            risk_score,
-            decision,
-            "XGBoost-based scoring"
-        ))
+        decision = decide(risk_score)
+        DECISIONS.inc(decision=decision)
+        USER_STATE.record(user_id, data["Time"], data["Amount"])
+
+        # SHAP per explanation policy (skipped for unread ALLOWs, or computed later)
+        explanation_status = "ready"
+        if explanation is None:
+            action = EXPLAIN_POLICY.action(decision)
+            if action == "now":
+                explanation = (await timed(
+                    loop.run_in_executor(None, explain_batch, [data]), "score_transaction", "shap"
+                ))[0]
+            else:
+                explanation = []
+                explanation_status = "skipped"
+                # A full deferred queue leaves the txn "skipped"
+                if action == "defer" and EXPLAIN_POLICY.deferred.submit([txn_id], explain_batch, [data]):
+                    explanation_status = "pending"
+
+        # 4. Persist raw txn, ML scores and decision (one transaction, or queued)
+        await timed(
+            apersist([make_record(txn_id, user_id, data, risk_score, decision)]),
+            "score_transaction", "persist"
+        )
+
+        DECISION_STATS.record(decision, risk_score, data["Amount"], rule_details)
+        DECISION_FEED.publish([feed_event(txn_id, user_id, data, risk_score, decision, rule_details)])
 
+        REQUEST_LATENCY.observe(time.perf_counter() - started, endpoint="score_transaction")
         return {
             "txn_id": txn_id,
             "risk_score": risk_score,
             "decision": decision,
-            #"txn_id": txn_id,
-            #"risk_score": risk_score,
-           # "decision": decision,
             "explanation": explanation,
+            "explanation_status": explanation_status,
             "rule_details": rule_details
         }
 
     except Exception as e:
         import traceback
         traceback.print_exc()
+        ERRORS.inc(endpoint="score_transaction", error=type(e).__name__)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# --------------------------------------
+# SCORE TRANSACTIONS (BATCH)
+# --------------------------------------
+@app.post("/score_transactions")
+def score_transactions(transactions: List[Transaction]):
+    """
+    Scores a micro-batch of transactions with one model call per stage.
+    Results are returned in the same order as the input list. The batch is
+    treated as one user's transactions in order: the first row's velocity
+    check uses the stored last transaction time, every later row the Time of
+    the row before it (rule_backtest.last_txn_times).
+    """
+    if not transactions:
+        return []
+
+    started = time.perf_counter()
+    try:
+        rows = [t.model_dump() for t in transactions]
+        X = np.array([[row[c] for c in ml_pipeline.FEATURE_COLUMNS] for row in rows], dtype=np.float64)
+
+        # 1. Rules, vectorized (history is looked up once per batch, then chained row to row)
+        user_id = "user_demo"
+        with STAGE_LATENCY.time(endpoint="score_transactions", stage="history"):
+            stored_last = get_user_last_txn_time(user_id)
+        last_txn_time = rule_backtest.last_txn_times(X[:, 0])
+        last_txn_time[0] = np.nan if stored_last is None else stored_last
+        with STAGE_LATENCY.time(endpoint="score_transactions", stage="rules"):
+            rule_scores, rule_flags = RULE_ENGINE.evaluate_many(X, last_txn_time)
+        metrics.record_rule_hits(rule_flags, len(rows))
+
+        # 2. ML Models (one vectorized call each)
+        ml_scores = score_models(X, "score_transactions")
+
+        # 3. Same blend as /score_transaction
+        risk_scores = scoring.blend_risk(ml_scores["xgb"], ml_scores["iso"], rule_scores)
+
+        from uuid import uuid4
+        txn_ids = [f"txn_{uuid4().hex}" for _ in rows]
+        decisions = [decide(float(r)) for r in risk_scores]
+        for decision in decisions:
+            DECISIONS.inc(decision=decision)
+        for row in rows:
+            USER_STATE.record(user_id, row["Time"], row["Amount"])
+
+        # 4. SHAP once for every row the explanation policy wants now
+        actions = [EXPLAIN_POLICY.action(decision) for decision in decisions]
+        explanations = [[] for _ in rows]
+        statuses = ["skipped"] * len(rows)
+
+        now_idx = [i for i, a in enumerate(actions) if a == "now"]
+        if now_idx:
+            with STAGE_LATENCY.time(endpoint="score_transactions", stage="shap"):
+                now_explanations = explain_batch(X[now_idx])
+            for i, explanation in zip(now_idx, now_explanations):
+                explanations[i] = explanation
+                statuses[i] = "ready"
+
+        defer_idx = [i for i, a in enumerate(actions) if a == "defer"]
+        if defer_idx and EXPLAIN_POLICY.deferred.submit([txn_ids[i] for i in defer_idx], explain_batch, X[defer_idx]):
+            for i in defer_idx:
+                statuses[i] = "pending"
+
+        # 5. Bulk inserts, one statement per table in one transaction (or queued)
+        with STAGE_LATENCY.time(endpoint="score_transactions", stage="persist"):
+            persist([
+                make_record(txn_id, user_id, row, float(risk), decision)
+                for txn_id, row, risk, decision in zip(txn_ids, rows, risk_scores, decisions)
+            ])
+
+        DECISION_STATS.record_many(decisions, risk_scores, [row["Amount"] for row in rows], rule_flags)
+        DECISION_FEED.publish([
+            feed_event(txn_id, user_id, row, float(risk), decision, {k: int(v[i]) for k, v in rule_flags.items()})
+            for i, (txn_id, row, risk, decision) in enumerate(zip(txn_ids, rows, risk_scores, decisions))
+        ])
+
+        REQUEST_LATENCY.observe(time.perf_counter() - started, endpoint="score_transactions")
+        return [
+            {
+                "txn_id": txn_id,
+                "risk_score": float(risk),
+                "decision": decision,
+                "explanation": explanation,
+                "explanation_status": status,
+                "rule_details": {k: int(v[i]) for k, v in rule_flags.items()}
+            }
+            for i, (txn_id, risk, decision, explanation, status) in enumerate(zip(
+                txn_ids, risk_scores, decisions, explanations, statuses
+            ))
+        ]
+
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        ERRORS.inc(endpoint="score_transactions", error=type(e).__name__)
         raise HTTPException(status_code=500, detail=str(e))
 
 
 # --------------------------------------
-# DB VIEW ENDPOINTS
+# METRICS (Prometheus) + PROFILER
+# --------------------------------------
+metrics.Gauge(
+    "fraud_db_pool_connections",
+    "DB pool connections in use, callers waiting for one, and the pool size.",
+    lambda: {(state,): n for state, n in db.pool_usage().items()},
+    ("state",)
+)
+metrics.Gauge(
+    "fraud_result_cache",
+    "Result cache hits, misses, evictions and entries.",
+    lambda: {(stat,): n for stat, n in RESULT_CACHE.stats().items()} if RESULT_CACHE is not None else {},
+    ("stat",)
+)
+metrics.Gauge(
+    "fraud_decision_feed",
+    "Live decision feed subscribers, events published and events dropped for slow subscribers.",
+    lambda: {(stat,): n for stat, n in DECISION_FEED.stats().items()},
+    ("stat",)
+)
+metrics.Gauge(
+    "fraud_batcher",
+    "Model request coalescer (BATCH_COALESCE): batches, items, mean batch size, "
+    "queue wait in seconds (mean, max, p50 and p99 of recent requests) and pending requests.",
+    lambda: {
+        (stat,): n for stat, n in MODEL_BATCHER.stats().items() if stat != "batch_size_histogram"
+    } if MODEL_BATCHER is not None else {},
+    ("stat",)
+)
+metrics.Gauge(
+    "fraud_batcher_batches_by_size",
+    "Coalesced batches dispatched, by batch size bucket (upper bound).",
+    lambda: {
+        (size,): n for size, n in MODEL_BATCHER.stats()["batch_size_histogram"].items()
+    } if MODEL_BATCHER is not None else {},
+    ("size",)
+)
+metrics.Gauge(
+    "fraud_write_behind_pending",
+    "Records queued for the write-behind flusher.",
+    lambda: PERSIST_QUEUE.pending() if PERSIST_QUEUE is not None else 0
+)
+
+PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "0") == "1"
+PROFILER_MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", "60"))
+_profiler_lock = asyncio.Lock()
+
+
+@app.get("/metrics")
+def get_metrics():
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.post("/debug/profile")
+async def profile(seconds: float = 10.0, interval_ms: float = 5.0, top: int = 25):
+    """Samples all threads' stacks for `seconds` while the server keeps serving."""
+    if not PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiler is disabled (PROFILER_ENABLED)")
+    if _profiler_lock.locked():
+        raise HTTPException(status_code=409, detail="A profile is already running")
+
+    from profiler import SamplingProfiler
+
+    async with _profiler_lock:
+        sampler = SamplingProfiler(interval_ms=max(interval_ms, 1.0))
+        sampler.start()
+        try:
+            await asyncio.sleep(min(max(seconds, 0.1), PROFILER_MAX_SECONDS))
+        finally:
+            sampler.stop()
+    return sampler.report(top=top)
+
+
+# --------------------------------------
+# DECISION STATISTICS (pre-aggregated, no DB scan)
+# --------------------------------------
+@app.get("/stats")
+def get_stats(scope: Optional[Literal["worker", "fleet"]] = None):
+    """
+    scope=worker: this process's sliding and tumbling windows.
+    scope=fleet: tumbling windows summed over all serve.py workers (see
+    decision_stats.fleet_snapshot); the default when WEB_CONCURRENCY > 1.
+    """
+    if scope is None:
+        scope = "fleet" if int(os.getenv("WEB_CONCURRENCY", "1")) > 1 else "worker"
+    if scope == "worker":
+        return {"scope": "worker", **DECISION_STATS.snapshot()}
+    try:
+        return decision_stats.fleet_snapshot(DECISION_STATS)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Fleet statistics unavailable: {e}")
+
+
+# --------------------------------------
+# REQUEST COALESCING METRICS
+# --------------------------------------
+@app.get("/batching/stats")
+def get_batching_stats():
+    if MODEL_BATCHER is None:
+        return {"enabled": False}
+    return {"enabled": True, **MODEL_BATCHER.stats()}
+
+
+# --------------------------------------
+# DEFERRED EXPLANATIONS
+# --------------------------------------
+@app.get("/explanations/{txn_id}")
+def get_explanation(txn_id: str):
+    if EXPLAIN_POLICY.deferred is None:
+        raise HTTPException(status_code=404, detail="Deferred explanations are disabled (EXPLAIN_MODE)")
+    status, explanation = EXPLAIN_POLICY.deferred.get(txn_id)
+    if status == "unknown":
+        raise HTTPException(status_code=404, detail=f"No explanation for {txn_id}")
+    return {"txn_id": txn_id, "status": status, "explanation": explanation}
+
+
+# --------------------------------------
+# DB VIEW ENDPOINTS (keyset pages / NDJSON export, see db_views.py)
 # --------------------------------------
+import db_views
+
+def _db_view(view, response, limit, cursor, decision, user_id, since, until, format):
+    filters = {"cursor": cursor, "decision": decision, "user_id": user_id, "since": since, "until": until}
+    try:
+        if format == "ndjson":
+            # Whole result (from `cursor` on) streamed through a server-side cursor
+            sql, params = db_views.build_query(view, limit=limit, **filters)
+            return StreamingResponse(db_views.iter_ndjson(sql, params), media_type="application/x-ndjson")
+
+        rows, next_cursor = db_views.fetch_page(view, limit or db_views.DEFAULT_PAGE_SIZE, **filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # The body stays a plain list (what the dashboard reads); the cursor travels in a header
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return rows
+
+
+@app.get("/decisions/stream")
+async def stream_decisions(
+    decision: Optional[List[Literal["ALLOW", "REVIEW", "BLOCK"]]] = Query(None),
+    min_risk: float = 0.0
+):
+    """
+    Server-Sent Events feed of new decisions, e.g. ?decision=BLOCK&decision=REVIEW.
+    Events that arrive between two frames are coalesced into one `decisions` frame.
+    """
+    try:
+        subscriber = DECISION_FEED.subscribe(decision, min_risk)
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return StreamingResponse(
+        DECISION_FEED.sse(subscriber),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.get("/transactions")
-def get_transactions():
-    return execute_query("""
-        SELECT * FROM fraud.transactions_raw
-        ORDER BY timestamp DESC
-    """)
+def get_transactions(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=db_views.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    decision: Optional[Literal["ALLOW", "REVIEW", "BLOCK"]] = None,
+    user_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    format: Literal["json", "ndjson"] = "json"
+):
+    """Newest first, one page per call; pass X-Next-Cursor back as ?cursor= for the next."""
+    return _db_view("transactions", response, limit, cursor, decision, user_id, since, until, format)
 
 @app.get("/decisions")
-def get_decisions():
-    return execute_query("""
-        SELECT * FROM fraud.decisions
-        ORDER BY decision_time DESC
-    """)
+def get_decisions(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=db_views.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    decision: Optional[Literal["ALLOW", "REVIEW", "BLOCK"]] = None,
+    user_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    format: Literal["json", "ndjson"] = "json"
+):
+    """Same paging and filters as /transactions, over fraud.decisions."""
+    return _db_view("decisions", response, limit, cursor, decision, user_id, since, until, format)
 
 
 # --------------------------------------
 # ADMIN / RULE MANAGEMENT
 # --------------------------------------
+import psycopg2
+import rule_backtest
+
+# History that suggestions are back-tested on, loaded on first use (see rule_backtest.create_backtester)
+_BACKTESTER = None
+_BACKTESTER_LOCK = threading.Lock()
+
+def get_backtester(refresh=False):
+    global _BACKTESTER
+    with _BACKTESTER_LOCK:
+        if _BACKTESTER is None or refresh:
+            try:
+                _BACKTESTER = rule_backtest.create_backtester(COMPONENTS, MODEL_VERSION)
+            except (OSError, ValueError, psycopg2.Error) as e:
+                raise HTTPException(status_code=503, detail=f"No back-testing history: {e}")
+        return _BACKTESTER
+
 @app.get("/suggestions")
-def get_suggestions():
+def get_suggestions(simulate: bool = False, refresh: bool = False):
+    """
+    Pending rule suggestions. With ?simulate=true each one carries the
+    back-tested impact of applying it alone (`simulated_impact`);
+    ?refresh=true reloads the back-testing history first.
+    """
     try:
         if not os.path.exists("suggestions.json"):
             return []
         with open("suggestions.json", "r") as f:
-            return json.load(f)
+            suggestions = json.load(f)
     except Exception as e:
         return []
 
+    if simulate and suggestions:
+        backtester = get_backtester(refresh)
+        for suggestion in suggestions:
+            suggestion["simulated_impact"] = backtester.compare_suggestions(RULE_ENGINE.config, [suggestion])
+    return suggestions
+
 class ApprovedSuggestion(BaseModel):
     target_rule: str
     parameter: str
     proposed_value: Any
 
+@app.post("/backtest_rules")
+def backtest_rules(approved_list: List[ApprovedSuggestion], refresh: bool = False):
+    """Back-tests applying all the given suggestions together, without applying them."""
+    return get_backtester(refresh).compare_suggestions(RULE_ENGINE.config, approved_list)
+
 @app.post("/apply_rules")
 def apply_rules(approved_list: List[ApprovedSuggestion]):
     try:
@@ -339,13 +845,8 @@ def apply_rules(approved_list: List[ApprovedSuggestion]):
         with open("fraud_rules.json", "r") as f:
             rules = json.load(f)
         
-        # 2. Apply updates
-        changes_applied = 0
-        for item in approved_list:
-            if item.target_rule in rules:
-                if item.parameter in rules[item.target_rule]:
-                    rules[item.target_rule][item.parameter] = item.proposed_value
-                    changes_applied += 1
+        # 2. Apply updates (same helper the back-test uses)
+        rules, changes_applied = rule_backtest.apply_suggestions(rules, approved_list)
         
         # 3. Save back to file
         with open("fraud_rules.json", "w") as f:
@@ -368,14 +869,60 @@ def apply_rules(approved_list: List[ApprovedSuggestion]):
 # --------------------------------------
 # RUN OPTIMIZER
 # --------------------------------------
-from optimize_rules import run_optimization
+# The rule search runs as its own process (never inside a request), one at a time
+_OPTIMIZER_RUN = None
 
 @app.post("/run_optimizer")
-def run_optimizer():
-    run_optimization()
-    return {"status": "success"}
+def run_optimizer(response: Response):
+    """
+    RULE_OPTIMIZER=search (default): starts rule_search.py in the background
+    and returns 202; its suggestions are appended to suggestions.json.
+    RULE_OPTIMIZER=llm: asks the LLM, synchronously.
+    """
+    global _OPTIMIZER_RUN
+    # Optimizer (and its LLM client) only loads when the endpoint is used
+    import optimize_rules
+
+    if os.getenv("RULE_OPTIMIZER", "search") == "llm":
+        optimize_rules.run_llm_optimization()
+        return {"status": "success"}
+
+    if _OPTIMIZER_RUN is not None and _OPTIMIZER_RUN.poll() is None:
+        raise HTTPException(status_code=409, detail=f"A rule search is already running (pid {_OPTIMIZER_RUN.pid})")
+    try:
+        _OPTIMIZER_RUN = optimize_rules.start_search_optimization()
+    except ValueError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    response.status_code = 202
+    return {"status": "started", "pid": _OPTIMIZER_RUN.pid}
+
 
 
+# --------------------------------------
+# STARTUP / SHUTDOWN
+# --------------------------------------
+@app.on_event("startup")
+def start_background_state():
+    if PERSIST_QUEUE is not None:
+        PERSIST_QUEUE.start()
+    if STATS_CHECKPOINTER is not None:
+        STATS_CHECKPOINTER.start()
+    DECISION_FEED.start()
+    if os.getenv("USER_STATE_WARM", "0") == "1":
+        warm_user_state(int(os.getenv("USER_STATE_WARM_LIMIT", "10000")))
+
+@app.on_event("shutdown")
+def close_db_pool():
+    # Drain pending write-behind records before the pool goes away
+    if PERSIST_QUEUE is not None:
+        PERSIST_QUEUE.stop()
+    if STATS_CHECKPOINTER is not None:
+        STATS_CHECKPOINTER.stop()
+    DECISION_FEED.stop()
+    if EXPLAIN_POLICY.deferred is not None:
+        EXPLAIN_POLICY.deferred.shutdown()
+    db.close_pool()
+
 
 # --------------------------------------
 # RUN SERVER
@@ -0,0 +1,137 @@
+import asyncio
+import time
+from collections import deque
+
+# Upper bounds of the batch-size histogram buckets
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+
+class MicroBatcher:
+    """
+    Dynamic batching in front of a vectorized function, as in model servers.
+
+    Concurrent submit() calls are coalesced: a batch is dispatched once it has
+    `max_batch_size` items or its oldest item has waited `max_wait_ms`.
+    process_batch(items) runs in an executor and must return one result per item.
+
+    Args:
+        process_batch (callable): list of items -> list of results (same order).
+        max_batch_size (int): Largest batch handed to process_batch.
+        max_wait_ms (float): Latency ceiling added by waiting for a batch to fill.
+        max_in_flight (int): Batches allowed to run concurrently.
+        executor: concurrent.futures executor (None = the loop's default).
+    """
+
+    def __init__(self, process_batch, max_batch_size=64, max_wait_ms=2.0, max_in_flight=2, executor=None):
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_in_flight = max_in_flight
+        self.executor = executor
+
+        self._loop = None
+        self._queue = None
+        self._slots = None
+        self._collector = None
+
+        # Metrics
+        self.batches = 0
+        self.items = 0
+        self.batch_size_counts = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+        self.queue_wait_sum = 0.0
+        self.queue_wait_max = 0.0
+        self._recent_waits = deque(maxlen=2048)
+
+    async def submit(self, item):
+        """Queues one item and returns its result once its batch has run."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._start(loop)
+
+        future = loop.create_future()
+        self._queue.put_nowait((item, future, time.perf_counter()))
+        return await future
+
+    def _start(self, loop):
+        # Queue and collector are bound to the loop that serves requests
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        self._collector = loop.create_task(self._collect())
+
+    async def _collect(self):
+        while True:
+            first = await self._queue.get()
+            batch = [first]
+            deadline = first[2] + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                # Take whatever is already queued before waiting on the clock
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            await self._slots.acquire()
+            self._record(batch)
+            self._loop.create_task(self._dispatch(batch))
+
+    async def _dispatch(self, batch):
+        try:
+            results = await self._loop.run_in_executor(
+                self.executor, self.process_batch, [item for item, _, _ in batch]
+            )
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for (_, future, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self._slots.release()
+
+    def _record(self, batch):
+        now = time.perf_counter()
+        self.batches += 1
+        self.items += len(batch)
+
+        bucket = len(BATCH_SIZE_BUCKETS)
+        for i, upper in enumerate(BATCH_SIZE_BUCKETS):
+            if len(batch) <= upper:
+                bucket = i
+                break
+        self.batch_size_counts[bucket] += 1
+
+        for _, _, submitted in batch:
+            wait = now - submitted
+            self.queue_wait_sum += wait
+            self.queue_wait_max = max(self.queue_wait_max, wait)
+            self._recent_waits.append(wait)
+
+    def stats(self):
+        """Batch-size histogram and queue-wait summary (seconds)."""
+        waits = sorted(self._recent_waits)
+
+        def pct(q):
+            return waits[min(int(q * len(waits)), len(waits) - 1)] if waits else 0.0
+
+        labels = [str(b) for b in BATCH_SIZE_BUCKETS] + [f">{BATCH_SIZE_BUCKETS[-1]}"]
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+            "batch_size_histogram": dict(zip(labels, self.batch_size_counts)),
+            "queue_wait_mean_s": self.queue_wait_sum / self.items if self.items else 0.0,
+            "queue_wait_max_s": self.queue_wait_max,
+            "queue_wait_p50_s": pct(0.50),
+            "queue_wait_p99_s": pct(0.99),
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+        }
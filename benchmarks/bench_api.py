@@ -0,0 +1,382 @@
+"""
+Load test / latency benchmark for the scoring API.
+
+Replays src/data/test_transactions.json (or a synthetic stream of any size)
+against /score_transaction, either in process (FastAPI app, same event loop
+as production) or over HTTP against a running server, and reports throughput
+plus p50/p95/p99 latency end to end and per stage (rules, xgb, iso, shap, db).
+With --target http the per-stage numbers come from the server's own
+fraud_stage_duration_seconds histograms (/metrics, scraped before and after
+the run; one worker's series when serve.py runs several): history, rules,
+xgb and iso (plus ml, the two together), shap and persist. The in-process
+stage timings are reported separately as local-only.
+Results are written as JSON so runs can be compared across commits.
+
+    python benchmarks/bench_api.py                                  # in process, in-memory DB
+    python benchmarks/bench_api.py --requests 5000 --synthetic --concurrency 32
+    python benchmarks/bench_api.py --db postgres                    # DB_* settings from .env
+    python benchmarks/bench_api.py --target http --url http://localhost:8000
+    python benchmarks/bench_api.py --compare benchmarks/results/baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import time
+import urllib.request
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+
+warnings.filterwarnings("ignore")
+
+FIXTURE_PATH = os.path.join(ROOT, "src", "data", "test_transactions.json")
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+STAGES = ("rules", "xgb", "iso", "shap", "db")
+STAGE_METRIC = "fraud_stage_duration_seconds"
+
+
+# --------------------------------------
+# WORKLOAD
+# --------------------------------------
+def load_transactions(n, synthetic=False, seed=0):
+    """
+    The fixture replayed until `n` requests, or (synthetic) fixture rows with
+    perturbed PCA features, log-normal amounts and an increasing Time.
+    """
+    with open(FIXTURE_PATH) as f:
+        fixture = json.load(f)
+    if not synthetic:
+        return (fixture * (n // len(fixture) + 1))[:n]
+
+    rng = np.random.default_rng(seed)
+    base = [fixture[i] for i in rng.integers(0, len(fixture), n)]
+    noise = rng.normal(0.0, 0.25, (n, 28))
+    amounts = np.round(rng.lognormal(3.5, 1.2, n), 2)
+    times = np.cumsum(rng.exponential(0.5, n)) + min(t["Time"] for t in fixture)
+
+    transactions = []
+    for i, row in enumerate(base):
+        txn = {f"V{j}": float(row[f"V{j}"] + noise[i, j - 1]) for j in range(1, 29)}
+        txn["Time"] = float(times[i])
+        txn["Amount"] = float(amounts[i])
+        transactions.append(txn)
+    return transactions
+
+
+def summarize(latencies_s):
+    ms = np.asarray(latencies_s) * 1000.0
+    if ms.size == 0:
+        return {"count": 0}
+    return {
+        "count": int(ms.size),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "max_ms": float(ms.max()),
+    }
+
+
+# --------------------------------------
+# END TO END
+# --------------------------------------
+def run_load(post, transactions, concurrency):
+    """Fires every transaction through `post` with `concurrency` callers in flight."""
+    latencies = []
+    errors = 0
+
+    def one(txn):
+        start = time.perf_counter()
+        ok = post(txn)
+        return time.perf_counter() - start, ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for elapsed, ok in pool.map(one, transactions):
+            latencies.append(elapsed)
+            errors += 0 if ok else 1
+    wall = time.perf_counter() - start
+
+    result = summarize(latencies)
+    result["errors"] = errors
+    result["wall_s"] = wall
+    result["throughput_rps"] = len(transactions) / wall if wall else 0.0
+    return result
+
+
+def inprocess_poster(client):
+    def post(txn):
+        return client.post("/score_transaction", json=txn).status_code == 200
+    return post
+
+
+def http_poster(url, timeout=30.0):
+    endpoint = url.rstrip("/") + "/score_transaction"
+
+    def post(txn):
+        req = urllib.request.Request(
+            endpoint,
+            data=json.dumps(txn).encode(),
+            headers={"Content-Type": "application/json"},
+            method="POST"
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=timeout) as res:
+                res.read()
+                return res.status == 200
+        except OSError:
+            return False
+    return post
+
+
+# --------------------------------------
+# PER STAGE
+# --------------------------------------
+def time_stages(api, transactions):
+    """
+    Times each stage of score_transaction on its own, one transaction at a
+    time, with the same objects the endpoint uses.
+    """
+    import fraud_pipeline as ml_pipeline
+    from write_behind import persist_records
+
+    xgb_only = {"xgb": api.COMPONENTS["xgb"]}
+    iso_only = {"iso": api.COMPONENTS["iso"]}
+    timings = {stage: [] for stage in STAGES}
+    buf = ml_pipeline.new_feature_buffer(1)
+
+    for i, txn in enumerate(transactions):
+        row = [txn[c] for c in ml_pipeline.FEATURE_COLUMNS]
+
+        start = time.perf_counter()
+        api.RULE_ENGINE.evaluate(txn, time.time() - 1.0)
+        timings["rules"].append(time.perf_counter() - start)
+
+        buf[0] = row
+        start = time.perf_counter()
+        ml_pipeline.score_feature_buffer(buf, xgb_only, {"xgb": 1.0})
+        timings["xgb"].append(time.perf_counter() - start)
+
+        buf[0] = row
+        start = time.perf_counter()
+        ml_pipeline.score_feature_buffer(buf, iso_only, {"iso": 1.0})
+        timings["iso"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        api.explain_batch([txn])
+        timings["shap"].append(time.perf_counter() - start)
+
+        record = api.make_record(f"bench_{i}_{time.time_ns()}", "user_bench", txn, 0.0, "ALLOW")
+        start = time.perf_counter()
+        persist_records([record])
+        timings["db"].append(time.perf_counter() - start)
+
+    return {stage: summarize(values) for stage, values in timings.items()}
+
+
+def scrape_stage_histograms(url, endpoint="score_transaction", timeout=10.0):
+    """
+    The target's stage histograms for one endpoint from its /metrics:
+    {stage: {"buckets": [(le, cumulative count)], "sum": seconds, "count": n}}.
+    """
+    with urllib.request.urlopen(url.rstrip("/") + "/metrics", timeout=timeout) as res:
+        text = res.read().decode()
+
+    line_re = re.compile(rf"^{STAGE_METRIC}_(bucket|sum|count)\{{([^}}]*)\}} (\S+)$")
+    stages = {}
+    for line in text.splitlines():
+        m = line_re.match(line)
+        if m is None:
+            continue
+        kind, labels, value = m.group(1), dict(re.findall(r'(\w+)="([^"]*)"', m.group(2))), float(m.group(3))
+        if labels.get("endpoint") != endpoint:
+            continue
+        series = stages.setdefault(labels["stage"], {"buckets": [], "sum": 0.0, "count": 0})
+        if kind == "bucket":
+            series["buckets"].append((float(labels["le"]), value))
+        else:
+            series[kind] = value
+    return stages
+
+
+def bucket_quantile(q, buckets):
+    """histogram_quantile(): linear interpolation inside the bucket holding rank q."""
+    total = buckets[-1][1]
+    rank = q * total
+    lower, below = 0.0, 0.0
+    for upper, cumulative in buckets:
+        if cumulative >= rank:
+            if upper == float("inf"):
+                return lower
+            if cumulative == below:
+                return upper
+            return lower + (upper - lower) * (rank - below) / (cumulative - below)
+        lower, below = upper, cumulative
+    return lower
+
+
+def summarize_scraped(before, after):
+    """summarize()-style stats for the samples added between two scrapes (no max: buckets only)."""
+    summary = {}
+    for stage, end in after.items():
+        start = before.get(stage, {"buckets": [(le, 0.0) for le, _ in end["buckets"]], "sum": 0.0, "count": 0})
+        n = int(end["count"] - start["count"])
+        if n <= 0:
+            continue
+        buckets = [(le, c - c0) for (le, c), (_, c0) in zip(end["buckets"], start["buckets"])]
+        summary[stage] = {
+            "count": n,
+            "mean_ms": (end["sum"] - start["sum"]) / n * 1000.0,
+            "p50_ms": bucket_quantile(0.50, buckets) * 1000.0,
+            "p95_ms": bucket_quantile(0.95, buckets) * 1000.0,
+            "p99_ms": bucket_quantile(0.99, buckets) * 1000.0,
+            "max_ms": None,
+        }
+    return summary
+
+
+# --------------------------------------
+# RESULTS
+# --------------------------------------
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, tolerance):
+    """
+    Prints p95 ratios vs a previous run; returns the list of regressed metrics.
+    Stages are only compared when both runs measured them the same way.
+    """
+    regressions = []
+    sections = [("end_to_end", results.get("end_to_end"), baseline.get("end_to_end"))]
+    if results.get("stage_source", "inprocess") == baseline.get("stage_source", "inprocess"):
+        sections += [(f"stage.{s}", r, baseline.get("stages", {}).get(s))
+                     for s, r in results.get("stages", {}).items()]
+
+    print(f"\nvs baseline {baseline.get('commit')} ({baseline.get('timestamp')}):")
+    for name, current, previous in sections:
+        if not current or not previous or not previous.get("p95_ms"):
+            continue
+        ratio = current["p95_ms"] / previous["p95_ms"]
+        flag = "  ❌ REGRESSION" if ratio > 1.0 + tolerance else ""
+        print(f"  {name:16s} p95 {previous['p95_ms']:9.2f} -> {current['p95_ms']:9.2f} ms  x{ratio:.2f}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def print_results(results):
+    print(f"\n{'':16s} {'count':>7s} {'p50_ms':>9s} {'p95_ms':>9s} {'p99_ms':>9s} {'max_ms':>9s}")
+    rows = [("end_to_end", results.get("end_to_end"))]
+    rows += [(f"stage.{s}", r) for s, r in results.get("stages", {}).items()]
+    # --target http: timed in this process, not on the target
+    rows += [(f"local.{s}", r) for s, r in results.get("local_stages", {}).items()]
+    for name, r in rows:
+        if r and r.get("count"):
+            max_ms = "-" if r["max_ms"] is None else f"{r['max_ms']:.2f}"
+            print(f"{name:16s} {r['count']:7d} {r['p50_ms']:9.2f} {r['p95_ms']:9.2f} "
+                  f"{r['p99_ms']:9.2f} {max_ms:>9s}")
+    if results.get("stage_source") == "metrics":
+        print("(stage.* from the target's /metrics, bucket-interpolated; local.* measured in this process only)")
+    e2e = results.get("end_to_end")
+    if e2e:
+        print(f"\n🚀 {e2e['throughput_rps']:.1f} req/s, {e2e['errors']} errors, {e2e['wall_s']:.2f}s wall")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scoring API load test")
+    parser.add_argument("--target", choices=("inprocess", "http"), default="inprocess")
+    parser.add_argument("--url", default="http://localhost:8000", help="Server URL for --target http")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--synthetic", action="store_true", help="Generate transactions instead of replaying the fixture")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--db", choices=("memory", "postgres"), default="memory")
+    parser.add_argument("--db-latency-ms", type=float, default=1.0, help="Simulated round trip of the in-memory DB")
+    parser.add_argument("--stage-samples", type=int, default=200, help="Transactions timed per stage (0 skips)")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--out", default=None, help="Result file (default: benchmarks/results/api_<commit>_<time>.json)")
+    parser.add_argument("--compare", default=None, help="Previous result file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p95 slowdown before flagging (0.2 = +20%%)")
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    transactions = load_transactions(args.requests, args.synthetic, args.seed)
+
+    import db
+    if args.db == "memory":
+        import memory_db
+        db.init_pool(memory_db.MemoryDatabase(latency_ms=args.db_latency_ms))
+
+    import api
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            **vars(args),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+            "explain_mode": api.EXPLAIN_POLICY.mode,
+            "explain_backend": api.EXPLAIN_BACKEND,
+            "write_behind": api.PERSIST_QUEUE is not None,
+            "batch_coalesce": api.MODEL_BATCHER is not None,
+        },
+    }
+
+    if args.stage_samples:
+        print(f"⏱️ Timing stages on {min(args.stage_samples, len(transactions))} transactions...")
+        stages = time_stages(api, transactions[:args.stage_samples])
+        # Over HTTP these describe this process, not the target
+        results["local_stages" if args.target == "http" else "stages"] = stages
+
+    print(f"🔥 {args.requests} requests, concurrency {args.concurrency}, target {args.target}...")
+    if args.target == "http":
+        post = http_poster(args.url)
+        run_load(post, transactions[:args.warmup], args.concurrency)
+        before = scrape_stage_histograms(args.url)
+        results["end_to_end"] = run_load(post, transactions, args.concurrency)
+        results["stages"] = summarize_scraped(before, scrape_stage_histograms(args.url))
+        results["stage_source"] = "metrics"
+    else:
+        from fastapi.testclient import TestClient
+
+        # One client for the whole run: startup/shutdown hooks and one event loop
+        with TestClient(api.app) as client:
+            post = inprocess_poster(client)
+            run_load(post, transactions[:args.warmup], args.concurrency)
+            results["end_to_end"] = run_load(post, transactions, args.concurrency)
+
+    print_results(results)
+
+    out = args.out or os.path.join(
+        RESULTS_DIR, f"api_{results['commit'] or 'nogit'}_{datetime.now():%Y%m%d_%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"✅ Results saved to {out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
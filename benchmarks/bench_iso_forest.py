@@ -0,0 +1,101 @@
+"""
+Micro-benchmark: sklearn IsolationForest.decision_function vs the flattened
+NumPy forest (fraud_pipeline/iso_forest.py) for single rows and small and
+large batches. Also reports the largest absolute score difference, which
+should be 0 (or within a few ulps).
+
+Uses the trained iso_forest_model.pkl when present, otherwise a forest with the
+training parameters (ISO_PARAMS) fitted on synthetic data.
+
+    python benchmarks/bench_iso_forest.py [--batches 1 16 256 100000]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import warnings
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import IsolationForest
+
+from fraud_pipeline import ISO_FEATURE_COLUMNS
+from fraud_pipeline.config import ISO_PARAMS
+from fraud_pipeline.iso_forest import FlatIsolationForest
+
+warnings.filterwarnings("ignore")
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+MODEL_PATH = os.path.join(ROOT, "iso_forest_model.pkl")
+
+
+def load_forest(rng):
+    if os.path.exists(MODEL_PATH):
+        return joblib.load(MODEL_PATH), "iso_forest_model.pkl"
+    X = pd.DataFrame(rng.normal(size=(50_000, len(ISO_FEATURE_COLUMNS))), columns=ISO_FEATURE_COLUMNS)
+    return IsolationForest(**ISO_PARAMS, contamination=0.0017).fit(X), "synthetic"
+
+
+def us_per_call(fn, X, min_seconds=0.5):
+    fn(X)
+    calls, start = 0, time.perf_counter()
+    while time.perf_counter() - start < min_seconds:
+        fn(X)
+        calls += 1
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batches", type=int, nargs="+", default=[1, 16, 256, 4096, 100_000])
+    parser.add_argument("--out", default=None, help="Result file (default: benchmarks/results/iso_<time>.json)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    forest, source = load_forest(rng)
+    started = time.perf_counter()
+    flat = FlatIsolationForest(forest)
+    export_ms = (time.perf_counter() - started) * 1e3
+
+    # The API passes a DataFrame to keep sklearn's feature-name check quiet
+    def sklearn_scores(X):
+        return forest.decision_function(pd.DataFrame(X, columns=ISO_FEATURE_COLUMNS, copy=False))
+
+    results = []
+    for n in args.batches:
+        X = rng.normal(size=(n, len(ISO_FEATURE_COLUMNS))).astype(np.float32)
+        sk_us = us_per_call(sklearn_scores, X)
+        flat_us = us_per_call(flat.decision_function, X)
+        results.append({
+            "batch": n,
+            "sklearn_us": sk_us,
+            "flat_us": flat_us,
+            "speedup": sk_us / flat_us,
+            "max_abs_diff": float(np.abs(flat.decision_function(X) - sklearn_scores(X)).max()),
+        })
+
+    print(f"forest: {source}, {len(forest.estimators_)} trees, depth {flat.max_depth}, export {export_ms:.1f} ms\n")
+    print(f"{'batch':>8s} {'sklearn (us)':>13s} {'flat (us)':>10s} {'speedup':>8s} {'max |diff|':>11s}")
+    for r in results:
+        print(f"{r['batch']:8d} {r['sklearn_us']:13.1f} {r['flat_us']:10.1f} {r['speedup']:7.1f}x {r['max_abs_diff']:11.2e}")
+
+    out = args.out or os.path.join(RESULTS_DIR, f"iso_{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump({
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "forest": source,
+            "export_ms": export_ms,
+            "results": results,
+        }, f, indent=2)
+    print(f"✅ Results saved to {out}")
+
+
+if __name__ == "__main__":
+    main()
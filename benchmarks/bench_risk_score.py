@@ -0,0 +1,85 @@
+"""
+Micro-benchmark: per-row cost of the DataFrame scoring path vs the
+array-native score_feature_buffer hot path (XGBoost only).
+
+    python benchmarks/bench_risk_score.py [--rows 2000]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import joblib
+import pandas as pd
+
+import fraud_pipeline as ml_pipeline
+
+warnings.filterwarnings("ignore")
+
+
+def legacy_compute_risk_score(transaction_df, components):
+    # The pre-hot-path implementation: copy, DataFrame scaler, DataFrame predict_proba
+    scaled_df = transaction_df.copy()
+    scaled_df[['Amount', 'Time']] = components["xgb"]["scaler"].transform(
+        transaction_df[['Amount', 'Time']]
+    )
+    return components["xgb"]["model"].predict_proba(scaled_df)[:, 1]
+
+
+def per_row_us(fn, n):
+    start = time.perf_counter()
+    for i in range(n):
+        fn(i)
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2000)
+    args = parser.parse_args()
+
+    with open("src/data/test_transactions.json") as f:
+        records = json.load(f)
+    records = (records * (args.rows // len(records) + 1))[:args.rows]
+
+    components = ml_pipeline.prepare_components({
+        "xgb": {"model": joblib.load("model.pkl"), "scaler": joblib.load("scaler.pkl")}
+    })
+    weights = {"xgb": 1.0}
+
+    frames = [pd.DataFrame([r])[ml_pipeline.FEATURE_COLUMNS] for r in records]
+    raw = ml_pipeline.new_feature_buffer(len(records))
+    for i, r in enumerate(records):
+        raw[i] = [r[c] for c in ml_pipeline.FEATURE_COLUMNS]
+    buf = ml_pipeline.new_feature_buffer(1)
+
+    def array_row(i):
+        buf[0] = raw[i]
+        ml_pipeline.score_feature_buffer(buf, components, weights)
+
+    # Warm up both paths
+    legacy_compute_risk_score(frames[0], components)
+    array_row(0)
+
+    results = {
+        "legacy_dataframe_us_per_row": per_row_us(lambda i: legacy_compute_risk_score(frames[i], components), len(frames)),
+        "dict_adapter_us_per_row": per_row_us(lambda i: ml_pipeline.compute_risk_score(records[i], components, weights), len(records)),
+        "array_buffer_us_per_row": per_row_us(array_row, len(records)),
+    }
+
+    batch = raw.copy()
+    start = time.perf_counter()
+    ml_pipeline.score_feature_buffer(batch, components, weights)
+    results["array_batch_us_per_row"] = (time.perf_counter() - start) / len(records) * 1e6
+    results["speedup_single_row"] = results["legacy_dataframe_us_per_row"] / results["array_buffer_us_per_row"]
+
+    for key, value in results.items():
+        print(f"{key:32s} {value:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Startup benchmark, every variant in a fresh interpreter so nothing is cached
+in-process:
+
+- import time of what the API imports (inference package, scorer, optimizer
+  module) vs the eager training/LLM stack it used to pull in, and which heavy
+  modules each import actually loads;
+- time to load the legacy joblib artifacts vs the model bundle.
+
+    python benchmarks/bench_startup.py [--repeat 3]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import warnings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LOAD_SNIPPET = """
+import json, time, warnings
+warnings.filterwarnings("ignore")
+t0 = time.perf_counter()
+{imports}
+t1 = time.perf_counter()
+{load}
+t2 = time.perf_counter()
+print(json.dumps({{"import_s": t1 - t0, "load_s": t2 - t1}}))
+"""
+
+IMPORT_SNIPPET = """
+import json, sys, time, warnings
+warnings.filterwarnings("ignore")
+t0 = time.perf_counter()
+{imports}
+t1 = time.perf_counter()
+print(json.dumps({{"import_s": t1 - t0, "heavy": sorted(m for m in {heavy!r} if m in sys.modules)}}))
+"""
+
+# Training, plotting and LLM dependencies the scoring path must not load
+HEAVY_MODULES = ("fraud_pipeline.training", "shap", "matplotlib", "seaborn", "kagglehub", "openai")
+
+IMPORT_VARIANTS = {
+    # What api.py imports at startup for scoring
+    "inference": "import fraud_pipeline, scoring, fraud_rules",
+    "optimizer_module": "import optimize_rules",
+    # The same plus everything that used to come with it at import time
+    "eager_training_stack": "import fraud_pipeline, scoring, fraud_rules, fraud_pipeline.training, "
+                            "shap, matplotlib.pyplot, kagglehub, openai",
+}
+
+VARIANTS = {
+    "legacy_pickles": (
+        "import joblib",
+        "[joblib.load(p) for p in ('model.pkl', 'scaler.pkl', 'explainer.pkl', "
+        "'iso_forest_model.pkl', 'iso_scaler.pkl', 'iso_metadata.pkl')]",
+    ),
+    "bundle_with_explainer": (
+        "import model_bundle",
+        "model_bundle.load_bundle({path!r})",
+    ),
+    "bundle_pred_contribs": (
+        "import model_bundle",
+        "model_bundle.load_bundle({path!r}, build_explainer=False)",
+    ),
+}
+
+
+def run_snippet(code):
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def run_variant(imports, load):
+    return run_snippet(LOAD_SNIPPET.format(imports=imports, load=load))
+
+
+def run_import_variant(imports):
+    return run_snippet(IMPORT_SNIPPET.format(imports=imports, heavy=HEAVY_MODULES))
+
+
+def bench_imports(repeat):
+    results = {}
+    for name, imports in IMPORT_VARIANTS.items():
+        runs = [run_import_variant(imports) for _ in range(repeat)]
+        results[name] = {"import_s": min(r["import_s"] for r in runs), "heavy": runs[-1]["heavy"]}
+
+    print(f"{'imports':24s} {'import (s)':>10s}  heavy modules loaded")
+    for name, r in results.items():
+        print(f"{name:24s} {r['import_s']:10.3f}  {', '.join(r['heavy']) or '-'}")
+    saved = results["eager_training_stack"]["import_s"] - results["inference"]["import_s"]
+    print(f"\n🚀 Lazy imports save {saved:.3f}s of API startup\n")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore")
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)
+    import model_bundle
+
+    bench_imports(args.repeat)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bundle")
+        model_bundle.export_legacy_artifacts(path)
+
+        results = {}
+        for name, (imports, load) in VARIANTS.items():
+            runs = [run_variant(imports, load.format(path=path)) for _ in range(args.repeat)]
+            results[name] = {
+                "import_s": min(r["import_s"] for r in runs),
+                "load_s": min(r["load_s"] for r in runs),
+            }
+
+    print(f"{'variant':24s} {'import (s)':>10s} {'load (s)':>10s}")
+    for name, r in results.items():
+        print(f"{name:24s} {r['import_s']:10.3f} {r['load_s']:10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Training benchmark: the reference pipeline (sequential 3-fold CV, 400 rounds)
+vs training_mode="fast" (parallel CV folds with early stopping). Reports the
+wall clock of the CV-threshold and XGBoost stages, the tuned thresholds and
+test PR-AUC, and exits non-zero if the fast threshold drifts beyond --tolerance.
+
+Data stages (CSV -> Parquet, split, scaler) are shared through one temporary
+stage cache, so only the training stages are timed.
+
+    python benchmarks/bench_training.py --data ~/datasets/creditcard.csv
+    python benchmarks/bench_training.py --data creditcard.csv --rows 60000 --tolerance 0.05
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pandas as pd
+from sklearn.metrics import average_precision_score
+
+warnings.filterwarnings("ignore")
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+TIMED_STAGES = ("cv_threshold", "xgb")
+
+
+def stratified_sample(csv_path, rows, out_path, seed=0):
+    df = pd.read_csv(csv_path)
+    frac = min(rows / len(df), 1.0)
+    df.groupby("Class", group_keys=False).sample(frac=frac, random_state=seed).to_csv(out_path, index=False)
+    return out_path
+
+
+def run_mode(ml_pipeline, cache, data_path, mode, labels):
+    from fraud_pipeline.training import xgb_features
+
+    config = ml_pipeline.PipelineConfig(training_mode=mode, data_path=data_path, explainer=False)
+    started = time.perf_counter()
+    artifacts = ml_pipeline.run_pipeline(config, cache=cache)
+    wall = time.perf_counter() - started
+
+    y_test_prob = artifacts.model.predict_proba(xgb_features(artifacts.X_test, artifacts.scaler))[:, 1]
+    return {
+        "threshold": artifacts.threshold,
+        "n_estimators": artifacts.model.n_estimators,
+        "training_s": sum(cache.report[s]["seconds"] for s in TIMED_STAGES),
+        "stages_s": {s: cache.report[s]["seconds"] for s in TIMED_STAGES},
+        "pipeline_wall_s": wall,
+        "test_pr_auc": float(average_precision_score(labels.loc[artifacts.X_test.index], y_test_prob)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reference vs fast training benchmark")
+    parser.add_argument("--data", required=True, help="Local creditcard.csv")
+    parser.add_argument("--rows", type=int, default=None, help="Stratified subsample size (default: all rows)")
+    parser.add_argument("--tolerance", type=float, default=0.05, help="Allowed absolute threshold difference")
+    parser.add_argument("--out", default=None, help="Result file (default: benchmarks/results/training_<time>.json)")
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    import fraud_pipeline as ml_pipeline
+    from fraud_pipeline.cache import StageCache
+    from fraud_pipeline.config import TRAINING_MODES
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_path = args.data
+        if args.rows:
+            data_path = stratified_sample(args.data, args.rows, os.path.join(tmp, "sample.csv"))
+        labels = pd.read_csv(data_path, usecols=["Class"])["Class"]
+
+        cache_dir = os.path.join(tmp, "cache")
+        results = {
+            mode: run_mode(ml_pipeline, StageCache(cache_dir), data_path, mode, labels)
+            for mode in TRAINING_MODES
+        }
+
+    ref, fast = results["reference"], results["fast"]
+    drift = abs(fast["threshold"] - ref["threshold"])
+
+    print(f"\n{'mode':10s} {'cv (s)':>8s} {'xgb (s)':>8s} {'total (s)':>10s} {'rounds':>7s} "
+          f"{'threshold':>10s} {'PR-AUC':>7s}")
+    for mode, r in results.items():
+        print(f"{mode:10s} {r['stages_s']['cv_threshold']:8.1f} {r['stages_s']['xgb']:8.1f} "
+              f"{r['training_s']:10.1f} {r['n_estimators']:7d} {r['threshold']:10.4f} {r['test_pr_auc']:7.4f}")
+    print(f"\n🚀 x{ref['training_s'] / fast['training_s']:.2f} faster training, threshold drift {drift:.4f} "
+          f"(tolerance {args.tolerance})")
+
+    out = args.out or os.path.join(RESULTS_DIR, f"training_{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump({
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "config": {**vars(args), "cpu_count": os.cpu_count()},
+            "results": results,
+            "threshold_drift": drift,
+        }, f, indent=2)
+    print(f"✅ Results saved to {out}")
+
+    if drift > args.tolerance:
+        print("❌ Fast-mode threshold drifted beyond tolerance")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""
+Offline bulk re-scoring of historical transactions after a model or rules change.
+
+Reads a large CSV (creditcard.csv layout) or Parquet file in fixed-size chunks,
+scores the chunks on a process pool with the current model bundle and
+RuleEngine, and writes a Parquet dataset with one part file per chunk:
+
+    <output>/part-000000.parquet ...   row, [txn_id, user_id, Class], xgb_score,
+                                       iso_score, rule_score, risk_score, decision,
+                                       one int8 column per rule flag
+    <output>/_checkpoint.json          run parameters + completed chunk ids
+
+Only `workers * 2` chunks are in flight at a time, so memory stays flat
+regardless of input size. An interrupted run resumes from the checkpoint:
+completed chunks are skipped and the leading run of them is not even parsed.
+
+    python bulk_rescore.py creditcard.csv rescored/ --workers 8
+    python bulk_rescore.py history.parquet rescored/ --chunk-size 200000 --rules candidate_rules.json
+    pd.read_parquet("rescored/")   # the whole result as one DataFrame
+
+Velocity needs per-user history in arrival order, which independent chunks
+do not have, so the velocity rule never fires here (use stream_scoring.py).
+"""
+import argparse
+import csv
+import hashlib
+import itertools
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+import model_bundle
+import scoring
+from fraud_rules import FEATURE_COLUMNS, RuleEngine
+
+CHECKPOINT_FILE = "_checkpoint.json"
+
+# Passed through from input to output when present
+META_COLUMNS = ("txn_id", "user_id", "Class")
+
+
+# --------------------------------------
+# INPUT CHUNKS
+# --------------------------------------
+def _input_columns(path):
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(path).schema_arrow.names
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def iter_chunks(path, chunk_size, skip_chunks=0):
+    """
+    Yields (chunk_id, DataFrame) with FEATURE_COLUMNS plus any META_COLUMNS.
+    The first `skip_chunks` chunks are skipped without being parsed (CSV)
+    or decoded into DataFrames (Parquet).
+    """
+    columns = _input_columns(path)
+    missing = [c for c in FEATURE_COLUMNS if c not in columns]
+    if missing:
+        raise ValueError(f"{path} is missing columns {missing}")
+    usecols = FEATURE_COLUMNS + [c for c in META_COLUMNS if c in columns]
+
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        batches = pq.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=usecols)
+        for chunk_id, batch in enumerate(batches):
+            if chunk_id >= skip_chunks:
+                yield chunk_id, batch.to_pandas()
+        return
+
+    with open(path, newline="") as f:
+        header = next(csv.reader([f.readline()]))
+        # Skipped rows are only scanned for line ends, never tokenized
+        for _ in itertools.islice(f, skip_chunks * chunk_size):
+            pass
+        reader = pd.read_csv(
+            f,
+            header=None,
+            names=header,
+            usecols=usecols,
+            chunksize=chunk_size,
+            dtype={c: np.float64 for c in FEATURE_COLUMNS}
+        )
+        for chunk_id, df in enumerate(reader, start=skip_chunks):
+            yield chunk_id, df
+
+
+# --------------------------------------
+# WORKERS
+# --------------------------------------
+_worker = {}
+
+
+def _init_worker(bundle_path, rules_path, threads):
+    # Once per process: models and rules stay loaded for every chunk it scores
+    components, _ = scoring.load_components(bundle_path)
+    components["xgb"]["booster"].set_param({"nthread": threads})
+    _worker["components"] = components
+    _worker["rule_engine"] = RuleEngine(rules_path)
+
+
+def score_chunk(df, components, rule_engine, first_row=0):
+    """Scores one chunk; returns the output DataFrame (same row order)."""
+    X = df[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+    result = scoring.score_matrix(X, components, rule_engine)
+
+    out = pd.DataFrame({"row": np.arange(first_row, first_row + len(df), dtype=np.int64)})
+    for col in META_COLUMNS:
+        if col in df:
+            out[col] = df[col].to_numpy()
+    out["xgb_score"] = result["xgb"]
+    out["iso_score"] = result["iso"]
+    out["rule_score"] = result["rules"]
+    out["risk_score"] = result["risk"]
+    out["decision"] = result["decision"]
+    for key, flags in result["rule_flags"].items():
+        out[key] = flags
+    return out
+
+
+def _score_and_write(chunk_id, df, first_row, output_dir):
+    out = score_chunk(df, _worker["components"], _worker["rule_engine"], first_row)
+
+    # Written under a hidden temporary name so a killed run never leaves a half
+    # part behind (Parquet readers skip files starting with "." or "_")
+    name = f"part-{chunk_id:06d}.parquet"
+    tmp_path = os.path.join(output_dir, f".{name}.tmp")
+    out.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, os.path.join(output_dir, name))
+    return chunk_id, len(out), out["decision"].value_counts().to_dict()
+
+
+# --------------------------------------
+# CHECKPOINT
+# --------------------------------------
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def run_parameters(input_path, chunk_size, bundle_path, rules_path):
+    """Everything a completed chunk depends on; a resume must match it exactly."""
+    stat = os.stat(input_path)
+    if model_bundle.bundle_exists(bundle_path):
+        model_version = model_bundle.read_manifest(bundle_path)["model_version"]
+    else:
+        model_version = "legacy:" + _file_sha256("model.pkl")[:16]
+    return {
+        "input": os.path.abspath(input_path),
+        "input_size": stat.st_size,
+        "input_mtime": stat.st_mtime,
+        "chunk_size": chunk_size,
+        "model_version": model_version,
+        "rules_sha256": _file_sha256(rules_path) if os.path.exists(rules_path) else None,
+    }
+
+
+def load_checkpoint(output_dir, params, overwrite=False):
+    """Completed chunk ids of a previous run with the same parameters."""
+    path = os.path.join(output_dir, CHECKPOINT_FILE)
+    if not os.path.exists(path):
+        return set()
+    with open(path) as f:
+        checkpoint = json.load(f)
+    if checkpoint["params"] != params:
+        if not overwrite:
+            raise ValueError(
+                f"{output_dir} holds a run with different parameters; "
+                "use a new output directory or --overwrite"
+            )
+        for name in os.listdir(output_dir):
+            if name.startswith("part-"):
+                os.remove(os.path.join(output_dir, name))
+        return set()
+    # Trust only parts that actually made it to disk
+    return {c for c in checkpoint["completed"]
+            if os.path.exists(os.path.join(output_dir, f"part-{c:06d}.parquet"))}
+
+
+def save_checkpoint(output_dir, params, completed):
+    path = os.path.join(output_dir, CHECKPOINT_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump({"params": params, "completed": sorted(completed)}, f)
+    os.replace(path + ".tmp", path)
+
+
+# --------------------------------------
+# DRIVER
+# --------------------------------------
+def rescore(input_path, output_dir, chunk_size=100_000, workers=None, bundle_path=model_bundle.DEFAULT_BUNDLE_PATH,
+            rules_path="fraud_rules.json", threads_per_worker=1, overwrite=False):
+    """
+    Re-scores `input_path` into a Parquet dataset at `output_dir`, resuming a
+    previous run with the same parameters. Returns a summary dict.
+    """
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(output_dir, exist_ok=True)
+
+    params = run_parameters(input_path, chunk_size, bundle_path, rules_path)
+    completed = load_checkpoint(output_dir, params, overwrite)
+    save_checkpoint(output_dir, params, completed)
+
+    # Leading completed chunks are skipped before parsing; later gaps are skipped per chunk
+    skip = 0
+    while skip in completed:
+        skip += 1
+
+    started = time.perf_counter()
+    rows = 0
+    decisions = Counter()
+    max_in_flight = workers * 2
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(bundle_path, rules_path, threads_per_worker)
+    ) as pool:
+        in_flight = set()
+
+        def collect(done):
+            nonlocal rows
+            for future in done:
+                chunk_id, n, counts = future.result()
+                completed.add(chunk_id)
+                rows += n
+                decisions.update(counts)
+            save_checkpoint(output_dir, params, completed)
+
+        for chunk_id, df in iter_chunks(input_path, chunk_size, skip):
+            if chunk_id in completed:
+                continue
+            # Backpressure: never read further ahead than the pool can absorb
+            if len(in_flight) >= max_in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(done)
+            in_flight.add(pool.submit(_score_and_write, chunk_id, df, chunk_id * chunk_size, output_dir))
+
+        if in_flight:
+            done, _ = wait(in_flight)
+            collect(done)
+
+    elapsed = time.perf_counter() - started
+    return {
+        "rows_scored": rows,
+        "chunks": len(completed),
+        "decisions": dict(decisions),
+        "elapsed_s": round(elapsed, 3),
+        "rows_per_s": round(rows / elapsed, 1) if elapsed > 0 else 0.0,
+        "model_version": params["model_version"],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-score a CSV/Parquet file of transactions in parallel")
+    parser.add_argument("input", help="creditcard.csv-layout CSV or a Parquet file")
+    parser.add_argument("output", help="Output directory (Parquet dataset + checkpoint)")
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=None, help="Processes (default: cpu_count)")
+    parser.add_argument("--threads-per-worker", type=int, default=1, help="XGBoost threads per process")
+    parser.add_argument("--bundle", default=model_bundle.DEFAULT_BUNDLE_PATH)
+    parser.add_argument("--rules", default="fraud_rules.json")
+    parser.add_argument("--overwrite", action="store_true",
+                        help="Discard a previous run in OUTPUT made with different parameters")
+    args = parser.parse_args(argv)
+
+    summary = rescore(
+        args.input, args.output,
+        chunk_size=args.chunk_size,
+        workers=args.workers,
+        bundle_path=args.bundle,
+        rules_path=args.rules,
+        threads_per_worker=args.threads_per_worker,
+        overwrite=args.overwrite
+    )
+    print(json.dumps(summary, indent=2))
+    return summary
+
+
+if __name__ == "__main__":
+    main()
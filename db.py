@@ -0,0 +1,171 @@
+import os
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+import psycopg2
+import psycopg2.extras
+import psycopg2.pool
+
+load_dotenv()
+
+# --------------------------------------
+# CONFIGURATION
+# --------------------------------------
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))
+
+_pool = None
+_pool_lock = threading.Lock()
+# getconn() raises instead of waiting when the pool is empty, so callers queue here
+_slots = threading.BoundedSemaphore(DB_POOL_MAX)
+_executor = None
+# Pool usage, read by the /metrics endpoint
+_usage_lock = threading.Lock()
+_in_use = 0
+_waiting = 0
+
+
+# --------------------------------------
+# CONNECTION POOL
+# --------------------------------------
+def init_pool(pool=None):
+    """
+    Opens the process-wide connection pool on first use.
+
+    Args:
+        pool (optional): Any object with getconn()/putconn()/closeall(), e.g. an
+            in-process stand-in for tests. Replaces the current pool.
+    """
+    global _pool
+    with _pool_lock:
+        if pool is not None:
+            _pool = pool
+        elif _pool is None:
+            _pool = psycopg2.pool.ThreadedConnectionPool(
+                DB_POOL_MIN,
+                DB_POOL_MAX,
+                host=os.getenv("DB_HOST"),
+                database=os.getenv("DB_NAME"),
+                user=os.getenv("DB_USER"),
+                password=os.getenv("DB_PASSWORD")
+            )
+        return _pool
+
+
+def close_pool():
+    """Closes all pooled connections and the DB executor (graceful shutdown)."""
+    global _pool, _executor
+    with _pool_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+
+def _reset_after_fork():
+    # A forked worker must never reuse the parent's sockets or threads:
+    # drop the inherited pool/executor (without closing them) and open fresh ones lazily
+    global _pool, _pool_lock, _slots, _executor, _usage_lock, _in_use, _waiting
+    _pool = None
+    _executor = None
+    _pool_lock = threading.Lock()
+    _slots = threading.BoundedSemaphore(DB_POOL_MAX)
+    _usage_lock = threading.Lock()
+    _in_use = 0
+    _waiting = 0
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+@contextmanager
+def connection():
+    """Borrows a pooled connection; commits on success and rolls back on error."""
+    global _in_use, _waiting
+    pool = _pool or init_pool()
+    with _usage_lock:
+        _waiting += 1
+    _slots.acquire()
+    with _usage_lock:
+        _waiting -= 1
+        _in_use += 1
+    try:
+        conn = pool.getconn()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            pool.putconn(conn)
+    finally:
+        with _usage_lock:
+            _in_use -= 1
+        _slots.release()
+
+
+def pool_usage():
+    """Connections checked out, callers waiting for one, and the pool size."""
+    return {"in_use": _in_use, "waiting": _waiting, "max": DB_POOL_MAX}
+
+
+# --------------------------------------
+# QUERY HELPERS
+# --------------------------------------
+def execute_query(query, params=None):
+    with connection() as conn:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute(query, params)
+            return cur.fetchall() if cur.description else None
+
+
+def execute_values_query(query, rows, template=None):
+    """Multi-row INSERT of `rows` in a single round trip and commit."""
+    with connection() as conn:
+        with conn.cursor() as cur:
+            psycopg2.extras.execute_values(cur, query, rows, template=template)
+
+
+def execute_transaction(statements):
+    """Runs a list of (query, params) statements in one transaction with a single commit."""
+    with connection() as conn:
+        with conn.cursor() as cur:
+            for query, params in statements:
+                cur.execute(query, params)
+
+
+# --------------------------------------
+# ASYNC WRAPPERS
+# --------------------------------------
+def _get_executor():
+    # One thread per pool slot, so async callers never wait on a blocked event loop
+    global _executor
+    with _pool_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=DB_POOL_MAX, thread_name_prefix="db")
+        return _executor
+
+
+async def run_in_db_executor(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), functools.partial(fn, *args, **kwargs))
+
+
+async def aexecute_query(query, params=None):
+    return await run_in_db_executor(execute_query, query, params)
+
+
+async def aexecute_values_query(query, rows, template=None):
+    return await run_in_db_executor(execute_values_query, query, rows, template)
+
+
+async def aexecute_transaction(statements):
+    return await run_in_db_executor(execute_transaction, statements)
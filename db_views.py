@@ -0,0 +1,136 @@
+"""
+Reads behind the DB view endpoints (/transactions, /decisions): keyset
+pagination and NDJSON export.
+
+Rows are ordered newest first by (time column, txn_id). A page cursor is the
+(time, txn_id) of the last row served, so every page is one range scan of
+the indexes in migrations/001_keyset_indexes.sql, however deep the client
+pages. Exports run through a server-side (named) cursor and are streamed in
+fetch-size slices, so memory stays flat whatever the result size.
+"""
+import base64
+import json
+from datetime import datetime
+from decimal import Decimal
+
+import psycopg2.extras
+
+import db
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+EXPORT_FETCH_SIZE = 2000
+
+# Filters that live on the other table join it: decisions have no user_id,
+# raw transactions have no decision
+VIEWS = {
+    "transactions": {
+        "table": "fraud.transactions_raw t",
+        "alias": "t",
+        "time": "timestamp",
+        "join": {"decision": "JOIN fraud.decisions d ON d.txn_id = t.txn_id"},
+    },
+    "decisions": {
+        "table": "fraud.decisions d",
+        "alias": "d",
+        "time": "decision_time",
+        "join": {"user_id": "JOIN fraud.transactions_raw t ON t.txn_id = d.txn_id"},
+    },
+}
+
+
+def encode_cursor(row, view):
+    """Opaque page cursor for the row a page ended on."""
+    ts = row[VIEWS[view]["time"]]
+    value = json.dumps([ts.isoformat() if isinstance(ts, datetime) else ts, row["txn_id"]])
+    return base64.urlsafe_b64encode(value.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Returns (time, txn_id); raises ValueError for a malformed cursor."""
+    try:
+        ts, txn_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(ts), str(txn_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor {cursor!r}") from e
+
+
+def build_query(view, cursor=None, decision=None, user_id=None, since=None, until=None, limit=None):
+    """
+    SQL and params for one page (or, without `limit`, the whole export) of `view`.
+
+    Args:
+        cursor (str, optional): next_cursor of the previous page.
+        decision (str, optional): ALLOW | REVIEW | BLOCK.
+        user_id (str, optional): Only this user's transactions.
+        since, until (datetime, optional): Time range [since, until).
+        limit (int, optional): Page size.
+    """
+    spec = VIEWS[view]
+    alias = spec["alias"]
+    time_col = f"{alias}.{spec['time']}"
+
+    joins, where, params = [], [], []
+    if decision is not None:
+        joins.append(spec["join"].get("decision", ""))
+        where.append("d.decision = %s")
+        params.append(decision)
+    if user_id is not None:
+        joins.append(spec["join"].get("user_id", ""))
+        where.append("t.user_id = %s")
+        params.append(user_id)
+    if since is not None:
+        where.append(f"{time_col} >= %s")
+        params.append(since)
+    if until is not None:
+        where.append(f"{time_col} < %s")
+        params.append(until)
+    if cursor is not None:
+        # Row-value comparison: Postgres turns it into an index range scan
+        where.append(f"({time_col}, {alias}.txn_id) < (%s, %s)")
+        params.extend(decode_cursor(cursor))
+
+    sql = f"SELECT {alias}.* FROM {spec['table']}"
+    sql += "".join(f" {j}" for j in joins if j)
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY {time_col} DESC, {alias}.txn_id DESC"
+    if limit is not None:
+        sql += " LIMIT %s"
+        params.append(limit)
+    return sql, params
+
+
+def fetch_page(view, limit=DEFAULT_PAGE_SIZE, **filters):
+    """Returns (rows, next_cursor); next_cursor is None on the last page."""
+    # One extra row tells whether another page follows
+    sql, params = build_query(view, limit=limit + 1, **filters)
+    rows = db.execute_query(sql, params) or []
+    if len(rows) > limit:
+        return rows[:limit], encode_cursor(rows[limit - 1], view)
+    return rows, None
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
+
+def iter_ndjson(sql, params, fetch_size=EXPORT_FETCH_SIZE):
+    """
+    Streams the rows of `sql` as NDJSON chunks (one per fetch) through a named
+    cursor; only one chunk is held in memory. Holds one pooled connection
+    until the export is finished or the client disconnects.
+    """
+    with db.connection() as conn:
+        with conn.cursor(name="ndjson_export", cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.itersize = fetch_size
+            cur.execute(sql, params)
+            while True:
+                rows = cur.fetchmany(fetch_size)
+                if not rows:
+                    break
+                yield "".join(json.dumps(row, default=_json_default) + "\n" for row in rows)
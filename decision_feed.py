@@ -0,0 +1,240 @@
+import asyncio
+import json
+import os
+import threading
+import traceback
+from collections import deque
+
+
+class FeedSubscriber:
+    """
+    One live-feed consumer: its filters and a bounded backlog of matching events.
+
+    offer() may be called from any thread (the batch endpoint scores in the
+    threadpool); the subscriber's event loop is woken at most once per drain.
+    When the backlog is full the oldest events are dropped and counted, so a
+    slow consumer costs bounded memory and learns how much it missed.
+    """
+
+    def __init__(self, loop, decisions=None, min_risk=0.0, max_backlog=256):
+        self.decisions = frozenset(decisions) if decisions else None
+        self.min_risk = min_risk
+        self.max_backlog = max_backlog
+
+        self._loop = loop
+        self._wake = asyncio.Event()
+        self._backlog = deque()
+        self._lock = threading.Lock()
+        self._wake_pending = False
+        self.dropped = 0
+
+    def wants(self, event):
+        if self.decisions is not None and event["decision"] not in self.decisions:
+            return False
+        return event["risk_score"] >= self.min_risk
+
+    def offer(self, event):
+        with self._lock:
+            if len(self._backlog) >= self.max_backlog:
+                self._backlog.popleft()
+                self.dropped += 1
+            self._backlog.append(event)
+            wake = not self._wake_pending
+            self._wake_pending = True
+        if wake:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def next_batch(self, timeout=None):
+        """
+        Waits for events and returns (events, dropped) accumulated since the
+        last call, or ([], 0) after `timeout` seconds without any.
+        """
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout)
+        except asyncio.TimeoutError:
+            return [], 0
+        self._wake.clear()
+        with self._lock:
+            events = list(self._backlog)
+            self._backlog.clear()
+            dropped, self.dropped = self.dropped, 0
+            self._wake_pending = False
+        return events, dropped
+
+
+class DecisionFeed:
+    """
+    Fan-out of scored decisions to live subscribers (Server-Sent Events).
+
+    Scoring publishes each decision once; every subscriber gets the ones its
+    filters match. Dashboards watch decisions this way instead of polling the
+    decisions table, so they cost the database nothing.
+
+    Fan-out is per process. With a `bus` (RedisFeedBus) events are published
+    to a shared channel and every process fans out what it receives, so a
+    subscriber sees the decisions of all serve.py workers. Without one, a
+    subscriber only sees its own worker's decisions; create_decision_feed()
+    refuses subscribers in that case when more than one worker runs.
+
+    Args:
+        max_subscribers (int): Concurrent subscribers allowed.
+        max_backlog (int): Undelivered events kept per subscriber.
+        flush_interval_ms (float): Minimum gap between two frames to one
+            subscriber; events arriving meanwhile are coalesced into the next frame.
+        heartbeat_sec (float): Idle time after which a keep-alive comment is sent.
+        bus: Shared channel (RedisFeedBus) relaying events between processes.
+        disabled (str): When set, subscribe() refuses with this reason.
+    """
+
+    def __init__(self, max_subscribers=100, max_backlog=256, flush_interval_ms=250, heartbeat_sec=15,
+                 bus=None, disabled=None):
+        self.max_subscribers = max_subscribers
+        self.max_backlog = max_backlog
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.heartbeat = heartbeat_sec
+        self.bus = bus
+        self.disabled = disabled
+
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self.published = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self._subscribers)
+
+    def start(self):
+        """Starts relaying from the bus; call in each worker, after the fork."""
+        if self.bus is not None:
+            self.bus.start(self._fan_out)
+
+    def stop(self):
+        if self.bus is not None:
+            self.bus.stop()
+
+    def subscribe(self, decisions=None, min_risk=0.0):
+        """Registers a subscriber on the running loop; raises RuntimeError when full or disabled."""
+        if self.disabled:
+            raise RuntimeError(self.disabled)
+        subscriber = FeedSubscriber(asyncio.get_running_loop(), decisions, min_risk, self.max_backlog)
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                raise RuntimeError(f"Decision feed is full ({self.max_subscribers} subscribers)")
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+            self.dropped += subscriber.dropped
+
+    def publish(self, events):
+        """Offers decision events (dicts with at least decision and risk_score) to every subscriber."""
+        with self._lock:
+            self.published += len(events)
+        if self.bus is not None:
+            self.bus.publish(events)
+        else:
+            self._fan_out(events)
+
+    def _fan_out(self, events):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            for event in events:
+                if subscriber.wants(event):
+                    try:
+                        subscriber.offer(event)
+                    except RuntimeError:
+                        # Its event loop is gone
+                        self.unsubscribe(subscriber)
+                        break
+
+    async def sse(self, subscriber):
+        """
+        Server-Sent Events stream for one subscriber: one `decisions` frame per
+        flush with {"events": [...], "dropped": n}. Unsubscribes when the client
+        goes away (the response task is cancelled).
+        """
+        try:
+            yield "retry: 2000\n\n"
+            while True:
+                events, dropped = await subscriber.next_batch(self.heartbeat)
+                if not events and not dropped:
+                    yield ": keep-alive\n\n"
+                    continue
+                with self._lock:
+                    self.dropped += dropped
+                yield f"event: decisions\ndata: {json.dumps({'events': events, 'dropped': dropped})}\n\n"
+                if self.flush_interval:
+                    await asyncio.sleep(self.flush_interval)
+        finally:
+            self.unsubscribe(subscriber)
+
+    def stats(self):
+        return {"subscribers": len(self), "published": self.published, "dropped": self.dropped}
+
+
+class RedisFeedBus:
+    """
+    Relays feed events between processes over a Redis pub/sub channel, with
+    any client exposing the redis-py API (publish/pubsub). Each process
+    listens on its own thread and fans received events out locally.
+    """
+
+    def __init__(self, client, channel="fraud:decision_feed"):
+        self.client = client
+        self.channel = channel
+        self._pubsub = None
+        self._thread = None
+
+    def publish(self, events):
+        self.client.publish(self.channel, json.dumps(events))
+
+    def start(self, deliver):
+        self._pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(self.channel)
+        self._thread = threading.Thread(target=self._listen, args=(self._pubsub, deliver),
+                                        name="decision-feed", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        pubsub, self._pubsub = self._pubsub, None
+        if pubsub is not None:
+            pubsub.close()
+
+    def _listen(self, pubsub, deliver):
+        try:
+            for message in pubsub.listen():
+                if message["type"] == "message":
+                    deliver(json.loads(message["data"]))
+        except Exception:
+            # Closed on shutdown, or the connection dropped
+            if self._pubsub is pubsub:
+                traceback.print_exc()
+
+
+def create_decision_feed():
+    """
+    Builds the feed from DECISION_FEED_* environment variables.
+    DECISION_FEED_BACKEND=redis shares events between workers through REDIS_URL;
+    with the default (memory) and WEB_CONCURRENCY > 1 (set by serve.py) the
+    feed refuses subscribers, since each would only see one worker's traffic.
+    """
+    backend = os.getenv("DECISION_FEED_BACKEND", "memory")
+    bus = disabled = None
+    if backend == "redis":
+        import redis
+        bus = RedisFeedBus(redis.Redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0")))
+    elif int(os.getenv("WEB_CONCURRENCY", "1")) > 1:
+        disabled = ("Decision feed is per worker; set DECISION_FEED_BACKEND=redis "
+                    "to stream decisions with more than one worker")
+
+    return DecisionFeed(
+        max_subscribers=int(os.getenv("DECISION_FEED_MAX_SUBSCRIBERS", "100")),
+        max_backlog=int(os.getenv("DECISION_FEED_MAX_BACKLOG", "256")),
+        flush_interval_ms=float(os.getenv("DECISION_FEED_FLUSH_MS", "250")),
+        heartbeat_sec=float(os.getenv("DECISION_FEED_HEARTBEAT_SEC", "15")),
+        bus=bus,
+        disabled=disabled
+    )
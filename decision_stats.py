@@ -0,0 +1,421 @@
+"""
+Pre-aggregated decision statistics, maintained by the scoring path in process.
+
+Every scored transaction updates a few counters per window, so /stats never
+scans fraud.decisions and costs the same at any traffic volume:
+
+- counts per decision,
+- a risk-score histogram,
+- hit rates per rule (from rule_details),
+- amount sum and quantiles from a log-bucketed sketch (DDSketch-style:
+  every quantile is within `relative_accuracy` of the true value).
+
+Each window (1 min, 1 h, 1 day) is kept twice:
+- sliding: the last N seconds, as a ring of 60 buckets plus a running total
+  from which expired buckets are subtracted;
+- tumbling: the current UTC-aligned period, plus the last completed one.
+
+A background thread upserts the tumbling aggregates into fraud.decision_stats
+(migrations/002_decision_stats.sql), one row per window, period and worker.
+Under serve.py every worker keeps its own aggregates; fleet_snapshot() merges
+this worker's live tumbling windows with the other workers' latest checkpoints.
+"""
+import json
+import math
+import os
+import socket
+import threading
+import time
+import traceback
+from datetime import datetime, timezone
+
+import db
+
+WINDOWS = {"1m": 60, "1h": 3600, "1d": 86400}
+RISK_BINS = 20
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class QuantileSketch:
+    """
+    Log-bucketed histogram of positive values. Bucket k holds values in
+    (gamma^(k-1), gamma^k], so counts can be merged and subtracted exactly,
+    and the bucket count grows only with log(max / min).
+    """
+
+    __slots__ = ("relative_accuracy", "gamma", "_log_gamma", "bins", "zero", "count")
+
+    def __init__(self, relative_accuracy=0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins = {}
+        self.zero = 0
+        self.count = 0
+
+    def add(self, value, n=1):
+        if value <= 0:
+            self.zero += n
+        else:
+            k = math.ceil(math.log(value) / self._log_gamma)
+            self.bins[k] = self.bins.get(k, 0) + n
+        self.count += n
+
+    def merge(self, other, sign=1):
+        for k, c in other.bins.items():
+            c = self.bins.get(k, 0) + sign * c
+            if c:
+                self.bins[k] = c
+            else:
+                self.bins.pop(k, None)
+        self.zero += sign * other.zero
+        self.count += sign * other.count
+
+    def quantile(self, q):
+        if self.count <= 0:
+            return None
+        rank = q * (self.count - 1)
+        cumulative = self.zero
+        if rank < cumulative:
+            return 0.0
+        for k in sorted(self.bins):
+            cumulative += self.bins[k]
+            if cumulative > rank:
+                # Midpoint of the bucket (in relative terms)
+                return 2 * self.gamma ** k / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.bins) / (self.gamma + 1)
+
+
+class Aggregate:
+    """Counters of one bucket or window; mergeable and subtractable."""
+
+    __slots__ = ("count", "decisions", "risk_hist", "rule_hits", "amount_sum", "amounts")
+
+    def __init__(self, relative_accuracy=0.01):
+        self.count = 0
+        self.decisions = {}
+        self.risk_hist = [0] * RISK_BINS
+        self.rule_hits = {}
+        self.amount_sum = 0.0
+        self.amounts = QuantileSketch(relative_accuracy)
+
+    def add(self, decision, risk_score, amount, rule_details):
+        self.count += 1
+        self.decisions[decision] = self.decisions.get(decision, 0) + 1
+        self.risk_hist[min(max(int(risk_score * RISK_BINS), 0), RISK_BINS - 1)] += 1
+        for rule, hit in rule_details.items():
+            self.rule_hits[rule] = self.rule_hits.get(rule, 0) + int(hit)
+        self.amount_sum += amount
+        self.amounts.add(amount)
+
+    def merge(self, other, sign=1):
+        self.count += sign * other.count
+        for decision, n in other.decisions.items():
+            self.decisions[decision] = self.decisions.get(decision, 0) + sign * n
+        for i, n in enumerate(other.risk_hist):
+            self.risk_hist[i] += sign * n
+        for rule, n in other.rule_hits.items():
+            self.rule_hits[rule] = self.rule_hits.get(rule, 0) + sign * n
+        self.amount_sum += sign * other.amount_sum
+        self.amounts.merge(other.amounts, sign)
+
+    def summary(self):
+        n = self.count
+        return {
+            "count": n,
+            "decisions": {d: c for d, c in self.decisions.items() if c},
+            "flagged_rate": (self.decisions.get("REVIEW", 0) + self.decisions.get("BLOCK", 0)) / n if n else 0.0,
+            "risk_histogram": {"bin_width": 1 / RISK_BINS, "counts": list(self.risk_hist)},
+            "rule_hit_rates": {rule: hits / n for rule, hits in self.rule_hits.items()} if n else {},
+            "amount": {
+                "sum": self.amount_sum if n else 0.0,
+                **{f"p{round(q * 100)}": self.amounts.quantile(q) for q in QUANTILES},
+            },
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        """Inverse of to_state()."""
+        aggregate = cls(state.get("relative_accuracy", 0.01))
+        aggregate.count = state["count"]
+        aggregate.decisions = dict(state["decisions"])
+        aggregate.risk_hist = list(state["risk_hist"])
+        aggregate.rule_hits = dict(state["rule_hits"])
+        aggregate.amount_sum = state["amount_sum"]
+        aggregate.amounts.bins = {int(k): c for k, c in state["amount_bins"].items()}
+        aggregate.amounts.zero = state["amount_zero"]
+        aggregate.amounts.count = aggregate.amounts.zero + sum(aggregate.amounts.bins.values())
+        return aggregate
+
+    def to_state(self):
+        return {
+            "count": self.count,
+            "decisions": self.decisions,
+            "risk_hist": self.risk_hist,
+            "rule_hits": self.rule_hits,
+            "amount_sum": self.amount_sum,
+            "amount_bins": {str(k): c for k, c in self.amounts.bins.items()},
+            "amount_zero": self.amounts.zero,
+            "relative_accuracy": self.amounts.relative_accuracy,
+        }
+
+
+class SlidingWindow:
+    """The last `seconds` seconds, as `n_buckets` ring buckets plus a running total."""
+
+    def __init__(self, seconds, n_buckets=60, relative_accuracy=0.01):
+        self.seconds = seconds
+        self.n_buckets = n_buckets
+        self.width = seconds / n_buckets
+        self.relative_accuracy = relative_accuracy
+        self.buckets = [None] * n_buckets
+        self.bucket_ids = [None] * n_buckets
+        self.total = Aggregate(relative_accuracy)
+
+    def _bucket(self, now):
+        bucket_id = int(now // self.width)
+        slot = bucket_id % self.n_buckets
+        if self.bucket_ids[slot] != bucket_id:
+            # The slot last held a bucket one full window ago: retire it
+            if self.buckets[slot] is not None:
+                self.total.merge(self.buckets[slot], -1)
+            self.buckets[slot] = Aggregate(self.relative_accuracy)
+            self.bucket_ids[slot] = bucket_id
+        return self.buckets[slot]
+
+    def add(self, now, decision, risk_score, amount, rule_details):
+        self._bucket(now).add(decision, risk_score, amount, rule_details)
+        self.total.add(decision, risk_score, amount, rule_details)
+
+    def expire(self, now):
+        oldest = int(now // self.width) - self.n_buckets + 1
+        for slot, bucket_id in enumerate(self.bucket_ids):
+            if bucket_id is not None and bucket_id < oldest:
+                self.total.merge(self.buckets[slot], -1)
+                self.buckets[slot] = None
+                self.bucket_ids[slot] = None
+
+
+class TumblingWindow:
+    """The current UTC-aligned period of `seconds`, plus the last completed one."""
+
+    def __init__(self, seconds, relative_accuracy=0.01):
+        self.seconds = seconds
+        self.relative_accuracy = relative_accuracy
+        self.period = None
+        self.current = Aggregate(relative_accuracy)
+        self.previous = None
+
+    def roll(self, now):
+        period = int(now // self.seconds)
+        if period != self.period:
+            if self.period is not None:
+                # Only the period right before the current one counts as "previous"
+                self.previous = (self.period, self.current) if period == self.period + 1 else None
+            self.period = period
+            self.current = Aggregate(self.relative_accuracy)
+
+    def add(self, now, decision, risk_score, amount, rule_details):
+        self.roll(now)
+        self.current.add(decision, risk_score, amount, rule_details)
+
+    def start(self, period):
+        return datetime.fromtimestamp(period * self.seconds, timezone.utc)
+
+
+class DecisionStats:
+    """
+    Sliding and tumbling aggregates over `windows`, updated in O(1) per decision.
+
+    Args:
+        windows (dict): Window name -> length in seconds.
+        n_buckets (int): Ring buckets per sliding window (its time resolution).
+        relative_accuracy (float): Amount quantile accuracy.
+    """
+
+    def __init__(self, windows=WINDOWS, n_buckets=60, relative_accuracy=0.01):
+        self.sliding = {name: SlidingWindow(sec, n_buckets, relative_accuracy) for name, sec in windows.items()}
+        self.tumbling = {name: TumblingWindow(sec, relative_accuracy) for name, sec in windows.items()}
+        self._lock = threading.Lock()
+
+    def record(self, decision, risk_score, amount, rule_details, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            for window in self.sliding.values():
+                window.add(now, decision, risk_score, amount, rule_details)
+            for window in self.tumbling.values():
+                window.add(now, decision, risk_score, amount, rule_details)
+
+    def record_many(self, decisions, risk_scores, amounts, rule_flags, now=None):
+        """Batch form; rule_flags maps rule name -> per-row 0/1 array (as from evaluate_many)."""
+        for i, (decision, risk, amount) in enumerate(zip(decisions, risk_scores, amounts)):
+            self.record(decision, float(risk), float(amount), {k: v[i] for k, v in rule_flags.items()}, now)
+
+    def snapshot(self, now=None):
+        """Summaries of every window; cost independent of traffic."""
+        now = time.time() if now is None else now
+        with self._lock:
+            sliding = {}
+            for name, window in self.sliding.items():
+                window.expire(now)
+                sliding[name] = window.total.summary()
+
+            tumbling = {}
+            for name, window in self.tumbling.items():
+                window.roll(now)
+                tumbling[name] = {
+                    "start": window.start(window.period).isoformat(),
+                    "current": window.current.summary(),
+                    "previous": {
+                        "start": window.start(window.previous[0]).isoformat(),
+                        **window.previous[1].summary(),
+                    } if window.previous is not None else None,
+                }
+        return {"sliding": sliding, "tumbling": tumbling}
+
+    def tumbling_periods(self, now=None):
+        """{(window, period_start): copy of this process's aggregate} for current and previous periods."""
+        now = time.time() if now is None else now
+        periods = {}
+        with self._lock:
+            for name, window in self.tumbling.items():
+                window.roll(now)
+                own = [(window.period, window.current)]
+                if window.previous is not None:
+                    own.append(window.previous)
+                for period in (window.period, window.period - 1):
+                    periods[(name, window.start(period))] = Aggregate(window.relative_accuracy)
+                for period, aggregate in own:
+                    periods[(name, window.start(period))].merge(aggregate)
+        return periods
+
+    def checkpoint_rows(self, now=None):
+        """(window, period_start, state JSON) of every tumbling period worth saving."""
+        now = time.time() if now is None else now
+        rows = []
+        with self._lock:
+            for name, window in self.tumbling.items():
+                window.roll(now)
+                periods = [(window.period, window.current)]
+                if window.previous is not None:
+                    periods.append(window.previous)
+                rows.extend(
+                    (name, window.start(period), json.dumps(aggregate.to_state()))
+                    for period, aggregate in periods if aggregate.count
+                )
+        return rows
+
+
+# --------------------------------------
+# DB CHECKPOINTS
+# --------------------------------------
+UPSERT_STATS_QUERY = """
+    INSERT INTO fraud.decision_stats (window_name, period_start, worker, state, updated_at)
+    VALUES (%s, %s, %s, %s, NOW())
+    ON CONFLICT (window_name, period_start, worker)
+    DO UPDATE SET state = EXCLUDED.state, updated_at = EXCLUDED.updated_at
+"""
+
+
+FLEET_STATS_QUERY = """
+    SELECT window_name, period_start, worker, state FROM fraud.decision_stats
+    WHERE period_start >= %s
+"""
+
+
+def worker_id():
+    """host-pid of this process; read after serve.py forks, so each worker has its own."""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def fleet_snapshot(stats, worker=None, now=None):
+    """
+    Tumbling windows summed over every worker: this process's live aggregates
+    plus the latest fraud.decision_stats row of each other worker (at most one
+    checkpoint interval old). Sliding windows are per worker and not included.
+    """
+    worker = worker or worker_id()
+    periods = stats.tumbling_periods(now)
+    rows = db.execute_query(FLEET_STATS_QUERY, (min(start for _, start in periods),)) or []
+
+    workers = {worker}
+    for row in rows:
+        key = (row["window_name"], row["period_start"])
+        if row["worker"] == worker or key not in periods:
+            continue
+        state = row["state"]
+        periods[key].merge(Aggregate.from_state(json.loads(state) if isinstance(state, str) else state))
+        workers.add(row["worker"])
+
+    tumbling = {}
+    for name in stats.tumbling:
+        (current_start, current), (previous_start, previous) = sorted(
+            ((start, aggregate) for (window, start), aggregate in periods.items() if window == name),
+            reverse=True
+        )
+        tumbling[name] = {
+            "start": current_start.isoformat(),
+            "current": current.summary(),
+            "previous": {"start": previous_start.isoformat(), **previous.summary()} if previous.count else None,
+        }
+    return {"scope": "fleet", "workers": len(workers), "tumbling": tumbling}
+
+
+class StatsCheckpointer:
+    """
+    Background thread that upserts the tumbling aggregates every `interval` seconds.
+    Rows are per worker (host-pid, see worker_id); fleet_snapshot() sums them.
+    """
+
+    def __init__(self, stats, interval=60.0, worker=None):
+        self.stats = stats
+        self.interval = interval
+        self._worker = worker
+        self.checkpoints = 0
+        self.failures = 0
+
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def worker(self):
+        # Not fixed at construction: api builds the checkpointer before serve.py forks
+        return self._worker or worker_id()
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="stats-checkpoint", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        """Stops the thread and writes a final checkpoint."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.checkpoint()
+
+    def checkpoint(self):
+        rows = self.stats.checkpoint_rows()
+        if not rows:
+            return
+        try:
+            db.execute_transaction([
+                (UPSERT_STATS_QUERY, (window, period_start, self.worker, state))
+                for window, period_start, state in rows
+            ])
+            self.checkpoints += 1
+        except Exception:
+            traceback.print_exc()
+            self.failures += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.checkpoint()
+
+
+def create_stats_checkpointer(stats):
+    """Checkpointer every STATS_CHECKPOINT_SEC seconds (default 60), or None when 0."""
+    interval = float(os.getenv("STATS_CHECKPOINT_SEC", "60"))
+    return StatsCheckpointer(stats, interval) if interval > 0 else None
@@ -0,0 +1,104 @@
+import os
+import random
+import threading
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# always   - explain every transaction (previous behaviour)
+# flagged  - only REVIEW / BLOCK decisions
+# sampled  - a random `sample_rate` fraction of transactions
+# deferred - computed in the background, fetched later by txn_id
+EXPLAIN_MODES = ("always", "flagged", "sampled", "deferred")
+
+
+class ExplanationPolicy:
+    """Decides per transaction whether SHAP runs now, later, or not at all."""
+
+    def __init__(self, mode="always", sample_rate=0.1, max_deferred=10000, workers=1, max_queued=64):
+        if mode not in EXPLAIN_MODES:
+            raise ValueError(f"Unknown explanation mode {mode!r}, expected one of {EXPLAIN_MODES}")
+        self.mode = mode
+        self.sample_rate = sample_rate
+        self.deferred = DeferredExplanations(max_deferred, workers, max_queued) if mode == "deferred" else None
+
+    def action(self, decision):
+        """Returns "now", "defer" or "skip" for a transaction with this decision."""
+        if self.mode == "always":
+            return "now"
+        if self.mode == "flagged":
+            return "now" if decision in ("REVIEW", "BLOCK") else "skip"
+        if self.mode == "sampled":
+            return "now" if random.random() < self.sample_rate else "skip"
+        return "defer"
+
+
+class DeferredExplanations:
+    """
+    Bounded txn_id -> explanation store filled by a background executor.
+    Oldest entries are dropped once `max_items` is exceeded, and at most
+    `max_queued` batches wait for (or run on) the executor; beyond that new
+    batches are refused rather than queued without limit.
+    """
+
+    def __init__(self, max_items=10000, workers=1, max_queued=64):
+        self.max_items = max_items
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_queued)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="explain")
+        self.dropped = 0
+
+    def submit(self, txn_ids, explain_fn, *args):
+        """
+        Schedules explain_fn(*args) -> one explanation per txn_id.
+        Returns False (nothing scheduled) when the queue is full.
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.dropped += len(txn_ids)
+            return False
+        with self._lock:
+            for txn_id in txn_ids:
+                self._results[txn_id] = None
+            self._evict()
+        self._executor.submit(self._run, list(txn_ids), explain_fn, args)
+        return True
+
+    def get(self, txn_id):
+        """Returns (status, explanation) with status "ready", "pending" or "unknown"."""
+        with self._lock:
+            if txn_id not in self._results:
+                return "unknown", None
+            explanation = self._results[txn_id]
+        return ("pending", None) if explanation is None else ("ready", explanation)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+    def _run(self, txn_ids, explain_fn, args):
+        try:
+            explanations = explain_fn(*args)
+        except Exception:
+            traceback.print_exc()
+            explanations = [[] for _ in txn_ids]
+        finally:
+            self._slots.release()
+        with self._lock:
+            for txn_id, explanation in zip(txn_ids, explanations):
+                if txn_id in self._results:
+                    self._results[txn_id] = explanation
+
+    def _evict(self):
+        while len(self._results) > self.max_items:
+            self._results.popitem(last=False)
+
+
+def create_explanation_policy():
+    """Builds the policy from EXPLAIN_MODE / EXPLAIN_SAMPLE_RATE / EXPLAIN_MAX_DEFERRED / EXPLAIN_MAX_QUEUED."""
+    return ExplanationPolicy(
+        mode=os.getenv("EXPLAIN_MODE", "always"),
+        sample_rate=float(os.getenv("EXPLAIN_SAMPLE_RATE", "0.1")),
+        max_deferred=int(os.getenv("EXPLAIN_MAX_DEFERRED", "10000")),
+        max_queued=int(os.getenv("EXPLAIN_MAX_QUEUED", "64"))
+    )
@@ -0,0 +1,35 @@
+"""
+Fraud-detection ML pipeline.
+
+    import fraud_pipeline as ml_pipeline
+
+    artifacts = ml_pipeline.run_pipeline(ml_pipeline.PipelineConfig(data_path="creditcard.csv"))
+    scores = ml_pipeline.compute_risk_scores_batch(X, artifacts.components())
+
+Importing the package loads only the inference half (NumPy, pandas, XGBoost);
+the training stack (sklearn model selection, kagglehub, shap, matplotlib) is
+imported on the first run_pipeline call.
+"""
+from .artifacts import PipelineArtifacts
+from .config import PipelineConfig, create_pipeline_config
+from .inference import (
+    FEATURE_COLUMNS,
+    ISO_FEATURE_COLUMNS,
+    N_FEATURES,
+    compute_risk_score,
+    compute_risk_scores_batch,
+    contrib_explain_batch,
+    new_feature_buffer,
+    prepare_components,
+    score_feature_buffer,
+    shap_explain_batch,
+    shap_explain_transaction,
+    top_k_features
+)
+
+
+def run_pipeline(config=None, cache=None):
+    """Trains the models selected by `config`; see training.run_pipeline."""
+    from .training import run_pipeline as _run_pipeline
+
+    return _run_pipeline(config, cache)
@@ -0,0 +1,40 @@
+from . import inference
+
+
+class PipelineArtifacts:
+    """
+    What a training run produces. Consumers use these names, never tuple
+    positions, so stages can be added without breaking callers.
+
+    Attributes:
+        model: Fitted XGBClassifier.
+        scaler: StandardScaler over Amount/Time for the XGBoost features.
+        explainer: shap.TreeExplainer, or None when the config disables it.
+        iso (dict | None): IsolationForest "model", "scaler", "score_min", "score_max".
+        threshold (float): F1-optimal XGBoost threshold tuned by CV on Train.
+        X_test, y_test: Held-out split (DataFrame, Series).
+        stage_keys (dict): Stage name -> cache key, i.e. the lineage of this run.
+    """
+
+    def __init__(self, model, scaler, explainer, iso, threshold, X_test, y_test, stage_keys=None):
+        self.model = model
+        self.scaler = scaler
+        self.explainer = explainer
+        self.iso = iso
+        self.threshold = threshold
+        self.X_test = X_test
+        self.y_test = y_test
+        self.stage_keys = stage_keys or {}
+
+    @property
+    def iso_meta(self):
+        if self.iso is None:
+            return None
+        return {"score_min": self.iso["score_min"], "score_max": self.iso["score_max"]}
+
+    def components(self):
+        """The components dict the inference functions take, prepared for the hot path."""
+        components = {"xgb": {"model": self.model, "scaler": self.scaler}}
+        if self.iso is not None:
+            components["iso"] = dict(self.iso)
+        return inference.prepare_components(components)
@@ -0,0 +1,138 @@
+"""
+On-disk cache for the stages of the training pipeline.
+
+Each stage's output lives in <root>/<stage>/<key>/, where the key hashes the
+stage name, its parameters and the keys of the stages it consumes. Changing
+one stage's parameters therefore only invalidates that stage and the stages
+downstream of it; everything else is read back from disk:
+
+    raw -> columnar -> split -> scaler -> cv_threshold -> xgb -> explainer
+                             \\-> iso
+
+(xgb reads cv_threshold only in the "fast" training mode, for its round count.)
+
+Arrays are stored as .npy, tables as Parquet, small results as JSON and
+fitted models in their own formats (XGBoost UBJSON, joblib for sklearn).
+"""
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+CACHE_FORMAT_VERSION = 1
+DEFAULT_CACHE_DIR = os.getenv("PIPELINE_CACHE_DIR", ".pipeline_cache")
+
+DONE_FILE = "_done.json"
+SOURCE_FILE = "source.json"
+
+
+def stage_key(stage, params, inputs=()):
+    """16-hex-digit hash of a stage, its parameters and its input stage keys."""
+    payload = json.dumps(
+        {"format": CACHE_FORMAT_VERSION, "stage": stage, "params": params, "inputs": list(inputs)},
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def file_fingerprint(path):
+    """Identity of an input file without hashing all of it (path, size, mtime)."""
+    stat = os.stat(path)
+    return {"path": os.path.abspath(path), "size": stat.st_size, "mtime": stat.st_mtime}
+
+
+# --------------------------------------
+# SERIALIZERS
+# --------------------------------------
+def save_arrays(arrays, path):
+    for name, value in arrays.items():
+        np.save(os.path.join(path, f"{name}.npy"), np.asarray(value), allow_pickle=False)
+
+
+def load_arrays(path):
+    return {
+        name[:-len(".npy")]: np.load(os.path.join(path, name), allow_pickle=False)
+        for name in os.listdir(path) if name.endswith(".npy")
+    }
+
+
+def save_json(value, path, name="result.json"):
+    with open(os.path.join(path, name), "w") as f:
+        json.dump(value, f, indent=2)
+
+
+def load_json(path, name="result.json"):
+    with open(os.path.join(path, name)) as f:
+        return json.load(f)
+
+
+# --------------------------------------
+# CACHE
+# --------------------------------------
+class StageCache:
+    """
+    Runs pipeline stages through the on-disk cache.
+
+    Args:
+        root (str): Cache directory.
+        enabled (bool): False recomputes every stage and writes nothing.
+    """
+
+    def __init__(self, root=DEFAULT_CACHE_DIR, enabled=True):
+        self.root = root
+        self.enabled = enabled
+        # stage -> {"key", "cached", "seconds"} for the current run
+        self.report = {}
+
+    def stage_dir(self, stage, key):
+        return os.path.join(self.root, stage, key)
+
+    def run(self, stage, params, inputs, compute, save, load):
+        """
+        Returns (value, key): loaded from the cache when this exact stage has
+        run before, otherwise computed by `compute()` and stored with `save(value, dir)`.
+        """
+        key = stage_key(stage, params, inputs)
+        path = self.stage_dir(stage, key)
+        start = time.perf_counter()
+
+        if self.enabled and os.path.exists(os.path.join(path, DONE_FILE)):
+            value = load(path)
+            self._record(stage, key, True, start)
+            return value, key
+
+        value = compute()
+        if self.enabled:
+            # Written to a temporary directory first: a killed run never leaves a
+            # half-written stage that a later run would trust
+            tmp = f"{path}.tmp-{os.getpid()}"
+            shutil.rmtree(tmp, ignore_errors=True)
+            os.makedirs(tmp)
+            save(value, tmp)
+            save_json({"stage": stage, "params": params, "inputs": list(inputs),
+                       "seconds": time.perf_counter() - start}, tmp, DONE_FILE)
+            shutil.rmtree(path, ignore_errors=True)
+            os.replace(tmp, path)
+        self._record(stage, key, False, start)
+        return value, key
+
+    def _record(self, stage, key, cached, start):
+        seconds = time.perf_counter() - start
+        self.report[stage] = {"key": key, "cached": cached, "seconds": seconds}
+        print(f"{'⚡ cached  ' if cached else '🔧 computed'} {stage:13s} {key}  {seconds:7.2f}s")
+
+    # ---- dataset location (lets later runs skip kagglehub entirely) ----
+    def read_source(self):
+        path = os.path.join(self.root, SOURCE_FILE)
+        if not self.enabled or not os.path.exists(path):
+            return None
+        return load_json(self.root, SOURCE_FILE).get("csv_path")
+
+    def write_source(self, csv_path):
+        if self.enabled:
+            os.makedirs(self.root, exist_ok=True)
+            save_json({"csv_path": os.path.abspath(csv_path)}, self.root, SOURCE_FILE)
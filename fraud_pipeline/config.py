@@ -0,0 +1,80 @@
+import os
+
+from .cache import DEFAULT_CACHE_DIR
+
+MODEL_CHOICES = ("xgb", "iso")
+TRAINING_MODES = ("reference", "fast")
+
+SPLIT_PARAMS = {"test_size": 0.2, "random_state": 42}
+
+XGB_PARAMS = {
+    "max_depth": 6,
+    "n_estimators": 400,
+    "learning_rate": 0.05,
+    "subsample": 0.8,
+    "colsample_bytree": 0.8,
+    "eval_metric": "aucpr",
+    "tree_method": "hist",
+    "random_state": 42,
+}
+
+CV_PARAMS = {"cv": 3}
+
+# training_mode="fast": CV folds trained concurrently, each with early stopping
+# on a held-out slice of its training part; the final model gets as many rounds
+# as the folds kept on average
+FAST_TRAINING_PARAMS = {"early_stopping_rounds": 50, "eval_fraction": 0.1}
+
+ISO_PARAMS = {"n_estimators": 100, "max_samples": "auto", "random_state": 42}
+
+
+class PipelineConfig:
+    """
+    Everything that selects what the training pipeline builds and how.
+
+    Args:
+        models (tuple): Models to train; "xgb" is required, "iso" is optional.
+        explainer (bool): Build the SHAP TreeExplainer (and its cached summary).
+        training_mode (str): "reference" (sequential CV, full n_estimators) or
+            "fast" (parallel CV folds with early stopping, see FAST_TRAINING_PARAMS).
+        data_path (str, optional): Local creditcard.csv; skips Kaggle Hub.
+        cache_dir (str): Stage cache directory.
+        use_cache (bool): False recomputes every stage.
+        xgb_params (dict, optional): Overrides of XGB_PARAMS.
+        iso_params (dict, optional): Overrides of ISO_PARAMS.
+        plot (bool): Show the SHAP feature-importance bar plot.
+    """
+
+    def __init__(self, models=MODEL_CHOICES, explainer=True, training_mode="reference", data_path=None,
+                 cache_dir=DEFAULT_CACHE_DIR, use_cache=True, xgb_params=None, iso_params=None, plot=False):
+        models = tuple(models)
+        unknown = [m for m in models if m not in MODEL_CHOICES]
+        if unknown or "xgb" not in models:
+            raise ValueError(f"models must include 'xgb' and only use {MODEL_CHOICES}, got {models}")
+        if training_mode not in TRAINING_MODES:
+            raise ValueError(f"Unknown training mode {training_mode!r}, expected one of {TRAINING_MODES}")
+
+        self.models = models
+        self.explainer = explainer
+        self.training_mode = training_mode
+        self.data_path = data_path
+        self.cache_dir = cache_dir
+        self.use_cache = use_cache
+        self.xgb_params = {**XGB_PARAMS, **(xgb_params or {})}
+        self.iso_params = {**ISO_PARAMS, **(iso_params or {})}
+        self.plot = plot
+
+    def __repr__(self):
+        return f"PipelineConfig({vars(self)!r})"
+
+
+def create_pipeline_config(**overrides):
+    """Builds a PipelineConfig from PIPELINE_* environment variables plus `overrides`."""
+    settings = {
+        "models": tuple(m for m in os.getenv("PIPELINE_MODELS", "xgb,iso").split(",") if m),
+        "training_mode": os.getenv("PIPELINE_TRAINING_MODE", "reference"),
+        "data_path": os.getenv("CREDITCARD_CSV") or None,
+        "use_cache": os.getenv("PIPELINE_CACHE", "1") == "1",
+    }
+    settings.update(overrides)
+    return PipelineConfig(**settings)
@@ -0,0 +1,210 @@
+"""
+Inference half of the pipeline: feature order, the array-native risk scorer
+and SHAP top-k explanations. Imports only NumPy, pandas and XGBoost, so the
+API can score without loading the training stack.
+"""
+import numpy as np
+import pandas as pd
+from xgboost import DMatrix
+
+from .iso_forest import FlatIsolationForest
+
+# Fixed column order the XGBoost model was trained on
+FEATURE_COLUMNS = ['Time'] + [f'V{i}' for i in range(1, 29)] + ['Amount']
+N_FEATURES = len(FEATURE_COLUMNS)
+
+# Column order the IsolationForest was trained on (Time -> Hour)
+ISO_FEATURE_COLUMNS = [f'V{i}' for i in range(1, 29)] + ['Amount', 'Hour']
+
+
+def _scaling_vectors(scaler, columns):
+    # StandardScaler params as (column index, mean, scale) vectors over the full feature row.
+    # Kept in float64 so the scaled values round to float32 exactly like scaler.transform.
+    idx = np.array([columns.index(col) for col in scaler.feature_names_in_])
+    return idx, np.asarray(scaler.mean_, dtype=np.float64), np.asarray(scaler.scale_, dtype=np.float64)
+
+
+def _scale_in_place(buf, vectors):
+    idx, mean_vec, scale_vec = vectors
+    buf[:, idx] = (buf[:, idx] - mean_vec) / scale_vec
+
+
+def prepare_components(components):
+    """
+    Precomputes everything the array hot path needs and caches it on `components`:
+    the raw XGBoost booster, the scaler mean/scale as precomputed vectors and
+    the IsolationForest flattened into arrays (see iso_forest.py).
+    Safe to call more than once.
+    """
+    xgb = components.get("xgb")
+    if xgb is not None and "booster" not in xgb:
+        xgb["scaling"] = _scaling_vectors(xgb["scaler"], FEATURE_COLUMNS)
+        xgb["booster"] = xgb["model"].get_booster()
+
+    iso = components.get("iso")
+    if iso is not None and iso.get("model") is not None and "scaling" not in iso:
+        iso["scaling"] = _scaling_vectors(iso["scaler"], ISO_FEATURE_COLUMNS)
+        iso["flat"] = FlatIsolationForest(iso["model"])
+
+    return components
+
+
+def new_feature_buffer(n):
+    """Allocates a float32 (n, 30) buffer in FEATURE_COLUMNS order."""
+    return np.empty((n, N_FEATURES), dtype=np.float32)
+
+
+def _to_feature_buffer(transactions):
+    # Copies a DataFrame, dict, list of dicts or array into a fresh float32 buffer
+    if isinstance(transactions, pd.DataFrame):
+        return transactions[FEATURE_COLUMNS].to_numpy(dtype=np.float32, copy=True)
+    if isinstance(transactions, np.ndarray):
+        return np.array(transactions, dtype=np.float32, ndmin=2)
+    if isinstance(transactions, dict):
+        transactions = [transactions]
+
+    buf = new_feature_buffer(len(transactions))
+    for i, row in enumerate(transactions):
+        buf[i] = [row[c] for c in FEATURE_COLUMNS]
+    return buf
+
+
+def _iso_scores(buf, iso):
+    # Feature engineering matches training: V1..V28, Amount, Hour (Time dropped)
+    X_iso = np.empty((buf.shape[0], len(ISO_FEATURE_COLUMNS)), dtype=np.float32)
+    X_iso[:, :-1] = buf[:, 1:]
+    X_iso[:, -1] = np.floor(buf[:, 0] / 3600) % 24
+    _scale_in_place(X_iso, iso["scaling"])
+
+    # Same values as iso["model"].decision_function, without the per-tree Python loop
+    raw_scores = -iso["flat"].decision_function(X_iso)
+    smin = iso["score_min"]
+    smax = iso["score_max"]
+
+    # Normalize score 0-1
+    return np.clip((raw_scores - smin) / (smax - smin + 1e-8), 0.0, 1.0)
+
+
+def score_feature_buffer(buf, components, weights=None):
+    """
+    Array-native risk scoring, the hot path behind compute_risk_score.
+
+    Args:
+        buf (np.ndarray): float32 (n, 30) buffer in FEATURE_COLUMNS order.
+            It is scaled IN PLACE, so do not reuse its contents afterwards.
+        components (dict): Model components, see prepare_components.
+        weights (dict, optional): Per-channel blend weights.
+
+    Returns:
+        dict: "xgb", "iso" and "final" float64 arrays of length n.
+    """
+    if weights is None:
+        weights = {
+            "xgb": 1.0,
+            "iso": 0.0,
+            "graph": 0.0,
+            "reputation": 0.0,
+            "rules": 0.0
+        }
+    prepare_components(components)
+
+    n = buf.shape[0]
+    scores = {k: np.zeros(n) for k in weights}
+    scores.setdefault("xgb", np.zeros(n))
+    scores.setdefault("iso", np.zeros(n))
+
+    # -------- ISOLATION FOREST (needs raw Time/Amount, so it runs first) --------
+    if "iso" in components and components["iso"].get("model") is not None:
+        scores["iso"] = _iso_scores(buf, components["iso"])
+
+    # -------- XGBOOST --------
+    if "xgb" in components:
+        xgb = components["xgb"]
+        _scale_in_place(buf, xgb["scaling"])
+        scores["xgb"] = xgb["booster"].inplace_predict(buf).astype(np.float64)
+
+    final_risk = sum(weights[k] * scores[k] for k in weights)
+    return {
+        "xgb": scores["xgb"],
+        "iso": scores["iso"],
+        "final": np.clip(final_risk, 0.0, 1.0)
+    }
+
+
+def compute_risk_score(transaction_df, components, weights=None):
+    """Scores one transaction given as a one-row DataFrame or a feature dict."""
+    scores = score_feature_buffer(_to_feature_buffer(transaction_df), components, weights)
+    return {
+        "xgb": float(scores["xgb"][0]),
+        "iso": float(scores["iso"][0]),
+        "final": float(scores["final"][0])
+    }
+
+
+def compute_risk_scores_batch(X, components, weights=None):
+    """
+    Scores a whole batch of transactions with one call per model.
+
+    Args:
+        X: (n, 30) matrix in FEATURE_COLUMNS order, a DataFrame or a list of dicts.
+        components (dict): Same structure as for compute_risk_score.
+        weights (dict, optional): Same structure as for compute_risk_score.
+
+    Returns:
+        dict: "xgb", "iso" and "final" arrays of length n.
+    """
+    return score_feature_buffer(_to_feature_buffer(X), components, weights)
+
+
+def top_k_features(values, top_k=5):
+    """
+    Picks the top_k features by |impact| per row of an (n, 30) attribution array.
+    argpartition finds the k largest in linear time; only those k get sorted.
+    """
+    values = np.asarray(values).reshape(-1, N_FEATURES)
+    k = min(top_k, N_FEATURES)
+    abs_values = np.abs(values)
+
+    top = np.argpartition(-abs_values, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(abs_values, top, axis=1), axis=1, kind="stable")
+    top = np.take_along_axis(top, order, axis=1)
+
+    return [
+        [
+            {"feature": FEATURE_COLUMNS[j], "impact": float(values[i, j])}
+            for j in top[i]
+        ]
+        for i in range(len(top))
+    ]
+
+
+def shap_explain_batch(scaler, explainer, X, top_k=5):
+    """Runs SHAP once for an (n, 30) matrix and returns the top_k features per row."""
+    X_scaled = _to_feature_buffer(X)
+    _scale_in_place(X_scaled, _scaling_vectors(scaler, FEATURE_COLUMNS))
+
+    shap_values = explainer.shap_values(X_scaled)
+    return top_k_features(shap_values, top_k)
+
+
+def contrib_explain_batch(components, X, top_k=5):
+    """
+    Same output as shap_explain_batch, computed by XGBoost's native TreeSHAP
+    (pred_contribs) straight from the booster, so no TreeExplainer is needed.
+    """
+    prepare_components(components)
+    xgb = components["xgb"]
+
+    X_scaled = _to_feature_buffer(X)
+    _scale_in_place(X_scaled, xgb["scaling"])
+
+    contribs = xgb["booster"].predict(
+        DMatrix(X_scaled, feature_names=FEATURE_COLUMNS),
+        pred_contribs=True
+    )
+    # Last column is the bias term
+    return top_k_features(contribs[:, :-1], top_k)
+
+
+def shap_explain_transaction(model, scaler, explainer, transaction_df, top_k=5):
+    return shap_explain_batch(scaler, explainer, transaction_df, top_k=top_k)[0]
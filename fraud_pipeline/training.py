@@ -0,0 +1,338 @@
+"""
+Training half of the pipeline: XGBoost with a CV-tuned threshold, the
+IsolationForest and the SHAP explainer, run as cached stages (see cache.py).
+A re-run only recomputes the stages whose inputs or parameters changed, and
+with a local data path nothing touches the network.
+
+Imported lazily by fraud_pipeline.run_pipeline; kagglehub, shap and
+matplotlib load only when a stage actually needs them.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import IsolationForest
+from sklearn.metrics import (
+    average_precision_score,
+    classification_report,
+    precision_recall_curve,
+    roc_auc_score
+)
+from sklearn.model_selection import StratifiedKFold, cross_val_predict, train_test_split
+from sklearn.preprocessing import StandardScaler
+from xgboost import XGBClassifier
+
+from .artifacts import PipelineArtifacts
+from .cache import StageCache, file_fingerprint, load_arrays, load_json, save_arrays, save_json
+from .config import CV_PARAMS, FAST_TRAINING_PARAMS, SPLIT_PARAMS, PipelineConfig
+
+KAGGLE_DATASET = "mlg-ulb/creditcardfraud"
+
+
+def locate_dataset(data_path=None, cache=None):
+    """
+    Path of creditcard.csv: `data_path`, then $CREDITCARD_CSV, then the file a
+    previous run downloaded, and only then a Kaggle Hub download.
+    """
+    data_path = data_path or os.getenv("CREDITCARD_CSV")
+    if data_path:
+        return data_path
+    cached = cache.read_source() if cache is not None else None
+    if cached and os.path.exists(cached):
+        return cached
+
+    import kagglehub
+
+    print("📥 Downloading dataset from Kaggle Hub...")
+    path = os.path.join(kagglehub.dataset_download(KAGGLE_DATASET), "creditcard.csv")
+    print(f"✅ Dataset downloaded to: {path}")
+    if cache is not None:
+        cache.write_source(path)
+    return path
+
+
+def xgb_features(X, scaler):
+    X_scaled = X.copy()
+    X_scaled[['Amount', 'Time']] = scaler.transform(X[['Amount', 'Time']])
+    return X_scaled
+
+
+def iso_features(X):
+    # Time -> Hour, the same feature engineering as the ISO scorer at inference
+    X_iso = X.drop('Time', axis=1)
+    X_iso['Hour'] = np.floor(X['Time'] / 3600) % 24
+    return X_iso
+
+
+def best_f1_threshold(y_true, y_prob):
+    """Probability threshold maximizing F1 over the precision-recall curve."""
+    precision, recall, thresholds = precision_recall_curve(y_true, y_prob)
+    f1_scores = 2 * (precision[:-1] * recall[:-1]) / (
+        precision[:-1] + recall[:-1] + 1e-8
+    )
+    return float(thresholds[np.argmax(f1_scores)])
+
+
+def cv_predict_parallel(make_model, X, y, cv=3, early_stopping_rounds=None, eval_fraction=0.1,
+                        n_jobs=None, random_state=42):
+    """
+    Out-of-fold predict_proba[:, 1], with the same folds as
+    cross_val_predict(cv=cv) but trained concurrently. Folds run on threads
+    (XGBoost releases the GIL, and no fold copies the data into a subprocess)
+    with cpu_count // n_jobs XGBoost threads each.
+
+    Args:
+        make_model (callable): n_jobs -> unfitted XGBClassifier.
+        early_stopping_rounds (int, optional): Stop each fold once its eval set
+            (`eval_fraction` of the fold's training part) stops improving.
+
+    Returns:
+        tuple: (out-of-fold probabilities, boosting rounds kept per fold)
+    """
+    folds = list(StratifiedKFold(n_splits=cv).split(X, y))
+    n_jobs = n_jobs or len(folds)
+    threads = max(1, (os.cpu_count() or 1) // n_jobs)
+
+    def fit_fold(fold):
+        train_idx, test_idx = fold
+        model = make_model(threads)
+        X_fit, y_fit = X.iloc[train_idx], y.iloc[train_idx]
+
+        if early_stopping_rounds:
+            fit_idx, eval_idx = train_test_split(
+                np.arange(len(train_idx)), test_size=eval_fraction, stratify=y_fit, random_state=random_state
+            )
+            model.set_params(early_stopping_rounds=early_stopping_rounds)
+            model.fit(
+                X_fit.iloc[fit_idx], y_fit.iloc[fit_idx],
+                eval_set=[(X_fit.iloc[eval_idx], y_fit.iloc[eval_idx])],
+                verbose=False
+            )
+            rounds = model.best_iteration + 1
+        else:
+            model.fit(X_fit, y_fit)
+            rounds = model.n_estimators
+
+        # After early stopping, predict_proba only uses the best iteration
+        return test_idx, model.predict_proba(X.iloc[test_idx])[:, 1], rounds
+
+    with ThreadPoolExecutor(max_workers=n_jobs) as pool:
+        results = list(pool.map(fit_fold, folds))
+
+    oof = np.empty(len(y))
+    for test_idx, prob, _ in results:
+        oof[test_idx] = prob
+    return oof, [rounds for _, _, rounds in results]
+
+
+def _load_xgb(path):
+    model = XGBClassifier()
+    model.load_model(os.path.join(path, "model.ubj"))
+    return model
+
+
+def _save_iso(iso, path):
+    joblib.dump(iso["model"], os.path.join(path, "iso_forest.joblib"))
+    joblib.dump(iso["scaler"], os.path.join(path, "iso_scaler.joblib"))
+    save_json({"score_min": iso["score_min"], "score_max": iso["score_max"]}, path)
+
+
+def _load_iso(path):
+    return {
+        "model": joblib.load(os.path.join(path, "iso_forest.joblib")),
+        "scaler": joblib.load(os.path.join(path, "iso_scaler.joblib")),
+        **load_json(path)
+    }
+
+
+def _plot_importance(mean_abs_shap, columns):
+    import matplotlib.pyplot as plt
+
+    order = np.argsort(mean_abs_shap)
+    plt.figure(figsize=(8, 10))
+    plt.barh(np.asarray(columns)[order], mean_abs_shap[order])
+    plt.xlabel("mean(|SHAP value|)")
+    plt.tight_layout()
+    plt.show()
+
+
+def run_pipeline(config=None, cache=None):
+    """
+    Runs the training pipeline selected by `config`.
+
+    Args:
+        config (PipelineConfig, optional): Defaults to PipelineConfig().
+        cache (StageCache, optional): Used instead of config.cache_dir/use_cache,
+            e.g. to read its per-stage report afterwards.
+
+    Returns:
+        PipelineArtifacts
+    """
+    config = config or PipelineConfig()
+    cache = cache if cache is not None else StageCache(config.cache_dir, enabled=config.use_cache)
+    xgb_params = config.xgb_params
+    fast = config.training_mode == "fast"
+    stage_keys = {}
+
+    # 1. Raw load: locate creditcard.csv (downloaded at most once)
+    csv_path = locate_dataset(config.data_path, cache)
+
+    # 2. Columnar conversion: the CSV is parsed once, later runs read Parquet
+    df, stage_keys["columnar"] = cache.run(
+        "columnar", file_fingerprint(csv_path), [],
+        compute=lambda: pd.read_csv(csv_path),
+        save=lambda data, path: data.to_parquet(os.path.join(path, "data.parquet"), index=False),
+        load=lambda path: pd.read_parquet(os.path.join(path, "data.parquet"))
+    )
+    print(f"📊 Shape: {df.shape}")
+
+    X = df.drop('Class', axis=1)
+    y = df['Class']
+
+    # 3. Stratified split, stored as row indices
+    split, split_key = cache.run(
+        "split", SPLIT_PARAMS, [stage_keys["columnar"]],
+        compute=lambda: dict(zip(
+            ("train_idx", "test_idx"),
+            train_test_split(np.arange(len(df)), stratify=y, **SPLIT_PARAMS)
+        )),
+        save=save_arrays,
+        load=load_arrays
+    )
+    stage_keys["split"] = split_key
+    X_train, X_test = X.iloc[split["train_idx"]], X.iloc[split["test_idx"]]
+    y_train, y_test = y.iloc[split["train_idx"]], y.iloc[split["test_idx"]]
+
+    # 4. Amount/Time scaler for XGBoost (fit on Train only)
+    scaler, scaler_key = cache.run(
+        "scaler", {"columns": ['Amount', 'Time']}, [split_key],
+        compute=lambda: StandardScaler().fit(X_train[['Amount', 'Time']]),
+        save=lambda fitted, path: joblib.dump(fitted, os.path.join(path, "scaler.joblib")),
+        load=lambda path: joblib.load(os.path.join(path, "scaler.joblib"))
+    )
+    stage_keys["scaler"] = scaler_key
+    X_train_scaled = xgb_features(X_train, scaler)
+    X_test_scaled = xgb_features(X_test, scaler)
+
+    fraud_ratio = (y_train == 0).sum() / (y_train == 1).sum()
+
+    def new_xgb(n_jobs=-1, params=xgb_params):
+        return XGBClassifier(**{"scale_pos_weight": fraud_ratio, **params}, n_jobs=n_jobs)
+
+    # 5. Threshold tuning on out-of-fold predictions (CV on Train)
+    def tune_threshold():
+        if fast:
+            y_train_prob_cv, rounds = cv_predict_parallel(
+                new_xgb, X_train_scaled, y_train,
+                cv=CV_PARAMS["cv"],
+                early_stopping_rounds=FAST_TRAINING_PARAMS["early_stopping_rounds"],
+                eval_fraction=FAST_TRAINING_PARAMS["eval_fraction"],
+                random_state=xgb_params.get("random_state", 42)
+            )
+            print(f"Early stopping kept {rounds} of {xgb_params['n_estimators']} rounds per fold")
+            return {
+                "threshold": best_f1_threshold(y_train, y_train_prob_cv),
+                "n_estimators": int(round(np.mean(rounds)))
+            }
+
+        y_train_prob_cv = cross_val_predict(
+            new_xgb(),
+            X_train_scaled,
+            y_train,
+            cv=CV_PARAMS["cv"],
+            method="predict_proba",
+            n_jobs=1
+        )[:, 1]
+        return {"threshold": best_f1_threshold(y_train, y_train_prob_cv)}
+
+    cv_params = {**CV_PARAMS, "xgb": xgb_params}
+    if fast:
+        cv_params["fast"] = FAST_TRAINING_PARAMS
+    tuned, stage_keys["cv_threshold"] = cache.run(
+        "cv_threshold", cv_params, [split_key, scaler_key],
+        compute=tune_threshold,
+        save=save_json,
+        load=load_json
+    )
+
+    # 6. XGBoost on the whole training set (fast mode: the rounds CV kept)
+    final_params = {**xgb_params, "n_estimators": tuned.get("n_estimators", xgb_params["n_estimators"])}
+    model, xgb_key = cache.run(
+        "xgb", final_params, [split_key, scaler_key],
+        compute=lambda: new_xgb(params=final_params).fit(X_train_scaled, y_train),
+        save=lambda fitted, path: fitted.save_model(os.path.join(path, "model.ubj")),
+        load=_load_xgb
+    )
+    stage_keys["xgb"] = xgb_key
+    best_threshold = tuned["threshold"]
+    print(f"Optimal Threshold (tuned on Train): {best_threshold:.4f}")
+
+    y_test_prob = model.predict_proba(X_test_scaled)[:, 1]
+    y_test_pred = (y_test_prob >= best_threshold).astype(int)
+
+    print("\nClassification Report (Test Data):")
+    print(classification_report(y_test, y_test_pred))
+    print("PR-AUC:", average_precision_score(y_test, y_test_prob))
+
+    # 7. IsolationForest (independent of every XGBoost stage)
+    iso = None
+    if "iso" in config.models:
+        def train_iso():
+            X_train_iso = iso_features(X_train)
+            iso_scaler = StandardScaler()
+            X_train_iso[['Amount', 'Hour']] = iso_scaler.fit_transform(X_train_iso[['Amount', 'Hour']])
+
+            contamination = (y_train == 1).sum() / len(y_train)
+            iso_model = IsolationForest(**{"contamination": contamination, **config.iso_params}, n_jobs=-1)
+            iso_model.fit(X_train_iso)
+
+            # min/max train scores normalize the ISO channel in compute_risk_score
+            train_scores = iso_model.decision_function(X_train_iso)
+            return {
+                "model": iso_model,
+                "scaler": iso_scaler,
+                "score_min": float(train_scores.min()),
+                "score_max": float(train_scores.max())
+            }
+
+        iso, stage_keys["iso"] = cache.run(
+            "iso", config.iso_params, [split_key],
+            compute=train_iso,
+            save=_save_iso,
+            load=_load_iso
+        )
+
+        X_test_iso = iso_features(X_test)
+        X_test_iso[['Amount', 'Hour']] = iso["scaler"].transform(X_test_iso[['Amount', 'Hour']])
+        y_test_prob_iso = -iso["model"].decision_function(X_test_iso)
+        print(f"ISO ROC-AUC: {roc_auc_score(y_test, y_test_prob_iso):.4f}")
+        print(f"ISO PR-AUC:  {average_precision_score(y_test, y_test_prob_iso):.4f}")
+
+    # 8. SHAP explainer: rebuilt from the booster (cheap); SHAP over the whole
+    #    test set is the expensive part, cached as mean |SHAP| per feature
+    explainer = None
+    if config.explainer:
+        import shap
+
+        explainer = shap.TreeExplainer(model)
+        importance, stage_keys["explainer"] = cache.run(
+            "explainer", {}, [xgb_key, split_key],
+            compute=lambda: {"mean_abs_shap": np.abs(explainer.shap_values(X_test_scaled)).mean(axis=0)},
+            save=save_arrays,
+            load=load_arrays
+        )
+        if config.plot:
+            _plot_importance(importance["mean_abs_shap"], X_test_scaled.columns)
+
+    return PipelineArtifacts(
+        model=model,
+        scaler=scaler,
+        explainer=explainer,
+        iso=iso,
+        threshold=best_threshold,
+        X_test=X_test,
+        y_test=y_test,
+        stage_keys=stage_keys
+    )
@@ -1,21 +1,83 @@
+import hashlib
 import json
 import os
 import pandas as pd
 import numpy as np
 
+# Same column order as the ML pipeline's (n, 30) feature matrix
+FEATURE_COLUMNS = ['Time'] + [f'V{i}' for i in range(1, 29)] + ['Amount']
+
+
+def compile_rules(cfg):
+    """
+    Resolves a fraud_rules.json config into a fixed evaluation plan:
+    defaults filled in, PCA components mapped to column indices and the
+    normaliser (sum of enabled weights) computed once.
+    """
+    plan = {}
+
+    vel = cfg.get('velocity', {})
+    plan['velocity'] = {
+        'time_window': vel.get('time_window_sec', 5),
+        'weight': vel.get('weight', 2.5),
+    } if vel.get('enabled', False) else None
+
+    pca = cfg.get('high_risk_pca', {})
+    if pca.get('enabled', False):
+        components = pca.get('components', ['V4', 'V10', 'V12', 'V14'])
+        plan['high_risk_pca'] = {
+            'components': list(components),
+            # Unknown component names read as 0 in the scalar path, so they can never fire
+            'idx': np.array([FEATURE_COLUMNS.index(c) for c in components if c in FEATURE_COLUMNS], dtype=np.intp),
+            'threshold': pca.get('default_threshold', 3.0),
+            'weight': pca.get('weight', 1.5),
+        }
+    else:
+        plan['high_risk_pca'] = None
+
+    amt = cfg.get('amount_anomaly', {})
+    # Combo pattern reads these even when the amount rule itself is disabled
+    plan['small_threshold'] = amt.get('small_threshold', 10)
+    plan['large_threshold'] = amt.get('large_threshold', 1000)
+    plan['amount_anomaly'] = {
+        'weight': amt.get('weight', 1.0),
+    } if amt.get('enabled', False) else None
+
+    combo = cfg.get('combo_pattern', {})
+    plan['combo_pattern'] = {
+        'weight': combo.get('weight', 3.0),
+    } if combo.get('enabled', False) else None
+
+    total_weight = 0
+    for name in ('velocity', 'high_risk_pca', 'amount_anomaly', 'combo_pattern'):
+        if plan[name] is not None:
+            total_weight += cfg[name]['weight']
+    plan['total_weight'] = total_weight
+
+    return plan
+
+
 class RuleEngine:
     def __init__(self, config_path="fraud_rules.json"):
         self.config_path = config_path
         self.config = {}
+        self.plan = compile_rules(self.config)
+        self.version = None
         self.reload_config()
 
     def reload_config(self):
-        """Reloads the rules from the JSON file."""
+        """
+        Reloads the rules from the JSON file and recompiles the evaluation plan.
+        `version` (a hash of the loaded config) changes whenever the rules do,
+        which invalidates results cached under the old rules.
+        """
         if os.path.exists(self.config_path):
             with open(self.config_path, 'r') as f:
                 self.config = json.load(f)
         else:
             print(f"Warning: Config file {self.config_path} not found.")
+        self.plan = compile_rules(self.config)
+        self.version = hashlib.sha256(json.dumps(self.config, sort_keys=True).encode()).hexdigest()[:16]
 
     def evaluate(self, transaction, last_txn_time=None):
         """
@@ -30,103 +92,186 @@ class RuleEngine:
         """
         score = 0.0
         details = {}
-        cfg = self.config
+        plan = self.plan
 
         # --- RULE 1: VELOCITY ---
-        if cfg.get('velocity', {}).get('enabled', False):
+        vel = plan['velocity']
+        if vel is not None:
             # Logic: If time since last transaction is too short -> FLAG
-            time_window = cfg['velocity'].get('time_window_sec', 5)
-            weight = cfg['velocity'].get('weight', 2.5)
-            
-            if last_txn_time is not None:
-                time_diff = transaction['Time'] - last_txn_time
-                if time_diff < time_window:
-                    score += weight
-                    details['r1_velocity'] = 1
-                else:
-                    details['r1_velocity'] = 0
+            # (no history -> can't calc velocity)
+            if last_txn_time is not None and transaction['Time'] - last_txn_time < vel['time_window']:
+                score += vel['weight']
+                details['r1_velocity'] = 1
             else:
-                # No history, can't calc velocity
                 details['r1_velocity'] = 0
 
         # --- RULE 2: HIGH-RISK PCA ---
-        if cfg.get('high_risk_pca', {}).get('enabled', False):
+        pca = plan['high_risk_pca']
+        if pca is not None:
             # Logic: If any critical V-component is > threshold -> FLAG
-            components = cfg['high_risk_pca'].get('components', ['V4', 'V10', 'V12', 'V14'])
-            threshold = cfg['high_risk_pca'].get('default_threshold', 3.0)
-            weight = cfg['high_risk_pca'].get('weight', 1.5)
-            
-            is_extreme = False
-            for comp in components:
-                val = transaction.get(comp, 0)
-                if abs(val) > threshold:
-                    is_extreme = True
-                    break
-            
+            threshold = pca['threshold']
+            is_extreme = any(abs(transaction.get(comp, 0)) > threshold for comp in pca['components'])
+
             if is_extreme:
-                score += weight
+                score += pca['weight']
                 details['r2_high_risk_pca'] = 1
             else:
                 details['r2_high_risk_pca'] = 0
 
+        amt = transaction['Amount']
+        small_thresh = plan['small_threshold']
+        large_thresh = plan['large_threshold']
+
         # --- RULE 3: AMOUNT ANOMALY ---
-        if cfg.get('amount_anomaly', {}).get('enabled', False):
+        amount_rule = plan['amount_anomaly']
+        if amount_rule is not None:
             # Logic: Very small (test) or very large or suspicious round numbers
-            small_thresh = cfg['amount_anomaly'].get('small_threshold', 10)
-            large_thresh = cfg['amount_anomaly'].get('large_threshold', 1000)
-            weight = cfg['amount_anomaly'].get('weight', 1.0)
-            
-            amt = transaction['Amount']
             flag_small = (amt < small_thresh) and (amt > 0.01)
             flag_large = (amt > large_thresh)
             flag_round = (amt % 50 == 0) and (amt >= 100) and (amt <= 500)
             
             if flag_small or flag_large or flag_round:
-                score += weight
+                score += amount_rule['weight']
                 details['r3_amount_anomaly'] = 1
             else:
                 details['r3_amount_anomaly'] = 0
 
         # --- RULE 4: COMBINATION PATTERNS ---
-        if cfg.get('combo_pattern', {}).get('enabled', False):
+        combo = plan['combo_pattern']
+        if combo is not None:
             # Logic: Velocity + Small Amount OR High Risk PCA + Large Amount
-            weight = cfg['combo_pattern'].get('weight', 3.0)
-            
             r1 = details.get('r1_velocity', 0)
             r2 = details.get('r2_high_risk_pca', 0)
-            r3 = details.get('r3_amount_anomaly', 0)
-            
-            # Use 'amt' from Rule 3 block, or fetch again
-            amt = transaction['Amount']
-            small_thresh = cfg.get('amount_anomaly', {}).get('small_threshold', 10)
-            large_thresh = cfg.get('amount_anomaly', {}).get('large_threshold', 1000)
-            
-            is_small = (amt < small_thresh)
-            is_large = (amt > large_thresh)
-            
+
             # Pattern A: Velocity + Small (Test Fraud)
-            pat_a = (r1 == 1) and is_small
+            pat_a = (r1 == 1) and (amt < small_thresh)
             
             # Pattern B: PCA + Large (Major Fraud)
-            pat_b = (r2 == 1) and is_large
+            pat_b = (r2 == 1) and (amt > large_thresh)
             
             if pat_a or pat_b:
-                score += weight
+                score += combo['weight']
                 details['r4_combo_pattern'] = 1
             else:
                 details['r4_combo_pattern'] = 0
 
         # --- NORMALIZE SCORE ---
-        # Calculate total possible weight to normalize to [0, 1]
-        # (simplified: sum of all active weights)
-        total_weight = 0
-        if cfg.get('velocity', {}).get('enabled'): total_weight += cfg['velocity']['weight']
-        if cfg.get('high_risk_pca', {}).get('enabled'): total_weight += cfg['high_risk_pca']['weight']
-        if cfg.get('amount_anomaly', {}).get('enabled'): total_weight += cfg['amount_anomaly']['weight']
-        if cfg.get('combo_pattern', {}).get('enabled'): total_weight += cfg['combo_pattern']['weight']
-        
+        # Sum of all active weights, precomputed in compile_rules
+        total_weight = plan['total_weight']
         normalized_score = 0
         if total_weight > 0:
             normalized_score = score / total_weight
             
         return normalized_score, details
+
+    def evaluate_many(self, X, last_txn_time=None):
+        """Vectorized evaluate() over a whole batch; see evaluate_plan."""
+        return evaluate_plan(self.plan, X, last_txn_time)
+
+
+def _cached(cache, key, compute):
+    if cache is None:
+        return compute()
+    value = cache.get(key)
+    if value is None:
+        value = cache[key] = compute()
+    return value
+
+
+def rule_flags(plan, X, last_txn_time=None, cache=None):
+    """
+    Boolean flag array per enabled rule of a compiled plan (see compile_rules).
+
+    `cache` (a dict kept for one X and last_txn_time) memoizes the masks by
+    the parameters they depend on, so configs that share a velocity window,
+    PCA set or amount threshold reuse the same mask (rule_search.py).
+
+    Returns:
+        dict: {rule key: bool array}, in evaluation order.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    n = X.shape[0]
+    flags = {}
+
+    zeros = np.zeros(n, dtype=bool)
+    r1 = r2 = zeros
+
+    # --- RULE 1: VELOCITY ---
+    vel = plan['velocity']
+    if vel is not None:
+        if last_txn_time is None:
+            r1 = zeros
+        else:
+            def velocity():
+                dt = _cached(cache, ('dt',), lambda: X[:, 0] - np.broadcast_to(
+                    np.asarray(last_txn_time, dtype=np.float64), (n,)))
+                # NaN (no history) never compares below the window
+                with np.errstate(invalid='ignore'):
+                    return dt < vel['time_window']
+            r1 = _cached(cache, ('velocity', vel['time_window']), velocity)
+        flags['r1_velocity'] = r1
+
+    # --- RULE 2: HIGH-RISK PCA ---
+    pca = plan['high_risk_pca']
+    if pca is not None:
+        if len(pca['idx']):
+            r2 = _cached(
+                cache, ('pca', tuple(pca['components']), pca['threshold']),
+                lambda: (np.abs(X[:, pca['idx']]) > pca['threshold']).any(axis=1)
+            )
+        else:
+            r2 = zeros
+        flags['r2_high_risk_pca'] = r2
+
+    amt = X[:, -1]
+    small, large = plan['small_threshold'], plan['large_threshold']
+    is_small = _cached(cache, ('small', small), lambda: amt < small)
+    is_large = _cached(cache, ('large', large), lambda: amt > large)
+
+    # --- RULE 3: AMOUNT ANOMALY ---
+    if plan['amount_anomaly'] is not None:
+        def amount_anomaly():
+            flag_round = _cached(cache, ('round',), lambda: (amt % 50 == 0) & (amt >= 100) & (amt <= 500))
+            return (is_small & (amt > 0.01)) | is_large | flag_round
+        flags['r3_amount_anomaly'] = _cached(cache, ('amount', small, large), amount_anomaly)
+
+    # --- RULE 4: COMBINATION PATTERNS ---
+    if plan['combo_pattern'] is not None:
+        flags['r4_combo_pattern'] = (r1 & is_small) | (r2 & is_large)
+
+    return flags
+
+
+RULE_NAMES = {
+    'r1_velocity': 'velocity',
+    'r2_high_risk_pca': 'high_risk_pca',
+    'r3_amount_anomaly': 'amount_anomaly',
+    'r4_combo_pattern': 'combo_pattern',
+}
+
+
+def combine_flags(plan, flags, n):
+    """Normalized scores of n rows: enabled rule weights summed over the fired flags."""
+    score = np.zeros(n)
+    for key, flag in flags.items():
+        score += flag * plan[RULE_NAMES[key]]['weight']
+    if plan['total_weight'] > 0:
+        score = score / plan['total_weight']
+    return score
+
+
+def evaluate_plan(plan, X, last_txn_time=None):
+    """
+    Vectorized RuleEngine.evaluate() of a compiled plan (see compile_rules) over
+    a whole batch; also used to back-test configs that are not loaded.
+
+    Args:
+        X (np.ndarray): (n, 30) matrix in FEATURE_COLUMNS order.
+        last_txn_time (float | np.ndarray, optional): One timestamp for the whole
+            batch, or one per row with NaN meaning "no history".
+
+    Returns:
+        tuple: (scores array of length n, {rule key: int8 flag array})
+    """
+    flags = rule_flags(plan, X, last_txn_time)
+    return combine_flags(plan, flags, np.asarray(X).shape[0]), {key: flag.astype(np.int8) for key, flag in flags.items()}
@@ -1,13 +1,14 @@
 import json
 import os
 import pandas as pd
-import financial_transaction_fraud_detection as ml_pipeline
+import fraud_pipeline as ml_pipeline
 
 # Ensure data directory exists
 os.makedirs("src/data", exist_ok=True)
 
 # 🔹 CALL the pipeline (this is the key fix)
-_, _, _, X_test, y_test = ml_pipeline.run_full_ml_pipeline()
+artifacts = ml_pipeline.run_pipeline(ml_pipeline.create_pipeline_config(explainer=False))
+X_test, y_test = artifacts.X_test, artifacts.y_test
 
 # Reconstruct labeled test dataframe
 test_df = X_test.copy()
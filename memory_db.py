@@ -0,0 +1,198 @@
+"""
+In-process stand-in for the `fraud` Postgres schema.
+
+Implements just enough of the psycopg2 pool/connection/cursor interface for
+db.py (getconn/putconn, cursor(), execute, fetchall, mogrify, commit) so the
+API, tests and benchmarks can run without a database server:
+
+    import db, memory_db
+    db.init_pool(memory_db.MemoryDatabase())
+"""
+import base64
+import pickle
+import re
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+INSERT_RE = re.compile(
+    r"INSERT INTO fraud\.(\w+)\s*\(([^)]*)\)\s*VALUES\s*(.*?)"
+    r"(?:\s+ON CONFLICT\s*\(([^)]*)\)\s*DO\s+(NOTHING|UPDATE SET\s+.*))?$",
+    re.IGNORECASE | re.DOTALL
+)
+EXCLUDED_RE = re.compile(r"(\w+)\s*=\s*EXCLUDED\.(\w+)", re.IGNORECASE)
+LAST_TXN_RE = re.compile(r"SELECT raw_payload FROM fraud\.transactions_raw\s+WHERE user_id", re.IGNORECASE)
+SELECT_RE = re.compile(r"SELECT .* FROM fraud\.(\w+)", re.IGNORECASE | re.DOTALL)
+
+# Server-side column defaults of the real schema
+COLUMN_DEFAULTS = {"decisions": {"decision_time": lambda: datetime.now(timezone.utc)}}
+
+
+class MemoryDatabase:
+    """Thread-safe in-memory tables plus a pool-compatible interface."""
+
+    def __init__(self, latency_ms=0.0):
+        self.latency = latency_ms / 1000.0
+        self.tables = defaultdict(list)
+        self.lock = threading.Lock()
+        self.statements = 0
+        self.commits = 0
+
+    # ---- pool interface ----
+    def getconn(self):
+        return MemoryConnection(self)
+
+    def putconn(self, conn):
+        pass
+
+    def closeall(self):
+        pass
+
+    # ---- storage ----
+    def insert(self, table, rows, conflict=None):
+        """
+        Appends rows; with conflict=(key columns, {column: EXCLUDED column})
+        a row whose key already exists updates those columns instead
+        (ON CONFLICT ... DO UPDATE, or DO NOTHING with an empty mapping).
+        """
+        with self.lock:
+            if conflict is None:
+                self.tables[table].extend(rows)
+                return
+            key_cols, updates = conflict
+            existing = {tuple(r[c] for c in key_cols): r for r in self.tables[table]}
+            for row in rows:
+                key = tuple(row[c] for c in key_cols)
+                if key in existing:
+                    existing[key].update({col: row[src] for col, src in updates.items()})
+                else:
+                    self.tables[table].append(row)
+                    existing[key] = row
+
+    def rows(self, table):
+        with self.lock:
+            return list(self.tables[table])
+
+
+class MemoryConnection:
+    encoding = "UTF8"
+
+    def __init__(self, database):
+        self.database = database
+        self.pending = []
+
+    def cursor(self, cursor_factory=None, name=None):
+        return MemoryCursor(self)
+
+    def commit(self):
+        # Writes only become visible on commit, like a real transaction
+        for table, rows, conflict in self.pending:
+            self.database.insert(table, rows, conflict)
+        if self.pending:
+            with self.database.lock:
+                self.database.commits += 1
+        self.pending = []
+
+    def rollback(self):
+        self.pending = []
+
+    def close(self):
+        pass
+
+
+def _split_values(values_clause):
+    # "(%s, %s, NOW())" -> ["%s", "%s", "NOW()"]
+    values_clause = values_clause.strip()
+    if values_clause.startswith("(") and values_clause.endswith(")"):
+        values_clause = values_clause[1:-1]
+    return [v.strip() for v in values_clause.split(",")]
+
+
+class MemoryCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.description = None
+        self._result = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __iter__(self):
+        return iter(self._result)
+
+    def mogrify(self, template, args):
+        # Opaque token that execute() decodes again (used by execute_values)
+        if isinstance(template, bytes):
+            template = template.decode()
+        return base64.b64encode(pickle.dumps((template, tuple(args))))
+
+    def execute(self, query, params=None):
+        database = self.connection.database
+        if database.latency:
+            time.sleep(database.latency)
+        with database.lock:
+            database.statements += 1
+
+        if isinstance(query, bytes):
+            query = query.decode()
+        query = " ".join(query.split())
+
+        match = INSERT_RE.match(query)
+        if match:
+            table, cols, values, conflict_cols, action = match.groups()
+            cols = [c.strip() for c in cols.split(",")]
+            conflict = None
+            if conflict_cols is not None:
+                conflict = (
+                    [c.strip() for c in conflict_cols.split(",")],
+                    {col: src for col, src in EXCLUDED_RE.findall(action)}
+                )
+            if values.startswith("("):
+                tuples = [(values, params or ())]
+            else:
+                tuples = [pickle.loads(base64.b64decode(token)) for token in values.split(",")]
+            rows = []
+            for template, args in tuples:
+                args = iter(args)
+                slots = _split_values(template) if template else ["%s"] * len(cols)
+                row = {}
+                for col, slot in zip(cols, slots):
+                    row[col] = datetime.now(timezone.utc) if slot.upper() == "NOW()" else next(args)
+                for col, default in COLUMN_DEFAULTS.get(table, {}).items():
+                    row.setdefault(col, default())
+                rows.append(row)
+            self.connection.pending.append((table, rows, conflict))
+            self.description = None
+            self._result = []
+            return
+
+        if LAST_TXN_RE.search(query):
+            user_id = params[0]
+            rows = [r for r in database.rows("transactions_raw") if r.get("user_id") == user_id]
+            rows.sort(key=lambda r: r["timestamp"], reverse=True)
+            self._result = [{"raw_payload": r["raw_payload"]} for r in rows[:1]]
+            self.description = [("raw_payload",)]
+            return
+
+        match = SELECT_RE.match(query)
+        if match:
+            self._result = database.rows(match.group(1))
+            self.description = [("*",)]
+            return
+
+        self.description = None
+        self._result = []
+
+    def fetchall(self):
+        return list(self._result)
+
+    def fetchmany(self, size=None):
+        batch, self._result = self._result[:size], self._result[size:]
+        return batch
+
+    def close(self):
+        pass
@@ -0,0 +1,196 @@
+"""
+Minimal Prometheus metrics (text exposition format 0.0.4) for the scoring API.
+
+Counters, histograms and callback gauges are kept in-process, each behind its own lock;
+recording a sample is a dict lookup and a bisect, so the hot path can afford
+it on every request. Each worker of serve.py exports its own series.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Seconds; covers a sub-millisecond rule check up to a slow DB round trip
+DEFAULT_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _label_str(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _fmt(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self._values = {}
+
+    def inc(self, amount=1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_label_str(self.labelnames, k)} {_fmt(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_LATENCY_BUCKETS, registry=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [per-bucket counts (+Inf last), sum, count]
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels):
+        series = self._series.get(self._key(labels))
+        return series[2] if series else 0
+
+    def _samples(self):
+        with self._lock:
+            items = sorted((k, (list(s[0]), s[1], s[2])) for k, s in self._series.items())
+        lines = []
+        for key, (counts, total, n) in items:
+            cumulative = 0
+            for upper, c in zip(self.buckets + (float("inf"),), counts):
+                cumulative += c
+                lines.append(f"{self.name}_bucket{_label_str(self.labelnames, key, ('le', _fmt(upper)))} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_str(self.labelnames, key)} {_fmt(total)}")
+            lines.append(f"{self.name}_count{_label_str(self.labelnames, key)} {n}")
+        return lines
+
+
+class Gauge(_Metric):
+    """Read at scrape time from `fn`, which returns a number or {label value tuple: number}."""
+    kind = "gauge"
+
+    def __init__(self, name, documentation, fn, labelnames=(), registry=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self.fn = fn
+
+    def _samples(self):
+        value = self.fn()
+        if not isinstance(value, dict):
+            value = {(): value}
+        return [f"{self.name}{_label_str(self.labelnames, k)} {_fmt(v)}" for k, v in sorted(value.items())]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as e:  # a broken gauge callback must not break the scrape
+                lines.append(f"# {metric.name} unavailable: {e}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# --------------------------------------
+# SCORING PIPELINE METRICS
+# --------------------------------------
+STAGE_LATENCY = Histogram(
+    "fraud_stage_duration_seconds",
+    "Time spent in each stage of the scoring pipeline.",
+    ("endpoint", "stage")
+)
+REQUEST_LATENCY = Histogram(
+    "fraud_request_duration_seconds",
+    "End-to-end scoring latency.",
+    ("endpoint",)
+)
+DECISIONS = Counter(
+    "fraud_decisions_total",
+    "Scored transactions by decision.",
+    ("decision",)
+)
+RULE_EVALUATIONS = Counter(
+    "fraud_rule_evaluations_total",
+    "Transactions evaluated by the rule engine (denominator of rule hit rates)."
+)
+RULE_HITS = Counter(
+    "fraud_rule_hits_total",
+    "Transactions on which each rule fired.",
+    ("rule",)
+)
+ERRORS = Counter(
+    "fraud_errors_total",
+    "Failed scoring requests.",
+    ("endpoint", "error")
+)
+
+
+def record_rule_hits(rule_details, n=1):
+    """rule_details: {rule: 0/1} for one transaction, or {rule: flag array} for a batch."""
+    RULE_EVALUATIONS.inc(n)
+    for rule, flags in rule_details.items():
+        hits = int(flags.sum()) if hasattr(flags, "sum") else int(flags)
+        if hits:
+            RULE_HITS.inc(hits, rule=rule)
@@ -0,0 +1,24 @@
+-- Indexes for the keyset-paginated /transactions and /decisions endpoints
+-- (see db_views.py). Each page is a range scan on (time, txn_id) DESC.
+--
+-- CONCURRENTLY keeps the tables writable while the indexes build; it cannot
+-- run inside a transaction, so apply this file with plain psql:
+--   psql "$DATABASE_URL" -f migrations/001_keyset_indexes.sql
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS transactions_raw_time_txn_idx
+    ON fraud.transactions_raw (timestamp DESC, txn_id DESC);
+
+-- ?user_id= filter; also serves the per-user last-transaction lookup
+CREATE INDEX CONCURRENTLY IF NOT EXISTS transactions_raw_user_time_txn_idx
+    ON fraud.transactions_raw (user_id, timestamp DESC, txn_id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS decisions_time_txn_idx
+    ON fraud.decisions (decision_time DESC, txn_id DESC);
+
+-- ?decision= filter
+CREATE INDEX CONCURRENTLY IF NOT EXISTS decisions_decision_time_txn_idx
+    ON fraud.decisions (decision, decision_time DESC, txn_id DESC);
+
+-- Joins between the two tables for cross-table filters
+CREATE INDEX CONCURRENTLY IF NOT EXISTS decisions_txn_idx
+    ON fraud.decisions (txn_id);
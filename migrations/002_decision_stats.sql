@@ -0,0 +1,16 @@
+-- Checkpoints of the in-process decision statistics (see decision_stats.py):
+-- one row per tumbling window, period and API worker, upserted every
+-- STATS_CHECKPOINT_SEC seconds. Fleet totals are the sum over workers.
+--   psql "$DATABASE_URL" -f migrations/002_decision_stats.sql
+
+CREATE TABLE IF NOT EXISTS fraud.decision_stats (
+    window_name  TEXT        NOT NULL,
+    period_start TIMESTAMPTZ NOT NULL,
+    worker       TEXT        NOT NULL,
+    state        JSONB       NOT NULL,
+    updated_at   TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (window_name, period_start, worker)
+);
+
+CREATE INDEX IF NOT EXISTS decision_stats_period_idx
+    ON fraud.decision_stats (window_name, period_start DESC);
@@ -0,0 +1,203 @@
+"""
+Versioned, pickle-light model bundle for fast API startup.
+
+Layout of a bundle directory:
+
+    manifest.json     format/model version, scaler params, ISO metadata, file checksums
+    booster.ubj       XGBoost booster in its native UBJSON format
+    iso_forest.joblib IsolationForest
+
+The SHAP TreeExplainer is rebuilt from the booster instead of being unpickled.
+
+    python model_bundle.py export [bundle_dir]   # convert the legacy *.pkl artifacts
+"""
+import hashlib
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import joblib
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, single-process use only
+    fcntl = None
+
+BUNDLE_FORMAT_VERSION = 1
+DEFAULT_BUNDLE_PATH = "model_bundle"
+
+MANIFEST_FILE = "manifest.json"
+BOOSTER_FILE = "booster.ubj"
+ISO_FILE = "iso_forest.joblib"
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _scaler_params(scaler):
+    return {
+        "feature_names": [str(c) for c in scaler.feature_names_in_],
+        "mean": [float(v) for v in scaler.mean_],
+        "scale": [float(v) for v in scaler.scale_],
+        "var": [float(v) for v in scaler.var_],
+        "n_samples_seen": int(np.asarray(scaler.n_samples_seen_).max()),
+    }
+
+
+def _scaler_from_params(params):
+    # A fitted StandardScaler rebuilt from its parameters (no pickle involved)
+    from sklearn.preprocessing import StandardScaler
+
+    scaler = StandardScaler()
+    scaler.feature_names_in_ = np.array(params["feature_names"], dtype=object)
+    scaler.n_features_in_ = len(params["feature_names"])
+    scaler.mean_ = np.array(params["mean"])
+    scaler.scale_ = np.array(params["scale"])
+    scaler.var_ = np.array(params["var"])
+    scaler.n_samples_seen_ = params["n_samples_seen"]
+    return scaler
+
+
+# --------------------------------------
+# SAVE
+# --------------------------------------
+def save_bundle(path, model, scaler, iso_model, iso_scaler, iso_meta):
+    """Writes a bundle directory and returns its manifest."""
+    import sklearn
+    import xgboost
+
+    os.makedirs(path, exist_ok=True)
+
+    model.save_model(os.path.join(path, BOOSTER_FILE))
+    joblib.dump(iso_model, os.path.join(path, ISO_FILE))
+
+    files = {name: _sha256(os.path.join(path, name)) for name in (BOOSTER_FILE, ISO_FILE)}
+    manifest = {
+        "format_version": BUNDLE_FORMAT_VERSION,
+        # Content hash of the models, used wherever results depend on "the model"
+        "model_version": hashlib.sha256("".join(files[n] for n in sorted(files)).encode()).hexdigest()[:16],
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "xgboost_version": xgboost.__version__,
+        "sklearn_version": sklearn.__version__,
+        "scaler": _scaler_params(scaler),
+        "iso_scaler": _scaler_params(iso_scaler),
+        "iso_meta": {k: float(v) for k, v in iso_meta.items()},
+        "files": files,
+    }
+
+    # Manifest last: a bundle without one is incomplete and never loaded
+    tmp_path = os.path.join(path, MANIFEST_FILE + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(path, MANIFEST_FILE))
+    return manifest
+
+
+# --------------------------------------
+# CROSS-PROCESS LOCK
+# --------------------------------------
+@contextmanager
+def artifact_lock(lock_path="artifacts.lock"):
+    """
+    Exclusive file lock around loading/training artifacts, so that among all
+    workers and servers on this host only one process ever runs training.
+    """
+    with open(lock_path, "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+# --------------------------------------
+# LOAD
+# --------------------------------------
+def bundle_exists(path=DEFAULT_BUNDLE_PATH):
+    return os.path.exists(os.path.join(path, MANIFEST_FILE))
+
+
+def read_manifest(path=DEFAULT_BUNDLE_PATH):
+    with open(os.path.join(path, MANIFEST_FILE)) as f:
+        return json.load(f)
+
+
+def load_bundle(path=DEFAULT_BUNDLE_PATH, verify=True, build_explainer=True):
+    """
+    Loads a bundle written by save_bundle.
+
+    Args:
+        verify (bool): Check every file against its manifest checksum.
+        build_explainer (bool): Rebuild the SHAP TreeExplainer from the booster.
+            Not needed with the pred_contribs explanation backend.
+
+    Returns:
+        dict: model, scaler, explainer, iso_model, iso_scaler, iso_meta, manifest
+
+    Raises:
+        ValueError: Unsupported format version or checksum mismatch.
+    """
+    from xgboost import XGBClassifier
+
+    manifest = read_manifest(path)
+    if manifest.get("format_version") != BUNDLE_FORMAT_VERSION:
+        raise ValueError(f"Unsupported model bundle format {manifest.get('format_version')!r} in {path}")
+
+    if verify:
+        for name, expected in manifest["files"].items():
+            if _sha256(os.path.join(path, name)) != expected:
+                raise ValueError(f"Checksum mismatch for {name} in model bundle {path}")
+
+    model = XGBClassifier()
+    model.load_model(os.path.join(path, BOOSTER_FILE))
+
+    explainer = None
+    if build_explainer:
+        import shap
+        explainer = shap.TreeExplainer(model)
+
+    return {
+        "model": model,
+        "scaler": _scaler_from_params(manifest["scaler"]),
+        "explainer": explainer,
+        "iso_model": joblib.load(os.path.join(path, ISO_FILE)),
+        "iso_scaler": _scaler_from_params(manifest["iso_scaler"]),
+        "iso_meta": manifest["iso_meta"],
+        "manifest": manifest,
+    }
+
+
+# --------------------------------------
+# CLI: export legacy pickles
+# --------------------------------------
+def export_legacy_artifacts(path=DEFAULT_BUNDLE_PATH):
+    start = time.perf_counter()
+    manifest = save_bundle(
+        path,
+        model=joblib.load("model.pkl"),
+        scaler=joblib.load("scaler.pkl"),
+        iso_model=joblib.load("iso_forest_model.pkl"),
+        iso_scaler=joblib.load("iso_scaler.pkl"),
+        iso_meta=joblib.load("iso_metadata.pkl")
+    )
+    print(f"✅ Exported model bundle {manifest['model_version']} to {path} "
+          f"in {time.perf_counter() - start:.2f}s")
+    return manifest
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "export":
+        print(__doc__)
+        sys.exit(1)
+    export_legacy_artifacts(sys.argv[2] if len(sys.argv) > 2 else DEFAULT_BUNDLE_PATH)
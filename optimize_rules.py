@@ -1,9 +1,10 @@
 import os
 import json
+import subprocess
+import sys
 import psycopg2
 import psycopg2.extras
 from dotenv import load_dotenv
-from openai import OpenAI
 
 load_dotenv()
 
@@ -63,9 +64,86 @@ def get_flagged_transactions():
             conn.close()
 
 # --------------------------------------
-# LLM OPTIMIZER
+# SUGGESTIONS FILE
 # --------------------------------------
-def run_optimization():
+def save_suggestions(suggestions, path=SUGGESTIONS_PATH):
+    """Appends suggestions to the suggestions file (created if missing)."""
+    try:
+        with open(path, 'r') as f:
+            existing = json.load(f)
+    except:
+        existing = []
+
+    existing.extend(suggestions)
+
+    with open(path, 'w') as f:
+        json.dump(existing, f, indent=2)
+
+    print(f"✅ Saved {len(suggestions)} new suggestions to {path}")
+
+# --------------------------------------
+# OPTIMIZERS
+# --------------------------------------
+def run_optimization(method=None):
+    """
+    Adds rule suggestions to SUGGESTIONS_PATH with RULE_OPTIMIZER (or `method`):
+    "search" (default) runs the numeric rule search locally, "llm" asks the LLM.
+    """
+    method = method or os.getenv("RULE_OPTIMIZER", "search")
+    if method == "llm":
+        return run_llm_optimization()
+    return run_search_optimization()
+
+def _search_data_path():
+    data_path = os.getenv("BACKTEST_DATA")
+    if not data_path or not os.path.exists(data_path):
+        raise ValueError("Rule search needs labeled history: set BACKTEST_DATA to a CSV/Parquet file with a Class column")
+    return data_path
+
+def search_command():
+    """
+    Command line of an offline rule_search.py run that appends to SUGGESTIONS_PATH,
+    on RULE_SEARCH_WORKERS processes (default 2). Raises ValueError without BACKTEST_DATA.
+    """
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rule_search.py")
+    return [
+        sys.executable, script, _search_data_path(),
+        "--rules", CONFIG_PATH,
+        "--objective", os.getenv("RULE_SEARCH_OBJECTIVE", "f1"),
+        "--strategy", os.getenv("RULE_SEARCH_STRATEGY", "coordinate"),
+        "--workers", os.getenv("RULE_SEARCH_WORKERS", "2"),
+        "--output", SUGGESTIONS_PATH,
+    ]
+
+def start_search_optimization():
+    """Starts the rule search in a separate process (see search_command) and returns it."""
+    return subprocess.Popen(search_command())
+
+def run_search_optimization():
+    """Rule search (rule_search.py) on the labeled history in BACKTEST_DATA, in this process."""
+    data_path = _search_data_path()
+
+    from rule_search import run_search
+
+    print("🔎 Starting Rule Search Optimization Run...")
+    result, suggestions = run_search(
+        data_path, CONFIG_PATH,
+        objective=os.getenv("RULE_SEARCH_OBJECTIVE", "f1"),
+        strategy=os.getenv("RULE_SEARCH_STRATEGY", "coordinate"),
+        workers=int(os.getenv("RULE_SEARCH_WORKERS", "0")) or None
+    )
+    print(f"📊 {result['objective']}: {result['baseline']:.4f} -> {result['best']:.4f} "
+          f"({result['evaluations']} candidates in {result['elapsed_s']}s)")
+
+    if suggestions:
+        save_suggestions(suggestions)
+    else:
+        print("No rule change improves the objective.")
+
+def run_llm_optimization():
+    # Imported here so importing this module (e.g. from api.py) doesn't load the LLM client
+    from openai import OpenAI
+
     print("🤖 Starting LLM Optimization Run...")
     
     # 1. Load Current Rules
@@ -176,21 +254,7 @@ def run_optimization():
 
     # 5. append to Suggestions File
     if 'suggestions' in suggestion_data and suggestion_data['suggestions']:
-        # Load existing
-        try:
-            with open(SUGGESTIONS_PATH, 'r') as f:
-                existing = json.load(f)
-        except:
-            existing = []
-            
-        # Append new
-        existing.extend(suggestion_data['suggestions'])
-        
-        # Save
-        with open(SUGGESTIONS_PATH, 'w') as f:
-            json.dump(existing, f, indent=2)
-            
-        print(f"✅ Saved {len(suggestion_data['suggestions'])} new suggestions to {SUGGESTIONS_PATH}")
+        save_suggestions(suggestion_data['suggestions'])
     else:
         print("No changes suggested by LLM.")
 
@@ -0,0 +1,69 @@
+"""
+Sampling profiler that can be switched on in a running server.
+
+A background thread snapshots every thread's Python stack with
+sys._current_frames() every `interval_ms`; nothing is hooked into the
+interpreter, so the cost when idle is zero and small while sampling.
+Results come back as top functions and flamegraph-ready collapsed stacks.
+"""
+import sys
+import threading
+import time
+from collections import Counter
+
+
+class SamplingProfiler:
+    def __init__(self, interval_ms=5.0, max_depth=64):
+        self.interval = interval_ms / 1000.0
+        self.max_depth = max_depth
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._started = None
+        self._elapsed = 0.0
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._elapsed = time.perf_counter() - self._started
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def report(self, top=25):
+        """Top functions by self/total samples plus collapsed stacks ("a;b;c count")."""
+        self_counts = Counter()
+        total_counts = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            self_counts[frames[-1]] += count
+            for name in set(frames):
+                total_counts[name] += count
+
+        n = sum(self.stacks.values()) or 1
+        return {
+            "duration_s": self._elapsed,
+            "interval_ms": self.interval * 1000.0,
+            "samples": self.samples,
+            "top_self": [{"frame": f, "fraction": c / n} for f, c in self_counts.most_common(top)],
+            "top_total": [{"frame": f, "fraction": c / n} for f, c in total_counts.most_common(top)],
+            "collapsed": [f"{stack} {count}" for stack, count in self.stacks.most_common()],
+        }
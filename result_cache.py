@@ -0,0 +1,150 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# RESULT_CACHE modes: which requests get a cache key
+#   off     - no caching
+#   key     - only requests carrying an Idempotency-Key header
+#   payload - that header, else a hash of the payload + model and rules version
+RESULT_CACHE_MODES = ("off", "key", "payload")
+
+
+def payload_hash(data):
+    """Order-independent hash of a transaction payload."""
+    canonical = json.dumps(data, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def payload_key(data, model_version, rules_version):
+    """Key for a transaction payload: the same features under the same models and rules."""
+    digest = hashlib.sha256(f"{model_version}|{rules_version}|{payload_hash(data)}".encode()).hexdigest()
+    return f"payload:{digest}"
+
+
+class IdempotencyConflict(ValueError):
+    """An idempotency key was reused with a different payload."""
+
+
+class ResultCache:
+    """
+    Scoring responses by idempotency key or payload hash, with LRU + TTL eviction,
+    so a retried or replayed transaction gets its original decision (and txn_id)
+    back without inference or DB inserts. Each entry keeps the hash of the payload
+    that produced it; a lookup with a different payload raises IdempotencyConflict.
+
+    Args:
+        mode (str): See RESULT_CACHE_MODES.
+        max_entries (int): Memory cap; least recently used entries are evicted beyond it.
+        ttl_sec (float): Entries older than this are dropped (retries arrive within seconds).
+    """
+
+    def __init__(self, mode="key", max_entries=10_000, ttl_sec=300):
+        if mode not in RESULT_CACHE_MODES:
+            raise ValueError(f"Unknown result cache mode {mode!r}, expected one of {RESULT_CACHE_MODES}")
+        self.mode = mode
+        self.max_entries = max_entries
+        self.ttl_sec = ttl_sec
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def key_for(self, data, idempotency_key=None, model_version="", rules_version=""):
+        """Cache key for one request, or None if this mode doesn't cache it."""
+        if self.mode == "off":
+            return None
+        if idempotency_key:
+            return f"key:{idempotency_key}"
+        if self.mode == "payload":
+            return payload_key(data, model_version, rules_version)
+        return None
+
+    def get(self, key, payload_hash=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] > self.ttl_sec:
+                del self._entries[key]
+                self.evictions += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            _check_payload(key, entry[2], payload_hash)
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, response, payload_hash=None):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), response, payload_hash)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    async def aget_or_compute(self, key, compute, payload_hash=None):
+        """
+        Returns (response, cached). A request whose key is still being scored
+        waits for that result instead of scoring the same payload again.
+
+        Args:
+            compute: Coroutine function producing the response on a miss.
+            payload_hash: payload_hash() of the request; a cached or in-flight
+                entry under the same key with another hash raises IdempotencyConflict.
+        """
+        response = self.get(key, payload_hash)
+        if response is not None:
+            return response, True
+
+        pending, pending_hash = self._inflight.get(key, (None, None))
+        if pending is not None:
+            _check_payload(key, pending_hash, payload_hash)
+            response = await asyncio.shield(pending)
+            # None: the first request failed, so score this one normally
+            if response is not None:
+                with self._lock:
+                    self.misses -= 1
+                    self.hits += 1
+                return response, True
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = (future, payload_hash)
+        try:
+            response = await compute()
+            self.put(key, response, payload_hash)
+            return response, False
+        finally:
+            if self._inflight.get(key, (None,))[0] is future:
+                del self._inflight[key]
+            future.set_result(response)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "entries": len(self)}
+
+
+def _check_payload(key, stored_hash, payload_hash):
+    if stored_hash is not None and payload_hash is not None and stored_hash != payload_hash:
+        raise IdempotencyConflict(f"{key} was already used with a different payload")
+
+
+def create_result_cache():
+    """Builds the cache selected by RESULT_CACHE (off | key | payload), or None when off."""
+    mode = os.getenv("RESULT_CACHE", "key")
+    if mode == "off":
+        return None
+    return ResultCache(
+        mode=mode,
+        max_entries=int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "10000")),
+        ttl_sec=float(os.getenv("RESULT_CACHE_TTL_SEC", "300"))
+    )
@@ -0,0 +1,365 @@
+"""
+Rule back-testing: replays historical transactions against the current and a
+proposed fraud_rules.json and reports what the change would have done.
+
+History comes from a CSV (creditcard.csv layout), a Parquet file or the last
+N rows of fraud.transactions_raw. The ML channels do not depend on the rules,
+so they are scored once per history (and, for files, cached on disk by model
+version); each config then costs one vectorized evaluate_plan() plus the
+blend, i.e. milliseconds per million rows.
+
+    python rule_backtest.py creditcard.csv --proposed candidate_rules.json
+    python rule_backtest.py history.parquet --suggestions suggestions.json
+    python rule_backtest.py db --limit 500000 --suggestions suggestions.json
+
+The report has, per config, the decision counts, flag rate (REVIEW + BLOCK),
+per-rule hit rates and, when the history has a Class label, precision and
+recall of the flagged set; plus the deltas and how many decisions moved.
+
+Velocity uses per-user history in row order on the Time column, as in
+stream_scoring.py (rows without a user_id share one history).
+"""
+import argparse
+import copy
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import db
+import fraud_pipeline as ml_pipeline
+import model_bundle
+import scoring
+from fraud_pipeline.cache import StageCache, file_fingerprint, load_arrays, save_arrays
+from fraud_rules import FEATURE_COLUMNS, compile_rules, evaluate_plan
+
+DECISIONS = ("ALLOW", "REVIEW", "BLOCK")
+
+# Rows scored per model call when precomputing the ML channels
+ML_CHUNK_SIZE = 100_000
+
+RECENT_TXNS_QUERY = """
+    SELECT user_id, raw_payload FROM fraud.transactions_raw
+    ORDER BY timestamp DESC
+    LIMIT %s
+"""
+
+
+# --------------------------------------
+# CONFIG CHANGES
+# --------------------------------------
+def apply_suggestions(config, suggestions):
+    """
+    Copy of `config` with suggestions (dicts or pydantic models with target_rule,
+    parameter, proposed_value) applied, as /apply_rules does: only parameters
+    that already exist in the config are changed.
+
+    Returns:
+        tuple: (new config, number of changes applied)
+    """
+    config = copy.deepcopy(config)
+    applied = 0
+    for item in suggestions:
+        if not isinstance(item, dict):
+            item = item.model_dump()
+        rule = config.get(item["target_rule"])
+        if rule is not None and item["parameter"] in rule:
+            rule[item["parameter"]] = item["proposed_value"]
+            applied += 1
+    return config, applied
+
+
+def config_version(config):
+    """Same hash as RuleEngine.version for a loaded config."""
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:16]
+
+
+# --------------------------------------
+# HISTORY
+# --------------------------------------
+def last_txn_times(times, user_ids=None):
+    """
+    Per row, the Time of the same user's previous row (NaN for a user's first),
+    in row order; what StreamScorer feeds the velocity rule, without the loop.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    last = np.full(len(times), np.nan)
+    if len(times) == 0:
+        return last
+    if user_ids is None:
+        last[1:] = times[:-1]
+        return last
+
+    codes = pd.factorize(np.asarray(user_ids))[0]
+    # Stable sort groups each user's rows while keeping their arrival order
+    order = np.argsort(codes, kind="stable")
+    same_user = codes[order][1:] == codes[order][:-1]
+    last[order[1:][same_user]] = times[order[:-1][same_user]]
+    return last
+
+
+def load_file(path, limit=None):
+    """
+    Reads FEATURE_COLUMNS plus optional user_id / Class from a CSV or Parquet file.
+
+    Returns:
+        dict: "X" ((n, 30) float64), "user_ids" (array or None), "labels" (int8 array or None).
+    """
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        columns = pq.ParquetFile(path).schema_arrow.names
+        usecols = FEATURE_COLUMNS + [c for c in ("user_id", "Class") if c in columns]
+        df = pd.read_parquet(path, columns=usecols)
+        if limit is not None:
+            df = df.head(limit)
+    else:
+        columns = list(pd.read_csv(path, nrows=0).columns)
+        usecols = FEATURE_COLUMNS + [c for c in ("user_id", "Class") if c in columns]
+        df = pd.read_csv(path, usecols=usecols, nrows=limit, dtype={c: np.float64 for c in FEATURE_COLUMNS})
+
+    missing = [c for c in FEATURE_COLUMNS if c not in df]
+    if missing:
+        raise ValueError(f"{path} is missing columns {missing}")
+    return _history(df)
+
+
+def load_db(limit=100_000):
+    """The last `limit` transactions in fraud.transactions_raw, oldest first."""
+    rows = db.execute_query(RECENT_TXNS_QUERY, (limit,)) or []
+    records = []
+    for row in reversed(rows):
+        payload = row["raw_payload"]
+        record = dict(json.loads(payload) if isinstance(payload, str) else payload)
+        record["user_id"] = row["user_id"]
+        records.append(record)
+    if not records:
+        raise ValueError("No transactions in fraud.transactions_raw to back-test against")
+
+    df = pd.DataFrame.from_records(records)
+    for col in FEATURE_COLUMNS:
+        if col not in df:
+            df[col] = 0.0
+    if "Class" in df and df["Class"].isna().any():
+        # Labels only count when every row has one
+        df = df.drop(columns="Class")
+    return _history(df)
+
+
+def _history(df):
+    return {
+        "X": df[FEATURE_COLUMNS].to_numpy(dtype=np.float64),
+        "user_ids": df["user_id"].to_numpy() if "user_id" in df else None,
+        "labels": df["Class"].to_numpy(dtype=np.int8) if "Class" in df else None,
+    }
+
+
+def score_ml(X, components, chunk_size=ML_CHUNK_SIZE):
+    """Both ML channels for every row, scored in chunks to bound peak memory."""
+    xgb = np.empty(len(X))
+    iso = np.empty(len(X))
+    for start in range(0, len(X), chunk_size):
+        scores = ml_pipeline.compute_risk_scores_batch(
+            X[start:start + chunk_size],
+            components=components,
+            weights={"xgb": 1.0, "iso": 1.0}
+        )
+        xgb[start:start + chunk_size] = scores["xgb"]
+        iso[start:start + chunk_size] = scores["iso"]
+    return {"xgb": xgb, "iso": iso}
+
+
+# --------------------------------------
+# BACKTESTER
+# --------------------------------------
+class Backtester:
+    """
+    Replays one history against any number of rule configs.
+
+    Args:
+        X (np.ndarray): (n, 30) matrix in FEATURE_COLUMNS order.
+        ml_scores (dict, optional): "xgb" and "iso" arrays. Without them only the
+            rules are replayed and "flagged" means any rule fired.
+        labels (np.ndarray, optional): 0/1 fraud labels for precision/recall.
+        user_ids (np.ndarray, optional): Velocity history key per row.
+    """
+
+    def __init__(self, X, ml_scores=None, labels=None, user_ids=None):
+        self.X = np.asarray(X, dtype=np.float64)
+        self.labels = None if labels is None else np.asarray(labels).astype(bool)
+        self.last_txn_time = last_txn_times(self.X[:, 0], user_ids)
+        self.ml_scores = ml_scores
+        # The ML part of the blend is the same for every config
+        self.ml_risk = None if ml_scores is None else (
+            scoring.BLEND_WEIGHTS["xgb"] * np.asarray(ml_scores["xgb"]) +
+            scoring.BLEND_WEIGHTS["iso"] * np.asarray(ml_scores["iso"])
+        )
+
+    def __len__(self):
+        return len(self.X)
+
+    @classmethod
+    def from_history(cls, history, components=None, ml_scores=None):
+        """Builds a backtester from load_file()/load_db() output, scoring the ML channels if given components."""
+        if ml_scores is None and components is not None:
+            ml_scores = score_ml(history["X"], components)
+        return cls(history["X"], ml_scores, history["labels"], history["user_ids"])
+
+    @classmethod
+    def from_file(cls, path, components=None, model_version=None, cache=None, limit=None):
+        """
+        Like from_history(load_file(path)); with a StageCache the ML scores are
+        stored per (file, model version, limit) and reused on the next run.
+        """
+        history = load_file(path, limit)
+        if components is None or cache is None:
+            return cls.from_history(history, components)
+
+        params = {"data": file_fingerprint(path), "model_version": model_version, "limit": limit}
+        ml_scores, _ = cache.run(
+            "backtest_ml", params, [],
+            lambda: score_ml(history["X"], components),
+            save_arrays,
+            load_arrays
+        )
+        return cls.from_history(history, ml_scores=ml_scores)
+
+    def evaluate(self, config):
+        """Rule scores, flags, risk and decisions of one config (raw arrays)."""
+        rule_scores, rule_flags = evaluate_plan(compile_rules(config), self.X, self.last_txn_time)
+        result = {"rules": rule_scores, "rule_flags": rule_flags}
+        if self.ml_risk is None:
+            result["flagged"] = rule_scores > 0
+            return result
+
+        # scoring.blend_risk with the ML terms added up once
+        risk = np.clip(self.ml_risk + scoring.BLEND_WEIGHTS["rules"] * rule_scores, 0.0, 1.0)
+        # 0 = ALLOW, 1 = REVIEW, 2 = BLOCK; same cut-offs as scoring.decide
+        codes = (risk > scoring.REVIEW_THRESHOLD).astype(np.int8) + (risk > scoring.BLOCK_THRESHOLD)
+        result.update(risk=risk, decision_codes=codes, flagged=codes > 0)
+        return result
+
+    def summarize(self, result):
+        """Report section for one evaluate() result."""
+        n = len(self)
+        flagged = result["flagged"]
+        n_flagged = int(flagged.sum())
+        summary = {
+            "flagged": n_flagged,
+            "flag_rate": n_flagged / n if n else 0.0,
+            "decisions": None,
+            "rule_hit_rates": {rule: float(flags.mean()) if n else 0.0 for rule, flags in result["rule_flags"].items()},
+        }
+        if "decision_codes" in result:
+            counts = np.bincount(result["decision_codes"], minlength=len(DECISIONS))
+            summary["decisions"] = {d: int(c) for d, c in zip(DECISIONS, counts)}
+
+        if self.labels is not None:
+            true_positives = int((flagged & self.labels).sum())
+            positives = int(self.labels.sum())
+            summary["precision"] = true_positives / n_flagged if n_flagged else None
+            summary["recall"] = true_positives / positives if positives else None
+        return summary
+
+    def compare(self, current, proposed):
+        """
+        Back-tests `proposed` against `current` (both rule config dicts).
+
+        Returns:
+            dict: rows, labeled, current / proposed summaries, delta and how
+            many rows changed decision, became flagged or stopped being flagged.
+        """
+        started = time.perf_counter()
+        before = self.evaluate(current)
+        after = self.evaluate(proposed)
+
+        report = {
+            "rows": len(self),
+            "labeled": self.labels is not None,
+            "rules_only": self.ml_scores is None,
+            "current": {"version": config_version(current), **self.summarize(before)},
+            "proposed": {"version": config_version(proposed), **self.summarize(after)},
+        }
+        cur, new = report["current"], report["proposed"]
+
+        delta = {"flag_rate": new["flag_rate"] - cur["flag_rate"]}
+        for metric in ("precision", "recall"):
+            if cur.get(metric) is not None and new.get(metric) is not None:
+                delta[metric] = new[metric] - cur[metric]
+        if cur["decisions"] is not None:
+            delta["decisions"] = {d: new["decisions"][d] - cur["decisions"][d] for d in DECISIONS}
+        report["delta"] = delta
+
+        if "decision_codes" in before:
+            report["changed_decisions"] = int((before["decision_codes"] != after["decision_codes"]).sum())
+        report["newly_flagged"] = int((after["flagged"] & ~before["flagged"]).sum())
+        report["unflagged"] = int((before["flagged"] & ~after["flagged"]).sum())
+        report["elapsed_s"] = round(time.perf_counter() - started, 3)
+        return report
+
+    def compare_suggestions(self, config, suggestions):
+        """compare() of `config` against it with all `suggestions` applied."""
+        proposed, _ = apply_suggestions(config, suggestions)
+        return self.compare(config, proposed)
+
+
+def create_backtester(components=None, model_version=None):
+    """
+    Backtester over BACKTEST_DATA (a CSV/Parquet path; ML scores cached in
+    PIPELINE_CACHE_DIR) or, when unset, the last BACKTEST_DB_ROWS (default
+    100000) transactions in the DB.
+    """
+    path = os.getenv("BACKTEST_DATA")
+    if path:
+        return Backtester.from_file(path, components, model_version, StageCache())
+    return Backtester.from_history(load_db(int(os.getenv("BACKTEST_DB_ROWS", "100000"))), components)
+
+
+# --------------------------------------
+# CLI
+# --------------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Back-test a rules change against historical transactions")
+    parser.add_argument("source", help="creditcard.csv-layout CSV, a Parquet file, or 'db' for fraud.transactions_raw")
+    parser.add_argument("--rules", default="fraud_rules.json", help="Current rules")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--proposed", help="Proposed rules file")
+    group.add_argument("--suggestions", help="suggestions.json to apply to --rules")
+    parser.add_argument("--limit", type=int, default=None, help="Rows to replay (db: most recent, default 100000)")
+    parser.add_argument("--bundle", default=model_bundle.DEFAULT_BUNDLE_PATH)
+    parser.add_argument("--rules-only", action="store_true", help="Skip the ML channels; flagged = any rule fired")
+    parser.add_argument("--no-cache", action="store_true", help="Recompute the ML scores of a file source")
+    args = parser.parse_args(argv)
+
+    with open(args.rules) as f:
+        current = json.load(f)
+    if args.proposed:
+        with open(args.proposed) as f:
+            proposed = json.load(f)
+    else:
+        with open(args.suggestions) as f:
+            proposed, _ = apply_suggestions(current, json.load(f))
+
+    components, model_version = (None, None) if args.rules_only else scoring.load_components(args.bundle)
+
+    started = time.perf_counter()
+    if args.source == "db":
+        backtester = Backtester.from_history(load_db(args.limit or 100_000), components)
+    else:
+        if not os.path.exists(args.source):
+            parser.error(f"{args.source} does not exist")
+        cache = StageCache(enabled=not args.no_cache)
+        backtester = Backtester.from_file(args.source, components, model_version, cache, args.limit)
+    loaded = time.perf_counter() - started
+
+    report = backtester.compare(current, proposed)
+    report["load_s"] = round(loaded, 3)
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    main()
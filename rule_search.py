@@ -0,0 +1,380 @@
+"""
+Numeric search for fraud_rules.json parameters against labeled history; the
+local, deterministic counterpart of the LLM optimizer in optimize_rules.py.
+
+Every searched value of every parameter maps to a boolean mask over the
+history (velocity window -> dt < w, PCA set + threshold -> any |V| > t, amount
+thresholds -> amt < s / amt > l), built once by fraud_rules.rule_flags and
+cached. A candidate config is then only a weighted sum of cached masks plus
+the objective, and candidates are spread over a process pool that inherits
+the masks when it forks.
+
+Objectives (the ones the training pipeline tunes its threshold with):
+- f1: F1 of the transactions the API would flag (REVIEW + BLOCK). Without the
+  ML channels (--rules-only), the best F1 over rule-score cut-offs, as in
+  fraud_pipeline.training.best_f1_threshold.
+- pr_auc: average precision of the blended risk (or of the rule score).
+
+Strategies:
+- grid: every combination of the search space, or a random sample of
+  `max_candidates` of them when the grid is larger.
+- coordinate: from the current config, evaluate every single-parameter move
+  in parallel, take the best, repeat until nothing improves.
+
+    python rule_search.py creditcard.csv --objective pr_auc --workers 8
+    python rule_search.py history.parquet --strategy grid --max-candidates 5000 --output suggestions.json
+
+Output follows the suggestions.json schema, so /suggestions and /apply_rules
+handle it like LLM suggestions.
+"""
+import argparse
+import copy
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import model_bundle
+import scoring
+from fraud_pipeline.cache import StageCache
+from fraud_rules import combine_flags, compile_rules, rule_flags
+from rule_backtest import Backtester
+
+OBJECTIVES = ("f1", "pr_auc")
+STRATEGIES = ("coordinate", "grid")
+
+# rule -> parameter -> values tried (the current value is always added)
+SEARCH_SPACE = {
+    "velocity": {
+        "time_window_sec": [0.5, 1, 2, 5, 10, 30],
+        "weight": [0.5, 1, 2, 3],
+    },
+    "high_risk_pca": {
+        "default_threshold": [1.5, 2, 2.5, 3, 4, 5],
+        "components": [
+            ["V14"],
+            ["V12", "V14"],
+            ["V10", "V12", "V14"],
+            ["V4", "V10", "V12", "V14"],
+            ["V3", "V10", "V12", "V14", "V17"],
+        ],
+        "weight": [0.5, 1, 1.5, 2, 3],
+    },
+    "amount_anomaly": {
+        "small_threshold": [1, 5, 10, 20],
+        "large_threshold": [200, 500, 1000, 2000],
+        "weight": [0.25, 0.5, 1, 2],
+    },
+    "combo_pattern": {
+        "weight": [0.5, 1, 2, 3],
+    },
+}
+
+
+def search_space(config, space=SEARCH_SPACE):
+    """
+    [(rule, parameter, values)] for the enabled rules of `config`, each list
+    starting with the parameter's current value.
+    """
+    params = []
+    for rule, rule_space in space.items():
+        rule_cfg = config.get(rule, {})
+        if not rule_cfg.get("enabled", False):
+            continue
+        for param, values in rule_space.items():
+            if param not in rule_cfg:
+                continue
+            current = rule_cfg[param]
+            params.append((rule, param, [current] + [v for v in values if v != current]))
+    return params
+
+
+def apply_overrides(config, overrides):
+    """Copy of `config` with ((rule, parameter), value) overrides."""
+    config = copy.deepcopy(config)
+    for (rule, param), value in overrides:
+        config[rule][param] = value
+    return config
+
+
+# --------------------------------------
+# PRECOMPUTED MASKS
+# --------------------------------------
+class RuleMasks:
+    """
+    Labeled history plus a cache of rule masks keyed by the parameters they
+    depend on (fraud_rules.rule_flags), so candidate configs reuse the masks
+    of every value already seen.
+
+    Args:
+        X (np.ndarray): (n, 30) matrix in FEATURE_COLUMNS order.
+        last_txn_time (np.ndarray): Per-row previous Time (NaN = no history).
+        labels (np.ndarray): 0/1 fraud labels.
+        ml_risk (np.ndarray, optional): ML part of the blend; None scores rules only.
+        objective (str): "f1" or "pr_auc".
+    """
+
+    def __init__(self, X, last_txn_time, labels, ml_risk=None, objective="f1"):
+        if objective not in OBJECTIVES:
+            raise ValueError(f"Unknown objective {objective!r}, expected one of {OBJECTIVES}")
+        self.X = np.asarray(X, dtype=np.float64)
+        self.last_txn_time = np.asarray(last_txn_time, dtype=np.float64)
+        self.labels = np.asarray(labels).astype(bool)
+        self.ml_risk = ml_risk
+        self.objective = objective
+        self._cache = {}
+
+    @classmethod
+    def from_backtester(cls, backtester, objective="f1"):
+        if backtester.labels is None:
+            raise ValueError("Rule search needs labeled history (a Class column)")
+        return cls(backtester.X, backtester.last_txn_time, backtester.labels, backtester.ml_risk, objective)
+
+    def __len__(self):
+        return len(self.X)
+
+    def precompute(self, config, params):
+        """Builds the masks of every value in `params` (see search_space) up front."""
+        for rule, param, values in params:
+            for value in values:
+                self.rule_scores(apply_overrides(config, [((rule, param), value)]))
+
+    def rule_scores(self, config):
+        """Normalized rule scores of `config`; the same as evaluate_plan's."""
+        plan = compile_rules(config)
+        flags = rule_flags(plan, self.X, self.last_txn_time, self._cache)
+        return combine_flags(plan, flags, len(self.X))
+
+    def score(self, config):
+        """Objective value of `config` on the history (higher is better)."""
+        rules = self.rule_scores(config)
+        if self.ml_risk is None:
+            risk = rules
+        else:
+            risk = np.clip(self.ml_risk + scoring.BLEND_WEIGHTS["rules"] * rules, 0.0, 1.0)
+
+        if self.objective == "pr_auc":
+            from sklearn.metrics import average_precision_score
+
+            return float(average_precision_score(self.labels, risk))
+
+        if self.ml_risk is not None:
+            flagged = risk > scoring.REVIEW_THRESHOLD
+        else:
+            from fraud_pipeline.training import best_f1_threshold
+
+            flagged = risk >= best_f1_threshold(self.labels, risk)
+        true_positives = int((flagged & self.labels).sum())
+        errors = int((flagged ^ self.labels).sum())
+        return 2 * true_positives / (2 * true_positives + errors) if true_positives else 0.0
+
+
+# --------------------------------------
+# WORKERS
+# --------------------------------------
+_worker = {}
+
+
+def _init_worker(masks, config):
+    # Under fork the masks are inherited, not pickled
+    _worker["masks"] = masks
+    _worker["config"] = config
+
+
+def _evaluate(overrides):
+    return _worker["masks"].score(apply_overrides(_worker["config"], overrides))
+
+
+class _Evaluator:
+    """Scores batches of override tuples, on a process pool when workers > 1."""
+
+    def __init__(self, masks, config, workers):
+        self.evaluations = 0
+        self.workers = workers
+        self._pool = None
+        _init_worker(masks, config)
+        if workers > 1:
+            self._pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(masks, config))
+
+    def __call__(self, candidates):
+        self.evaluations += len(candidates)
+        if self._pool is None:
+            return [_evaluate(c) for c in candidates]
+        chunksize = max(1, len(candidates) // (self.workers * 4))
+        return list(self._pool.map(_evaluate, candidates, chunksize=chunksize))
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+
+
+# --------------------------------------
+# SEARCH
+# --------------------------------------
+def _grid_candidates(params, max_candidates, seed):
+    sizes = [len(values) for _, _, values in params]
+    total = int(np.prod(sizes)) if sizes else 1
+    if total <= max_candidates:
+        indices = itertools.product(*[range(s) for s in sizes])
+    else:
+        # The current config (all indices 0) plus distinct random combinations
+        rng = np.random.default_rng(seed)
+        picked = {0}
+        while len(picked) < max_candidates:
+            picked.add(int(rng.integers(total)))
+        indices = [np.unravel_index(i, sizes) for i in sorted(picked)]
+
+    return [
+        tuple(((rule, param), values[i]) for (rule, param, values), i in zip(params, index) if i)
+        for index in indices
+    ]
+
+
+def _coordinate_search(evaluate, params, baseline, max_rounds):
+    best, best_value = {}, baseline
+    for _ in range(max_rounds):
+        moves = [
+            {**best, (rule, param): value}
+            for rule, param, values in params
+            for value in values
+            if best.get((rule, param), values[0]) != value
+        ]
+        if not moves:
+            break
+        values = evaluate([tuple(m.items()) for m in moves])
+        i = int(np.argmax(values))
+        if values[i] <= best_value:
+            break
+        best, best_value = moves[i], values[i]
+    return tuple(best.items()), best_value
+
+
+def search(masks, config, strategy="coordinate", space=SEARCH_SPACE, workers=None, max_candidates=2000,
+           max_rounds=20, seed=42):
+    """
+    Searches `space` around `config` on `masks`.
+
+    Returns:
+        dict: objective, baseline and best values, the best config, its
+        overrides ({rule: {parameter: value}}), evaluations and elapsed_s.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy {strategy!r}, expected one of {STRATEGIES}")
+    started = time.perf_counter()
+    params = search_space(config, space)
+    masks.precompute(config, params)
+    baseline = masks.score(config)
+
+    evaluate = _Evaluator(masks, config, workers or os.cpu_count() or 1)
+    try:
+        if strategy == "grid":
+            candidates = _grid_candidates(params, max_candidates, seed)
+            values = evaluate(candidates)
+            i = int(np.argmax(values))
+            best, best_value = candidates[i], values[i]
+        else:
+            best, best_value = _coordinate_search(evaluate, params, baseline, max_rounds)
+    finally:
+        evaluate.close()
+
+    # Keep the current config on ties
+    if best_value <= baseline:
+        best, best_value = (), baseline
+    best = tuple((key, value) for key, value in best if config[key[0]][key[1]] != value)
+
+    changes = {}
+    for (rule, param), value in best:
+        changes.setdefault(rule, {})[param] = value
+    return {
+        "objective": masks.objective,
+        "rows": len(masks),
+        "baseline": baseline,
+        "best": best_value,
+        "changes": changes,
+        "config": apply_overrides(config, best),
+        "evaluations": evaluate.evaluations,
+        "elapsed_s": round(time.perf_counter() - started, 3),
+    }
+
+
+def to_suggestions(result, masks, config):
+    """The search result as suggestions.json entries, one per changed parameter."""
+    suggestions = []
+    overrides = [((rule, param), value) for rule, params in result["changes"].items() for param, value in params.items()]
+    for (rule, param), value in overrides:
+        alone = masks.score(apply_overrides(config, [((rule, param), value)]))
+        suggestions.append({
+            "target_rule": rule,
+            "parameter": param,
+            "current_value": config[rule][param],
+            "proposed_value": value,
+            "reasoning": (
+                f"Rule search on {result['rows']} labeled transactions: {result['objective']} "
+                f"{result['baseline']:.4f} -> {result['best']:.4f} with all {len(overrides)} changes, "
+                f"{alone:.4f} with this one alone."
+            ),
+        })
+    return suggestions
+
+
+def run_search(data_path, rules_path="fraud_rules.json", objective="f1", strategy="coordinate", workers=None,
+               bundle_path=model_bundle.DEFAULT_BUNDLE_PATH, rules_only=False, limit=None, **search_kwargs):
+    """
+    Loads labeled history from a CSV/Parquet file (ML scores cached as in
+    rule_backtest.py), searches the rules in `rules_path` and returns
+    (search result, suggestions).
+    """
+    with open(rules_path) as f:
+        config = json.load(f)
+
+    components, model_version = (None, None) if rules_only else scoring.load_components(bundle_path)
+    backtester = Backtester.from_file(data_path, components, model_version, StageCache(), limit)
+    masks = RuleMasks.from_backtester(backtester, objective)
+
+    result = search(masks, config, strategy, workers=workers, **search_kwargs)
+    return result, to_suggestions(result, masks, config)
+
+
+# --------------------------------------
+# CLI
+# --------------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search fraud_rules.json parameters against labeled history")
+    parser.add_argument("data", help="creditcard.csv-layout CSV or a Parquet file with a Class column")
+    parser.add_argument("--rules", default="fraud_rules.json")
+    parser.add_argument("--objective", choices=OBJECTIVES, default="f1")
+    parser.add_argument("--strategy", choices=STRATEGIES, default="coordinate")
+    parser.add_argument("--workers", type=int, default=None, help="Processes (default: cpu_count)")
+    parser.add_argument("--max-candidates", type=int, default=2000, help="Grid: candidates sampled when larger")
+    parser.add_argument("--max-rounds", type=int, default=20, help="Coordinate: improvement rounds")
+    parser.add_argument("--limit", type=int, default=None, help="Rows of history to use")
+    parser.add_argument("--bundle", default=model_bundle.DEFAULT_BUNDLE_PATH)
+    parser.add_argument("--rules-only", action="store_true", help="Optimize the rule score alone, without ML")
+    parser.add_argument("--output", help="Append the suggestions to this suggestions.json")
+    args = parser.parse_args(argv)
+
+    result, suggestions = run_search(
+        args.data, args.rules,
+        objective=args.objective,
+        strategy=args.strategy,
+        workers=args.workers,
+        bundle_path=args.bundle,
+        rules_only=args.rules_only,
+        limit=args.limit,
+        max_candidates=args.max_candidates,
+        max_rounds=args.max_rounds
+    )
+    print(json.dumps({**result, "suggestions": suggestions}, indent=2))
+
+    if args.output and suggestions:
+        from optimize_rules import save_suggestions
+
+        save_suggestions(suggestions, args.output)
+    return result, suggestions
+
+
+if __name__ == "__main__":
+    main()
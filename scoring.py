@@ -0,0 +1,118 @@
+"""
+Score blending and decision thresholds shared by the API and the offline
+scorers (stream_scoring.py), plus loading the model components without
+importing the FastAPI app.
+"""
+import os
+
+import numpy as np
+
+import fraud_pipeline as ml_pipeline
+import model_bundle
+
+# ML is powerful, but Rules are precise constraints
+BLEND_WEIGHTS = {"xgb": 0.6, "iso": 0.2, "rules": 0.2}
+
+BLOCK_THRESHOLD = 0.8
+REVIEW_THRESHOLD = 0.6
+
+
+def blend_risk(xgb_score, iso_score, rule_score):
+    """Weighted blend of the three channels clipped to [0, 1]; scalars or arrays."""
+    final_risk = (
+        BLEND_WEIGHTS["xgb"] * xgb_score +
+        BLEND_WEIGHTS["iso"] * iso_score +
+        BLEND_WEIGHTS["rules"] * rule_score
+    )
+    return np.clip(final_risk, 0.0, 1.0)
+
+
+def decide(risk_score):
+    if risk_score > BLOCK_THRESHOLD:
+        return "BLOCK"
+    elif risk_score > REVIEW_THRESHOLD:
+        return "REVIEW"
+    return "ALLOW"
+
+
+def decide_many(risk_scores):
+    """Vectorized decide() over an array of risk scores."""
+    risk_scores = np.asarray(risk_scores)
+    return np.where(
+        risk_scores > BLOCK_THRESHOLD, "BLOCK",
+        np.where(risk_scores > REVIEW_THRESHOLD, "REVIEW", "ALLOW")
+    )
+
+
+# --------------------------------------
+# MODEL COMPONENTS
+# --------------------------------------
+def build_components(model, scaler, iso_model, iso_scaler, iso_meta):
+    """The components dict compute_risk_scores_batch expects, with scaler vectors precomputed."""
+    return ml_pipeline.prepare_components({
+        "xgb": {"model": model, "scaler": scaler},
+        "iso": {"model": iso_model, "scaler": iso_scaler, "score_min": iso_meta["score_min"],
+                "score_max": iso_meta["score_max"]},
+    })
+
+
+def load_components(bundle_path=model_bundle.DEFAULT_BUNDLE_PATH):
+    """
+    Loads the scoring models from the model bundle, or from the legacy *.pkl
+    artifacts when no bundle exists yet. Never trains.
+
+    Returns:
+        tuple: (components, model_version)
+
+    Raises:
+        FileNotFoundError: Neither a bundle nor the legacy artifacts exist.
+    """
+    if model_bundle.bundle_exists(bundle_path):
+        bundle = model_bundle.load_bundle(bundle_path, build_explainer=False)
+        components = build_components(
+            bundle["model"], bundle["scaler"], bundle["iso_model"], bundle["iso_scaler"], bundle["iso_meta"]
+        )
+        return components, bundle["manifest"]["model_version"]
+
+    import joblib
+
+    if not os.path.exists("model.pkl"):
+        raise FileNotFoundError(
+            f"No model bundle at {bundle_path} and no model.pkl; start the API once to train "
+            "or run `python model_bundle.py export`"
+        )
+    components = build_components(
+        joblib.load("model.pkl"),
+        joblib.load("scaler.pkl"),
+        joblib.load("iso_forest_model.pkl"),
+        joblib.load("iso_scaler.pkl"),
+        joblib.load("iso_metadata.pkl")
+    )
+    return components, "legacy"
+
+
+def score_matrix(X, components, rule_engine, last_txn_time=None):
+    """
+    Rules, both ML channels, the blend and decisions for an (n, 30) matrix in
+    FEATURE_COLUMNS order; the same math as /score_transactions.
+
+    Returns:
+        dict: "xgb", "iso", "rules", "risk" arrays, "decision" string array and
+        "rule_flags" ({rule key: int8 flag array}).
+    """
+    X = np.asarray(X, dtype=np.float64)
+    rule_scores, rule_flags = rule_engine.evaluate_many(X, last_txn_time)
+    ml_scores = ml_pipeline.compute_risk_scores_batch(
+        X,
+        components=components,
+        weights={"xgb": 1.0, "iso": 1.0}
+    )
+    risk = blend_risk(ml_scores["xgb"], ml_scores["iso"], rule_scores)
+    return {
+        "xgb": ml_scores["xgb"],
+        "iso": ml_scores["iso"],
+        "rules": rule_scores,
+        "risk": risk,
+        "decision": decide_many(risk),
+        "rule_flags": rule_flags,
+    }
@@ -0,0 +1,199 @@
+"""
+Pre-fork server for the scoring API.
+
+The parent process imports `api` once (loading -- or, under the host-wide
+artifact lock, training -- the XGBoost, IsolationForest and SHAP objects),
+freezes the GC so refcount updates do not dirty those pages, then forks N
+uvicorn workers that share them copy-on-write. Each worker opens its own DB
+pool lazily after the fork. The parent restarts crashed workers and reports
+per-worker memory (RSS / PSS / shared) so pods can be sized. A worker that
+dies during startup (bad env, DB down, import error) is restarted with an
+exponential backoff, and the server gives up after --max-startup-crashes of
+them in a row instead of fork-looping.
+
+    python serve.py --workers 4 --port 8000
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+
+# --------------------------------------
+# MEMORY REPORTING
+# --------------------------------------
+def process_memory(pid):
+    """
+    Memory of a process in MB from /proc/<pid>/smaps_rollup (Linux).
+    PSS splits shared pages between the processes sharing them, so the sum
+    of PSS over all workers is what the pod actually uses.
+    """
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                parts = value.split()
+                if parts and parts[-1] == "kB":
+                    fields[key] = int(parts[0]) / 1024
+    except OSError:
+        return None
+
+    return {
+        "rss_mb": fields.get("Rss", 0.0),
+        "pss_mb": fields.get("Pss", 0.0),
+        "shared_mb": fields.get("Shared_Clean", 0.0) + fields.get("Shared_Dirty", 0.0),
+        "private_mb": fields.get("Private_Clean", 0.0) + fields.get("Private_Dirty", 0.0),
+    }
+
+
+def report_memory(parent_pid, worker_pids):
+    rows = [("parent", parent_pid)] + [(f"worker-{i}", pid) for i, pid in enumerate(worker_pids)]
+    total_pss = 0.0
+    print(f"{'process':10s} {'pid':>7s} {'rss_mb':>8s} {'pss_mb':>8s} {'shared_mb':>10s} {'private_mb':>11s}")
+    for name, pid in rows:
+        mem = process_memory(pid)
+        if mem is None:
+            continue
+        total_pss += mem["pss_mb"]
+        print(f"{name:10s} {pid:7d} {mem['rss_mb']:8.1f} {mem['pss_mb']:8.1f} "
+              f"{mem['shared_mb']:10.1f} {mem['private_mb']:11.1f}")
+    print(f"{'total pss':10s} {'':7s} {'':8s} {total_pss:8.1f}")
+    sys.stdout.flush()
+
+
+# --------------------------------------
+# WORKERS
+# --------------------------------------
+def run_worker(sock, args):
+    import uvicorn
+    import api
+
+    api.set_inference_threads(args.threads_per_worker)
+
+    config = uvicorn.Config(api.app, log_level=args.log_level)
+    server = uvicorn.Server(config)
+    server.run(sockets=[sock])
+
+
+def spawn_worker(sock, args):
+    pid = os.fork()
+    if pid == 0:
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        code = 0
+        try:
+            run_worker(sock, args)
+        except BaseException:
+            import traceback
+            traceback.print_exc()
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-fork scoring API server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--threads-per-worker", type=int, default=None,
+                        help="XGBoost threads per worker (default: cpu_count // workers)")
+    parser.add_argument("--report-interval", type=float, default=60.0,
+                        help="Seconds between memory reports (0 disables)")
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--startup-grace", type=float, default=10.0,
+                        help="A worker exiting within this many seconds of its fork counts as a startup crash")
+    parser.add_argument("--max-startup-crashes", type=int, default=5,
+                        help="Consecutive startup crashes before the server exits")
+    parser.add_argument("--restart-backoff", type=float, default=0.5,
+                        help="First restart delay after a startup crash, doubled per crash (max 30 s)")
+    args = parser.parse_args()
+    if args.threads_per_worker is None:
+        args.threads_per_worker = max(1, (os.cpu_count() or 1) // args.workers)
+
+    # Per-process state (the in-memory decision feed) checks how many workers share the port
+    os.environ["WEB_CONCURRENCY"] = str(args.workers)
+
+    # 1. Load (or train, once, under the artifact lock) in the parent only.
+    #    No inference runs here, so no OpenMP thread pool exists before fork.
+    import api  # noqa: F401
+
+    # 2. Move everything allocated so far out of the GC's reach; otherwise the
+    #    first collection in each worker touches (and copies) every object page
+    gc.collect()
+    gc.freeze()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    # pid -> fork time, to tell startup crashes from workers dying later on
+    workers = {spawn_worker(sock, args): time.monotonic() for _ in range(args.workers)}
+    print(f"🚀 Pre-fork server on {args.host}:{args.port} with {len(workers)} workers "
+          f"({args.threads_per_worker} XGBoost threads each)")
+
+    stopping = False
+    exit_code = 0
+    restarts = []           # monotonic times at which to fork a replacement
+    startup_crashes = 0     # consecutive workers that died within --startup-grace
+
+    def handle_stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        restarts.clear()
+        for pid in list(workers):
+            try:
+                # uvicorn shuts down gracefully (drains write-behind, closes the pool)
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, handle_stop)
+    signal.signal(signal.SIGTERM, handle_stop)
+
+    next_report = time.monotonic() + min(args.report_interval, 10.0) if args.report_interval else None
+    while workers or restarts:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG) if workers else (0, 0)
+        except ChildProcessError:
+            break
+        if pid:
+            forked_at = workers.pop(pid)
+            if not stopping:
+                if time.monotonic() - forked_at < args.startup_grace:
+                    startup_crashes += 1
+                else:
+                    startup_crashes = 0
+                if startup_crashes >= args.max_startup_crashes:
+                    print(f"❌ {startup_crashes} workers in a row died during startup; giving up")
+                    exit_code = 1
+                    handle_stop(None, None)
+                    continue
+                delay = min(args.restart_backoff * 2 ** (startup_crashes - 1), 30.0) if startup_crashes else 0.0
+                print(f"⚠️ Worker {pid} exited with status {status}; restarting in {delay:.1f}s")
+                restarts.append(time.monotonic() + delay)
+            continue
+
+        now = time.monotonic()
+        for due in [t for t in restarts if t <= now]:
+            restarts.remove(due)
+            workers[spawn_worker(sock, args)] = time.monotonic()
+
+        if next_report is not None and time.monotonic() >= next_report and not stopping:
+            report_memory(os.getpid(), sorted(workers))
+            next_report = time.monotonic() + args.report_interval
+        time.sleep(0.5)
+
+    sock.close()
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
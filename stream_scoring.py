@@ -0,0 +1,403 @@
+"""
+Streaming scorer: reads transactions from a file, stdin or a local socket,
+scores them in windowed batches with the same models, RuleEngine and blend as
+the API, and writes one decision per transaction to an output sink.
+
+Input is newline-delimited JSON (one transaction object per line) or CSV in
+the creditcard.csv layout (header with Time, V1..V28, Amount and an optional
+Class label). Only one window of rows is held at a time, so memory stays
+bounded whatever the size of the input -- suitable for backfilling millions of
+historical transactions or shadow-scoring a live feed without HTTP overhead.
+
+    python stream_scoring.py creditcard.csv --output decisions.ndjson
+    cat txns.ndjson | python stream_scoring.py - --window 256
+    python stream_scoring.py unix:/tmp/fraud.sock --max-wait-ms 200 --only-flagged
+    python stream_scoring.py tcp:127.0.0.1:9000 --rules candidate_rules.json
+"""
+import argparse
+import csv
+import gzip
+import itertools
+import json
+import os
+import queue
+import socket
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+import numpy as np
+
+import model_bundle
+import scoring
+from fraud_rules import FEATURE_COLUMNS, RuleEngine
+from user_state import MemoryUserStateStore
+
+# Passed through from input to output when present
+META_FIELDS = ("txn_id", "user_id", "Class")
+
+# Rows without a user_id share one history, as in the API
+DEFAULT_USER = "user_demo"
+
+OUTPUT_FIELDS = ("txn_id", "user_id", "risk_score", "decision", "xgb_score", "iso_score", "rule_score")
+
+
+# --------------------------------------
+# SOURCES
+# --------------------------------------
+def _listen(spec):
+    kind, _, address = spec.partition(":")
+    if kind == "unix":
+        if os.path.exists(address):
+            os.unlink(address)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(address)
+    else:
+        host, _, port = address.rpartition(":")
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind((host or "127.0.0.1", int(port)))
+    server.listen(1)
+    return server
+
+
+@contextmanager
+def open_source(spec):
+    """
+    Text lines from "-" (stdin), "unix:PATH" or "tcp:HOST:PORT" (listens and
+    reads one producer connection until it closes), or a file path (.gz ok).
+    """
+    if spec == "-":
+        yield sys.stdin
+    elif spec.startswith(("unix:", "tcp:")):
+        server = _listen(spec)
+        print(f"Waiting for a producer on {spec} ...", file=sys.stderr)
+        try:
+            conn, _ = server.accept()
+        finally:
+            server.close()
+            if spec.startswith("unix:"):
+                os.unlink(spec[len("unix:"):])
+        with conn, conn.makefile("r", encoding="utf-8", newline="") as f:
+            yield f
+    elif spec.endswith(".gz"):
+        with gzip.open(spec, "rt", encoding="utf-8", newline="") as f:
+            yield f
+    else:
+        with open(spec, encoding="utf-8", newline="") as f:
+            yield f
+
+
+# --------------------------------------
+# PARSING
+# --------------------------------------
+def _meta(values):
+    if "Class" in values:
+        values["Class"] = int(float(values["Class"]))
+    return values
+
+
+def _parse_ndjson(lines, stats):
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            txn = json.loads(line)
+            features = [float(txn[c]) for c in FEATURE_COLUMNS]
+            meta = _meta({k: txn[k] for k in META_FIELDS if k in txn})
+        except (ValueError, KeyError, TypeError):
+            stats["bad_records"] += 1
+            continue
+        yield features, meta
+
+
+def _parse_csv(lines, stats):
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header is None:
+        return
+    header = [h.strip() for h in header]
+    missing = [c for c in FEATURE_COLUMNS if c not in header]
+    if missing:
+        raise ValueError(f"CSV header is missing columns {missing}")
+
+    idx = [header.index(c) for c in FEATURE_COLUMNS]
+    meta_idx = [(k, header.index(k)) for k in META_FIELDS if k in header]
+    for row in reader:
+        if not row:
+            continue
+        try:
+            features = [float(row[i]) for i in idx]
+            meta = _meta({k: row[i] for k, i in meta_idx})
+        except (ValueError, IndexError):
+            stats["bad_records"] += 1
+            continue
+        yield features, meta
+
+
+def parse_records(lines, fmt="auto", stats=None):
+    """
+    Yields (features, meta) per transaction: 30 floats in FEATURE_COLUMNS order
+    and the META_FIELDS present in the input. "auto" picks NDJSON when the first
+    non-blank line starts with "{", CSV otherwise. Malformed rows are counted in
+    stats["bad_records"] and skipped.
+    """
+    stats = stats if stats is not None else Counter()
+    lines = iter(lines)
+    first = next((line for line in lines if line.strip()), None)
+    if first is None:
+        return
+    if fmt == "auto":
+        fmt = "ndjson" if first.lstrip().startswith("{") else "csv"
+
+    lines = itertools.chain([first], lines)
+    if fmt == "ndjson":
+        yield from _parse_ndjson(lines, stats)
+    else:
+        yield from _parse_csv(lines, stats)
+
+
+# --------------------------------------
+# WINDOWING
+# --------------------------------------
+def windows(records, size, max_wait=None):
+    """
+    Groups records into lists of at most `size`. With `max_wait` (seconds), a
+    partial window is also emitted once its first record has waited that long,
+    so a slow socket feed still gets timely decisions.
+    """
+    if max_wait is None:
+        window = []
+        for record in records:
+            window.append(record)
+            if len(window) >= size:
+                yield window
+                window = []
+        if window:
+            yield window
+        return
+
+    yield from _timed_windows(records, size, max_wait)
+
+
+def _timed_windows(records, size, max_wait):
+    # A reader thread fills a bounded queue, so parsing overlaps scoring and
+    # the clock can close a window while the source is idle
+    done = object()
+    errors = []
+    pending = queue.Queue(maxsize=size * 2)
+
+    def read():
+        try:
+            for record in records:
+                pending.put(record)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            pending.put(done)
+
+    threading.Thread(target=read, name="stream-reader", daemon=True).start()
+
+    window, deadline = [], None
+    while True:
+        timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+        try:
+            record = pending.get(timeout=timeout)
+        except queue.Empty:
+            yield window
+            window, deadline = [], None
+            continue
+        if record is done:
+            break
+        window.append(record)
+        if deadline is None:
+            deadline = time.monotonic() + max_wait
+        if len(window) >= size:
+            yield window
+            window, deadline = [], None
+
+    if window:
+        yield window
+    if errors:
+        raise errors[0]
+
+
+# --------------------------------------
+# SINKS
+# --------------------------------------
+class NdjsonSink:
+    def __init__(self, f):
+        self.f = f
+
+    def write(self, rows):
+        for row in rows:
+            self.f.write(json.dumps(row) + "\n")
+        self.f.flush()
+
+
+class CsvSink:
+    """Flat CSV; rule flags become one column each, fixed by the first window."""
+
+    def __init__(self, f):
+        self.f = f
+        self.writer = None
+
+    def write(self, rows):
+        if not rows:
+            return
+        if self.writer is None:
+            extra = [k for k in ("Class",) if k in rows[0]]
+            fields = list(OUTPUT_FIELDS) + sorted(rows[0]["rule_details"]) + extra
+            self.writer = csv.DictWriter(self.f, fieldnames=fields, extrasaction="ignore")
+            self.writer.writeheader()
+        for row in rows:
+            self.writer.writerow({**row, **row["rule_details"]})
+        self.f.flush()
+
+
+@contextmanager
+def open_sink(spec="-", fmt="ndjson"):
+    sink_cls = CsvSink if fmt == "csv" else NdjsonSink
+    if spec == "-":
+        yield sink_cls(sys.stdout)
+    else:
+        with open(spec, "w", encoding="utf-8", newline="") as f:
+            yield sink_cls(f)
+
+
+# --------------------------------------
+# SCORING
+# --------------------------------------
+class StreamScorer:
+    """
+    Scores (features, meta) records window by window.
+
+    Velocity history is kept per user_id in stream time (the Time column), in
+    an LRU-capped store, so long backfills do not grow memory without bound.
+
+    Args:
+        components (dict): Model components, see scoring.load_components.
+        rule_engine (RuleEngine): Rules to evaluate (e.g. a candidate config).
+        window_size (int): Rows scored per model call.
+        max_wait (float, optional): Seconds before a partial window is scored.
+        history (bool): Feed per-user last transaction times to the velocity rule.
+        only_flagged (bool): Write REVIEW / BLOCK decisions only.
+        max_users (int): Users whose history is kept.
+    """
+
+    def __init__(self, components, rule_engine, window_size=1024, max_wait=None, history=True,
+                 only_flagged=False, max_users=100_000):
+        self.components = components
+        self.rule_engine = rule_engine
+        self.window_size = window_size
+        self.max_wait = max_wait
+        self.only_flagged = only_flagged
+        self.user_state = MemoryUserStateStore(max_users=max_users, max_events=1) if history else None
+
+        self.stats = Counter()
+        self.decisions = Counter()
+
+    def _last_txn_times(self, X, metas):
+        last = np.full(len(metas), np.nan)
+        for i, meta in enumerate(metas):
+            user_id = meta.get("user_id", DEFAULT_USER)
+            state = self.user_state.get(user_id)
+            if state is not None and state.last_txn_time is not None:
+                last[i] = state.last_txn_time
+            self.user_state.record(user_id, X[i, 0], X[i, -1])
+        return last
+
+    def score_window(self, window):
+        """Scores one window and returns its output rows (in input order)."""
+        X = np.array([features for features, _ in window], dtype=np.float64)
+        metas = [meta for _, meta in window]
+        last = self._last_txn_times(X, metas) if self.user_state is not None else None
+
+        result = scoring.score_matrix(X, self.components, self.rule_engine, last)
+
+        rows = []
+        seq = self.stats["rows"]
+        for i, meta in enumerate(metas):
+            decision = str(result["decision"][i])
+            self.decisions[decision] += 1
+            if self.only_flagged and decision == "ALLOW":
+                continue
+            row = {
+                "txn_id": meta.get("txn_id", f"stream_{seq + i + 1}"),
+                "user_id": meta.get("user_id", DEFAULT_USER),
+                "risk_score": float(result["risk"][i]),
+                "decision": decision,
+                "xgb_score": float(result["xgb"][i]),
+                "iso_score": float(result["iso"][i]),
+                "rule_score": float(result["rules"][i]),
+                "rule_details": {k: int(v[i]) for k, v in result["rule_flags"].items()},
+            }
+            if "Class" in meta:
+                row["Class"] = meta["Class"]
+            rows.append(row)
+
+        self.stats["rows"] += len(window)
+        self.stats["windows"] += 1
+        self.stats["written"] += len(rows)
+        return rows
+
+    def run(self, records, sink):
+        """Scores every record and writes each window to `sink`; returns a summary dict."""
+        started = time.perf_counter()
+        for window in windows(records, self.window_size, self.max_wait):
+            if window:
+                sink.write(self.score_window(window))
+        return self.summary(time.perf_counter() - started)
+
+    def summary(self, elapsed):
+        return {
+            "rows": self.stats["rows"],
+            "windows": self.stats["windows"],
+            "written": self.stats["written"],
+            "bad_records": self.stats["bad_records"],
+            "decisions": dict(self.decisions),
+            "elapsed_s": round(elapsed, 3),
+            "rows_per_s": round(self.stats["rows"] / elapsed, 1) if elapsed > 0 else 0.0,
+        }
+
+
+# --------------------------------------
+# CLI
+# --------------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a stream of transactions in windowed batches")
+    parser.add_argument("source", help='File (.csv/.ndjson, .gz ok), "-" for stdin, unix:PATH or tcp:HOST:PORT')
+    parser.add_argument("--format", choices=("auto", "ndjson", "csv"), default="auto")
+    parser.add_argument("--output", default="-", help='Decision sink path ("-" = stdout)')
+    parser.add_argument("--output-format", choices=("ndjson", "csv"), default="ndjson")
+    parser.add_argument("--window", type=int, default=1024, help="Rows per scoring window")
+    parser.add_argument("--max-wait-ms", type=float, default=None,
+                        help="Score a partial window after this long (default: only full windows)")
+    parser.add_argument("--bundle", default=model_bundle.DEFAULT_BUNDLE_PATH)
+    parser.add_argument("--rules", default="fraud_rules.json", help="Rule config to evaluate")
+    parser.add_argument("--only-flagged", action="store_true", help="Write REVIEW / BLOCK decisions only")
+    parser.add_argument("--no-history", action="store_true", help="Disable per-user velocity history")
+    args = parser.parse_args(argv)
+
+    components, model_version = scoring.load_components(args.bundle)
+    scorer = StreamScorer(
+        components,
+        RuleEngine(args.rules),
+        window_size=args.window,
+        max_wait=args.max_wait_ms / 1000.0 if args.max_wait_ms is not None else None,
+        history=not args.no_history,
+        only_flagged=args.only_flagged
+    )
+
+    with open_source(args.source) as lines, open_sink(args.output, args.output_format) as sink:
+        summary = scorer.run(parse_records(lines, args.format, scorer.stats), sink)
+
+    # stdout may be the sink, so the summary goes to stderr
+    print(json.dumps({"model_version": model_version, **summary}), file=sys.stderr)
+    return summary
+
+
+if __name__ == "__main__":
+    main()
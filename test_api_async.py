@@ -0,0 +1,283 @@
+import asyncio
+import json
+import os
+import time
+
+import db
+import memory_db
+
+# In-process stand-in for Postgres; installed before api touches the pool
+DATABASE = memory_db.MemoryDatabase(latency_ms=5)
+db.init_pool(DATABASE)
+
+import api
+from fastapi.testclient import TestClient
+
+with open("src/data/test_transactions.json") as f:
+    TRANSACTIONS = json.load(f)
+
+client = TestClient(api.app)
+
+
+def setup_module():
+    db.init_pool(DATABASE)
+
+
+def test_score_transaction_persists_in_one_commit():
+    commits = DATABASE.commits
+    res = client.post("/score_transaction", json=TRANSACTIONS[0])
+    assert res.status_code == 200, res.text
+    body = res.json()
+    assert body["decision"] in ("ALLOW", "REVIEW", "BLOCK")
+
+    # raw txn, ml score and decision land together in a single transaction
+    assert DATABASE.commits == commits + 1
+    for table in ("transactions_raw", "ml_scores", "decisions"):
+        assert body["txn_id"] in [r["txn_id"] for r in DATABASE.rows(table)]
+
+
+def _spy(name):
+    """Wraps RULE_ENGINE.<name> and records the last_txn_time of every call."""
+    original, seen = getattr(api.RULE_ENGINE, name), []
+
+    def spy(data, last_txn_time=None):
+        seen.append(last_txn_time)
+        return original(data, last_txn_time)
+
+    setattr(api.RULE_ENGINE, name, spy)
+    return original, seen
+
+
+def test_history_lookup_feeds_velocity_rule():
+    client.post("/score_transaction", json=TRANSACTIONS[1])
+    stored = api.USER_STATE.get("user_demo").last_txn_time
+    window = api.RULE_ENGINE.plan["velocity"]["time_window"]
+
+    original, seen = _spy("evaluate")
+    try:
+        inside = client.post("/score_transaction", json={**TRANSACTIONS[2], "Time": stored + window / 2}).json()
+        assert seen == [stored]
+        assert inside["rule_details"]["r1_velocity"] == 1
+
+        stored = api.USER_STATE.get("user_demo").last_txn_time
+        outside = client.post("/score_transaction", json={**TRANSACTIONS[2], "Time": stored + 10 * window}).json()
+        assert seen[1] == stored
+        assert outside["rule_details"]["r1_velocity"] == 0
+    finally:
+        api.RULE_ENGINE.evaluate = original
+
+
+def test_batch_chains_last_txn_time_row_to_row():
+    client.post("/score_transaction", json=TRANSACTIONS[1])
+    stored = api.USER_STATE.get("user_demo").last_txn_time
+
+    original, seen = _spy("evaluate_many")
+    try:
+        client.post("/score_transactions", json=TRANSACTIONS[10:13])
+    finally:
+        api.RULE_ENGINE.evaluate_many = original
+    assert list(seen[0]) == [stored] + [t["Time"] for t in TRANSACTIONS[10:12]]
+
+
+def test_concurrent_requests_share_the_pool():
+    async def fire():
+        return await asyncio.gather(*[
+            api.score_transaction(api.Transaction(**txn)) for txn in TRANSACTIONS[:20]
+        ])
+
+    results = asyncio.run(fire())
+    assert len({r["txn_id"] for r in results}) == 20
+
+
+def test_sync_path_agrees_with_batch_endpoint():
+    # Same user history for both calls, or the second sees the first as a velocity hit
+    start = TRANSACTIONS[3]["Time"] - 1000.0
+    api.USER_STATE.record("user_demo", start, 0.0)
+    single = client.post("/score_transaction", json=TRANSACTIONS[3]).json()
+    api.USER_STATE.record("user_demo", start, 0.0)
+    batch = client.post("/score_transactions", json=[TRANSACTIONS[3]]).json()
+    assert abs(single["risk_score"] - batch[0]["risk_score"]) < 1e-9
+
+
+def test_single_and_batch_scoring_agree_on_velocity():
+    rows = TRANSACTIONS[10:14]
+    start = rows[0]["Time"] - 1000.0
+
+    api.USER_STATE.record("user_demo", start, 0.0)
+    singles = [client.post("/score_transaction", json=txn).json() for txn in rows]
+    api.USER_STATE.record("user_demo", start, 0.0)
+    batch = client.post("/score_transactions", json=rows).json()
+
+    assert [r["rule_details"] for r in singles] == [r["rule_details"] for r in batch]
+    for single, row in zip(singles, batch):
+        assert abs(single["risk_score"] - row["risk_score"]) < 1e-9
+    # Both paths leave the user at the last transaction's Time
+    assert api.USER_STATE.get("user_demo").last_txn_time == rows[-1]["Time"]
+
+
+def test_deferred_explanations_are_fetched_by_txn_id():
+    from explanations import ExplanationPolicy
+
+    policy, api.EXPLAIN_POLICY = api.EXPLAIN_POLICY, ExplanationPolicy("deferred")
+    try:
+        body = client.post("/score_transaction", json=TRANSACTIONS[4]).json()
+        assert body["explanation_status"] == "pending" and body["explanation"] == []
+
+        for _ in range(100):
+            res = client.get(f"/explanations/{body['txn_id']}").json()
+            if res["status"] == "ready":
+                break
+            time.sleep(0.05)
+        assert len(res["explanation"]) == 5
+    finally:
+        api.EXPLAIN_POLICY.deferred.shutdown()
+        api.EXPLAIN_POLICY = policy
+
+
+def test_idempotent_retry_returns_stored_decision():
+    headers = {"Idempotency-Key": "retry-test-1"}
+    first = client.post("/score_transaction", json=TRANSACTIONS[5], headers=headers).json()
+    commits = DATABASE.commits
+
+    retry = client.post("/score_transaction", json=TRANSACTIONS[5], headers=headers).json()
+    assert retry["cached"] is True
+    assert retry["txn_id"] == first["txn_id"]
+    assert retry["decision"] == first["decision"]
+    # No rescoring, no second insert
+    assert DATABASE.commits == commits
+
+    # Same key, different transaction: rejected instead of replaying the first decision
+    reused = client.post("/score_transaction", json=TRANSACTIONS[6], headers=headers)
+    assert reused.status_code == 422
+    assert DATABASE.commits == commits
+
+
+def test_decisions_are_paged_with_a_cursor_header():
+    for txn in TRANSACTIONS[6:9]:
+        client.post("/score_transaction", json=txn)
+
+    res = client.get("/decisions", params={"limit": 2})
+    assert res.status_code == 200
+    assert len(res.json()) == 2
+    assert "X-Next-Cursor" in res.headers
+
+    export = client.get("/decisions", params={"format": "ndjson"})
+    assert export.headers["content-type"].startswith("application/x-ndjson")
+    assert len(export.text.splitlines()) >= 3
+
+    assert client.get("/decisions", params={"cursor": "garbage"}).status_code == 400
+
+
+def test_stats_are_served_from_memory():
+    client.post("/score_transaction", json=TRANSACTIONS[9])
+    statements = DATABASE.statements
+
+    stats = client.get("/stats").json()
+    assert stats["sliding"]["1m"]["count"] >= 1
+    assert stats["tumbling"]["1d"]["current"]["count"] >= 1
+    assert DATABASE.statements == statements
+
+    # Summed over serve.py workers: this one live, the others from their checkpoints
+    fleet = client.get("/stats", params={"scope": "fleet"}).json()
+    assert fleet["scope"] == "fleet" and fleet["workers"] >= 1
+    assert fleet["tumbling"]["1d"]["current"]["count"] >= stats["tumbling"]["1d"]["current"]["count"]
+
+
+def test_suggestions_are_backtested_on_db_history():
+    client.post("/score_transactions", json=TRANSACTIONS[:50])
+    lower_pca = {"target_rule": "high_risk_pca", "parameter": "default_threshold", "proposed_value": 1.0}
+
+    report = client.post("/backtest_rules?refresh=true", json=[lower_pca]).json()
+    assert report["rows"] == len(DATABASE.rows("transactions_raw"))
+    assert report["unflagged"] == 0
+    assert report["proposed"]["flag_rate"] >= report["current"]["flag_rate"]
+    # Nothing was applied
+    assert api.RULE_ENGINE.config["high_risk_pca"]["default_threshold"] != 1.0
+
+    # A DB outage while reloading the history is a 503, not a 500
+    import psycopg2
+
+    def db_down(*args):
+        raise psycopg2.OperationalError("connection refused")
+
+    create = api.rule_backtest.create_backtester
+    api.rule_backtest.create_backtester = db_down
+    try:
+        res = client.post("/backtest_rules?refresh=true", json=[lower_pca])
+        assert res.status_code == 503 and "connection refused" in res.json()["detail"]
+    finally:
+        api.rule_backtest.create_backtester = create
+
+
+def test_rule_search_runs_outside_the_request():
+    import optimize_rules
+
+    os.environ.pop("BACKTEST_DATA", None)
+    res = client.post("/run_optimizer")
+    assert res.status_code == 503 and "BACKTEST_DATA" in res.json()["detail"]
+
+    class Running:
+        pid = 4242
+
+        def poll(self):
+            return None
+
+    start = optimize_rules.start_search_optimization
+    optimize_rules.start_search_optimization = Running
+    try:
+        res = client.post("/run_optimizer")
+        assert res.status_code == 202 and res.json()["pid"] == 4242
+        # Only one search at a time
+        assert client.post("/run_optimizer").status_code == 409
+    finally:
+        optimize_rules.start_search_optimization = start
+        api._OPTIMIZER_RUN = None
+
+
+def test_metrics_endpoint_exports_stages_and_decisions():
+    body = client.post("/score_transaction", json=TRANSACTIONS[0]).json()
+
+    text = client.get("/metrics").text
+    for stage in ("history", "ml", "xgb", "iso", "rules", "persist"):
+        assert f'fraud_stage_duration_seconds_count{{endpoint="score_transaction",stage="{stage}"}}' in text
+    assert f'fraud_decisions_total{{decision="{body["decision"]}"}}' in text
+    assert "fraud_rule_evaluations_total" in text
+    assert 'fraud_db_pool_connections{state="in_use"} 0.0' in text
+
+
+def test_metrics_endpoint_exports_batcher_stats():
+    from batcher import MicroBatcher
+
+    batcher = MicroBatcher(lambda items: items, max_batch_size=4, max_wait_ms=5)
+
+    async def fire():
+        return await asyncio.gather(*[batcher.submit(i) for i in range(6)])
+
+    asyncio.run(fire())
+    saved, api.MODEL_BATCHER = api.MODEL_BATCHER, batcher
+    try:
+        text = client.get("/metrics").text
+    finally:
+        api.MODEL_BATCHER = saved
+    assert 'fraud_batcher{stat="items"} 6.0' in text
+    assert 'fraud_batcher{stat="queue_wait_p99_s"}' in text
+    assert 'fraud_batcher_batches_by_size{size="4"}' in text
+
+
+if __name__ == "__main__":
+    setup_module()
+    test_score_transaction_persists_in_one_commit()
+    test_history_lookup_feeds_velocity_rule()
+    test_batch_chains_last_txn_time_row_to_row()
+    test_concurrent_requests_share_the_pool()
+    test_sync_path_agrees_with_batch_endpoint()
+    test_single_and_batch_scoring_agree_on_velocity()
+    test_deferred_explanations_are_fetched_by_txn_id()
+    test_idempotent_retry_returns_stored_decision()
+    test_decisions_are_paged_with_a_cursor_header()
+    test_stats_are_served_from_memory()
+    test_suggestions_are_backtested_on_db_history()
+    test_rule_search_runs_outside_the_request()
+    test_metrics_endpoint_exports_stages_and_decisions()
+    test_metrics_endpoint_exports_batcher_stats()
+    print("\n🎉 All async API tests passed!")
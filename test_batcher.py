@@ -0,0 +1,53 @@
+import asyncio
+import time
+
+from batcher import MicroBatcher
+
+
+def test_concurrent_calls_are_coalesced_in_order():
+    seen = []
+
+    def double(items):
+        seen.append(len(items))
+        return [x * 2 for x in items]
+
+    batcher = MicroBatcher(double, max_batch_size=16, max_wait_ms=20)
+
+    async def fire():
+        return await asyncio.gather(*[batcher.submit(i) for i in range(40)])
+
+    assert asyncio.run(fire()) == [i * 2 for i in range(40)]
+    assert max(seen) == 16 and len(seen) < 40
+    stats = batcher.stats()
+    assert stats["items"] == 40 and stats["batches"] == len(seen)
+
+
+def test_lone_request_waits_at_most_max_wait():
+    batcher = MicroBatcher(lambda items: items, max_batch_size=64, max_wait_ms=10)
+
+    async def one():
+        start = time.perf_counter()
+        await batcher.submit("x")
+        return time.perf_counter() - start
+
+    assert asyncio.run(one()) < 0.5
+    assert batcher.stats()["queue_wait_max_s"] < 0.1
+
+
+def test_errors_reach_every_caller_in_the_batch():
+    def boom(items):
+        raise RuntimeError("model failed")
+
+    batcher = MicroBatcher(boom, max_wait_ms=5)
+
+    async def fire():
+        return await asyncio.gather(*[batcher.submit(i) for i in range(3)], return_exceptions=True)
+
+    assert all(isinstance(r, RuntimeError) for r in asyncio.run(fire()))
+
+
+if __name__ == "__main__":
+    test_concurrent_calls_are_coalesced_in_order()
+    test_lone_request_waits_at_most_max_wait()
+    test_errors_reach_every_caller_in_the_batch()
+    print("\n🎉 All micro-batching tests passed!")
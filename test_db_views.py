@@ -0,0 +1,50 @@
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+import db
+import db_views
+import memory_db
+
+
+def test_cursor_round_trip():
+    ts = datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc)
+    cursor = db_views.encode_cursor({"decision_time": ts, "txn_id": "txn_a"}, "decisions")
+    assert db_views.decode_cursor(cursor) == (ts, "txn_a")
+
+    with pytest.raises(ValueError):
+        db_views.decode_cursor("not-a-cursor")
+
+
+def test_keyset_query_with_filters():
+    ts = datetime(2024, 5, 1, tzinfo=timezone.utc)
+    cursor = db_views.encode_cursor({"timestamp": ts, "txn_id": "txn_b"}, "transactions")
+    sql, params = db_views.build_query("transactions", cursor=cursor, decision="BLOCK", since=ts, limit=51)
+
+    assert "JOIN fraud.decisions d ON d.txn_id = t.txn_id" in sql
+    assert "(t.timestamp, t.txn_id) < (%s, %s)" in sql
+    assert sql.endswith("ORDER BY t.timestamp DESC, t.txn_id DESC LIMIT %s")
+    assert params == ["BLOCK", ts, ts, "txn_b", 51]
+
+
+def test_user_filter_on_decisions_joins_transactions():
+    sql, params = db_views.build_query("decisions", user_id="u1")
+    assert "JOIN fraud.transactions_raw t ON t.txn_id = d.txn_id" in sql
+    assert "LIMIT" not in sql
+    assert params == ["u1"]
+
+
+def test_ndjson_export_streams_every_row():
+    database = memory_db.MemoryDatabase()
+    db.init_pool(database)
+    database.insert("decisions", [
+        {"txn_id": f"txn_{i}", "decision": "ALLOW", "decision_time": datetime.now(timezone.utc)}
+        for i in range(5)
+    ])
+
+    sql, params = db_views.build_query("decisions")
+    chunks = list(db_views.iter_ndjson(sql, params, fetch_size=2))
+    assert len(chunks) == 3
+    rows = [json.loads(line) for chunk in chunks for line in chunk.splitlines()]
+    assert [r["txn_id"] for r in rows] == [f"txn_{i}" for i in range(5)]
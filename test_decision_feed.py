@@ -0,0 +1,167 @@
+import asyncio
+import json
+import os
+import queue
+import threading
+
+import pytest
+
+from decision_feed import DecisionFeed, RedisFeedBus
+
+
+class FakeRedis:
+    """publish() / pubsub() of redis-py, delivering to every subscribed FakePubSub."""
+
+    def __init__(self):
+        self.pubsubs = []
+
+    def publish(self, channel, data):
+        for pubsub in self.pubsubs:
+            if channel in pubsub.channels:
+                pubsub.messages.put({"type": "message", "channel": channel, "data": data.encode()})
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        pubsub = FakePubSub()
+        self.pubsubs.append(pubsub)
+        return pubsub
+
+
+class FakePubSub:
+    def __init__(self):
+        self.channels = set()
+        self.messages = queue.Queue()
+
+    def subscribe(self, channel):
+        self.channels.add(channel)
+
+    def listen(self):
+        while True:
+            message = self.messages.get()
+            if message is None:
+                return
+            yield message
+
+    def close(self):
+        self.messages.put(None)
+
+
+def _event(i, decision="ALLOW", risk=0.1):
+    return {"txn_id": f"txn_{i}", "decision": decision, "risk_score": risk}
+
+
+def test_filters_by_decision_and_risk():
+    async def run():
+        feed = DecisionFeed()
+        blocked = feed.subscribe(decisions=["BLOCK"])
+        risky = feed.subscribe(min_risk=0.5)
+        feed.publish([_event(1), _event(2, "BLOCK", 0.9), _event(3, "REVIEW", 0.7)])
+
+        events, _ = await blocked.next_batch(1)
+        assert [e["txn_id"] for e in events] == ["txn_2"]
+        events, _ = await risky.next_batch(1)
+        assert [e["txn_id"] for e in events] == ["txn_2", "txn_3"]
+
+    asyncio.run(run())
+
+
+def test_slow_subscriber_backlog_is_bounded():
+    async def run():
+        feed = DecisionFeed(max_backlog=3)
+        subscriber = feed.subscribe()
+        feed.publish([_event(i) for i in range(10)])
+
+        events, dropped = await subscriber.next_batch(1)
+        # Newest events survive, the count of the rest is reported
+        assert [e["txn_id"] for e in events] == ["txn_7", "txn_8", "txn_9"]
+        assert dropped == 7
+        assert await subscriber.next_batch(0.01) == ([], 0)
+
+    asyncio.run(run())
+
+
+def test_publish_from_worker_threads():
+    async def run():
+        feed = DecisionFeed(max_backlog=1000)
+        subscriber = feed.subscribe()
+        threads = [threading.Thread(target=feed.publish, args=([_event(i)],)) for i in range(50)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        received = []
+        while len(received) < 50:
+            events, _ = await subscriber.next_batch(1)
+            assert events
+            received.extend(events)
+        assert len({e["txn_id"] for e in received}) == 50
+
+    asyncio.run(run())
+
+
+def test_sse_frames_coalesce_and_unsubscribe():
+    async def run():
+        feed = DecisionFeed(flush_interval_ms=0)
+        subscriber = feed.subscribe()
+        stream = feed.sse(subscriber)
+        assert (await stream.__anext__()).startswith("retry:")
+
+        feed.publish([_event(1, "BLOCK", 0.9), _event(2, "BLOCK", 0.95)])
+        frame = await stream.__anext__()
+        assert frame.startswith("event: decisions\ndata: ")
+        payload = json.loads(frame.split("data: ", 1)[1])
+        assert [e["txn_id"] for e in payload["events"]] == ["txn_1", "txn_2"]
+
+        await stream.aclose()
+        assert len(feed) == 0
+
+    asyncio.run(run())
+
+
+def test_workers_share_events_through_the_bus():
+    async def run():
+        client = FakeRedis()
+        workers = [DecisionFeed(flush_interval_ms=0, bus=RedisFeedBus(client)) for _ in range(2)]
+        for feed in workers:
+            feed.start()
+        try:
+            subscriber = workers[1].subscribe(decisions=["BLOCK"])
+            # Scored (and published) by the other worker
+            workers[0].publish([_event(1), _event(2, "BLOCK", 0.9)])
+            events, _ = await subscriber.next_batch(1)
+            assert [e["txn_id"] for e in events] == ["txn_2"]
+        finally:
+            for feed in workers:
+                feed.stop()
+
+    asyncio.run(run())
+
+
+def test_memory_feed_refuses_subscribers_with_several_workers():
+    from decision_feed import create_decision_feed
+
+    saved = {k: os.environ.pop(k, None) for k in ("WEB_CONCURRENCY", "DECISION_FEED_BACKEND")}
+    os.environ["WEB_CONCURRENCY"] = "4"
+    try:
+        feed = create_decision_feed()
+    finally:
+        for k, v in saved.items():
+            os.environ.pop(k, None)
+            if v is not None:
+                os.environ[k] = v
+
+    async def run():
+        with pytest.raises(RuntimeError, match="DECISION_FEED_BACKEND=redis"):
+            feed.subscribe()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_filters_by_decision_and_risk()
+    test_slow_subscriber_backlog_is_bounded()
+    test_publish_from_worker_threads()
+    test_sse_frames_coalesce_and_unsubscribe()
+    test_workers_share_events_through_the_bus()
+    test_memory_feed_refuses_subscribers_with_several_workers()
+    print("\n🎉 All decision feed tests passed!")
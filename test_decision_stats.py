@@ -0,0 +1,116 @@
+import json
+import random
+
+import db
+import memory_db
+from decision_stats import DecisionStats, QuantileSketch, StatsCheckpointer, fleet_snapshot
+
+RULES = {"r1_velocity": 0, "r3_amount_anomaly": 1}
+
+
+def test_quantile_sketch_relative_accuracy():
+    rng = random.Random(0)
+    values = sorted(rng.lognormvariate(3, 1.5) for _ in range(20000))
+    sketch = QuantileSketch(relative_accuracy=0.01)
+    for v in values:
+        sketch.add(v)
+
+    for q in (0.5, 0.9, 0.99):
+        exact = values[int(q * (len(values) - 1))]
+        assert abs(sketch.quantile(q) - exact) <= 0.011 * exact
+
+
+def test_sliding_window_expires_old_buckets():
+    stats = DecisionStats(windows={"1m": 60})
+    stats.record("BLOCK", 0.95, 500.0, RULES, now=1000.0)
+    stats.record("ALLOW", 0.05, 20.0, RULES, now=1030.0)
+
+    snap = stats.snapshot(now=1040.0)["sliding"]["1m"]
+    assert snap["decisions"] == {"BLOCK": 1, "ALLOW": 1}
+    assert snap["flagged_rate"] == 0.5
+    assert snap["rule_hit_rates"]["r3_amount_anomaly"] == 1.0
+    assert snap["risk_histogram"]["counts"][-1] == 1
+
+    # The BLOCK left the window, the ALLOW is still in it
+    snap = stats.snapshot(now=1075.0)["sliding"]["1m"]
+    assert snap["decisions"] == {"ALLOW": 1}
+    assert snap["amount"]["sum"] == 20.0
+
+    assert stats.snapshot(now=2000.0)["sliding"]["1m"]["count"] == 0
+
+
+def test_tumbling_window_rolls_into_previous():
+    stats = DecisionStats(windows={"1h": 3600})
+    stats.record("REVIEW", 0.7, 100.0, RULES, now=3600 * 10 + 5)
+    stats.record("ALLOW", 0.1, 10.0, RULES, now=3600 * 11 + 5)
+
+    hour = stats.snapshot(now=3600 * 11 + 10)["tumbling"]["1h"]
+    assert hour["current"]["decisions"] == {"ALLOW": 1}
+    assert hour["previous"]["decisions"] == {"REVIEW": 1}
+    assert hour["previous"]["start"].startswith("1970-01-01T10:00:00")
+
+
+def test_batch_record_and_checkpoint_rows():
+    stats = DecisionStats(windows={"1m": 60, "1d": 86400})
+    stats.record_many(["ALLOW", "BLOCK"], [0.1, 0.9], [5.0, 900.0],
+                      {"r1_velocity": [0, 1]}, now=50_000.0)
+
+    rows = stats.checkpoint_rows(now=50_001.0)
+    assert sorted(name for name, _, _ in rows) == ["1d", "1m"]
+    state = json.loads(rows[0][2])
+    assert state["count"] == 2 and state["rule_hits"] == {"r1_velocity": 1}
+
+
+def test_checkpoint_upserts_one_row_per_period():
+    database = memory_db.MemoryDatabase()
+    db.init_pool(database)
+    stats = DecisionStats(windows={"1m": 60, "1d": 86400})
+    checkpointer = StatsCheckpointer(stats, worker="w1")
+
+    stats.record("ALLOW", 0.1, 5.0, RULES)
+    checkpointer.checkpoint()
+    stats.record("BLOCK", 0.9, 900.0, RULES)
+    checkpointer.checkpoint()
+
+    assert checkpointer.failures == 0 and checkpointer.checkpoints == 2
+    rows = database.rows("decision_stats")
+    keys = [(r["window_name"], r["period_start"], r["worker"]) for r in rows]
+    assert len(keys) == len(set(keys))
+    day = [r for r in rows if r["window_name"] == "1d"]
+    assert len(day) == 1 and json.loads(day[0]["state"])["count"] == 2
+
+
+def test_fleet_snapshot_sums_workers():
+    db.init_pool(memory_db.MemoryDatabase())
+    now = 86400 * 100 + 30
+    workers = {name: DecisionStats(windows={"1m": 60, "1d": 86400}) for name in ("w1", "w2", "w3")}
+    workers["w1"].record("ALLOW", 0.1, 5.0, RULES, now=now)
+    workers["w2"].record("REVIEW", 0.6, 50.0, RULES, now=now - 86400)
+    workers["w2"].record("BLOCK", 0.9, 900.0, RULES, now=now)
+    workers["w3"].record("ALLOW", 0.2, 7.0, RULES, now=now)
+    for name in ("w2", "w3"):
+        for window, period_start, state in workers[name].checkpoint_rows(now=now):
+            db.execute_transaction([(
+                "INSERT INTO fraud.decision_stats (window_name, period_start, worker, state, updated_at) "
+                "VALUES (%s, %s, %s, %s, NOW())", (window, period_start, name, state)
+            )])
+    # w1's own (stale) checkpoint is ignored in favour of its live counters
+    workers["w1"].record("ALLOW", 0.1, 5.0, RULES, now=now)
+
+    fleet = fleet_snapshot(workers["w1"], worker="w1", now=now)
+    assert fleet["workers"] == 3
+    day = fleet["tumbling"]["1d"]
+    assert day["current"]["decisions"] == {"ALLOW": 3, "BLOCK": 1}
+    assert day["current"]["amount"]["sum"] == 917.0
+    assert day["previous"]["decisions"] == {"REVIEW": 1}
+    assert fleet["tumbling"]["1m"]["current"]["count"] == 4
+
+
+if __name__ == "__main__":
+    test_quantile_sketch_relative_accuracy()
+    test_sliding_window_expires_old_buckets()
+    test_tumbling_window_rolls_into_previous()
+    test_batch_record_and_checkpoint_rows()
+    test_checkpoint_upserts_one_row_per_period()
+    test_fleet_snapshot_sums_workers()
+    print("\n🎉 All decision stats tests passed!")
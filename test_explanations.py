@@ -0,0 +1,57 @@
+import threading
+
+import numpy as np
+
+from explanations import ExplanationPolicy
+
+
+def test_policy_actions():
+    assert ExplanationPolicy("always").action("ALLOW") == "now"
+    flagged = ExplanationPolicy("flagged")
+    assert flagged.action("ALLOW") == "skip"
+    assert flagged.action("REVIEW") == flagged.action("BLOCK") == "now"
+    assert ExplanationPolicy("sampled", sample_rate=0.0).action("BLOCK") == "skip"
+    assert ExplanationPolicy("sampled", sample_rate=1.0).action("ALLOW") == "now"
+    assert ExplanationPolicy("deferred").action("ALLOW") == "defer"
+
+
+def test_deferred_store():
+    policy = ExplanationPolicy("deferred", max_deferred=2)
+    policy.deferred.submit(["a", "b", "c"], lambda n: [[{"feature": "V1", "impact": float(i)}] for i in range(n)], 3)
+    policy.deferred.shutdown()
+    assert policy.deferred.get("a") == ("unknown", None)   # evicted, store is bounded
+    assert policy.deferred.get("c") == ("ready", [{"feature": "V1", "impact": 2.0}])
+
+
+def test_full_deferred_queue_refuses_new_batches():
+    policy = ExplanationPolicy("deferred", max_queued=1)
+    release = threading.Event()
+
+    def slow(n):
+        release.wait(5)
+        return [[] for _ in range(n)]
+
+    assert policy.deferred.submit(["a"], slow, 1)
+    assert not policy.deferred.submit(["b"], slow, 1)
+    assert policy.deferred.get("b") == ("unknown", None)
+    assert policy.deferred.dropped == 1
+    release.set()
+    policy.deferred.shutdown()
+    assert policy.deferred.get("a") == ("ready", [])
+
+
+def test_top_k_matches_full_sort():
+    from fraud_pipeline import FEATURE_COLUMNS, top_k_features
+
+    values = np.random.default_rng(0).normal(size=(50, 30))
+    for row, explanation in zip(values, top_k_features(values, top_k=5)):
+        expected = np.argsort(-np.abs(row))[:5]
+        assert [e["feature"] for e in explanation] == [FEATURE_COLUMNS[j] for j in expected]
+
+
+if __name__ == "__main__":
+    test_policy_actions()
+    test_deferred_store()
+    test_full_deferred_queue_refuses_new_batches()
+    test_top_k_matches_full_sort()
+    print("\n🎉 All explanation policy tests passed!")
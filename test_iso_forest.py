@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import IsolationForest
+from sklearn.preprocessing import StandardScaler
+
+from fraud_pipeline import ISO_FEATURE_COLUMNS, N_FEATURES, prepare_components, score_feature_buffer
+from fraud_pipeline.iso_forest import FlatIsolationForest
+
+
+def _forest(n_features=8, **params):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(2000, n_features)).astype(np.float32)
+    return IsolationForest(n_estimators=50, random_state=0, **params).fit(X), rng
+
+
+def test_matches_sklearn_decision_function():
+    forest, rng = _forest()
+    flat = FlatIsolationForest(forest)
+
+    X = rng.normal(scale=2.0, size=(300, 8)).astype(np.float32)
+    np.testing.assert_allclose(flat.decision_function(X), forest.decision_function(X), rtol=0, atol=1e-12)
+    np.testing.assert_allclose(flat.score_samples(X[:1]), forest.score_samples(X[:1]), rtol=0, atol=1e-12)
+
+
+def test_feature_subsampling_and_blocks():
+    forest, rng = _forest(max_features=0.5, max_samples=128)
+    flat = FlatIsolationForest(forest, block_rows=64)
+
+    X = rng.normal(size=(1000, 8)).astype(np.float32)
+    np.testing.assert_allclose(flat.decision_function(X), forest.decision_function(X), rtol=0, atol=1e-12)
+    assert flat.decision_function(X[:0]).shape == (0,)
+
+
+def test_normalised_iso_channel_matches_sklearn():
+    rng = np.random.default_rng(1)
+    raw = rng.normal(size=(500, N_FEATURES)).astype(np.float32)
+    raw[:, 0] = rng.uniform(0, 172800, size=500)
+
+    X_iso = pd.DataFrame(raw[:, 1:], columns=ISO_FEATURE_COLUMNS[:-1])
+    X_iso["Hour"] = np.floor(raw[:, 0] / 3600) % 24
+    iso_scaler = StandardScaler().fit(X_iso[["Amount", "Hour"]])
+    X_iso[["Amount", "Hour"]] = iso_scaler.transform(X_iso[["Amount", "Hour"]])
+    iso_model = IsolationForest(n_estimators=100, random_state=42).fit(X_iso)
+    train_scores = iso_model.decision_function(X_iso)
+
+    components = prepare_components({"iso": {
+        "model": iso_model, "scaler": iso_scaler,
+        "score_min": float(train_scores.min()), "score_max": float(train_scores.max())
+    }})
+    iso_scores = score_feature_buffer(raw.copy(), components, {"iso": 1.0})["iso"]
+
+    expected = -iso_model.decision_function(X_iso.astype(np.float32))
+    expected = np.clip((expected - train_scores.min()) / (train_scores.max() - train_scores.min() + 1e-8), 0.0, 1.0)
+    np.testing.assert_allclose(iso_scores, expected, atol=1e-6)
@@ -0,0 +1,49 @@
+import time
+
+import metrics
+from profiler import SamplingProfiler
+
+
+def test_histogram_renders_cumulative_prometheus_buckets():
+    registry = metrics.Registry()
+    hist = metrics.Histogram("demo_seconds", "Demo.", ("stage",), buckets=(0.01, 0.1), registry=registry)
+    for value in (0.005, 0.05, 0.05, 3.0):
+        hist.observe(value, stage="rules")
+
+    text = registry.render()
+    assert "# TYPE demo_seconds histogram" in text
+    assert 'demo_seconds_bucket{stage="rules",le="0.01"} 1' in text
+    assert 'demo_seconds_bucket{stage="rules",le="0.1"} 3' in text
+    assert 'demo_seconds_bucket{stage="rules",le="+Inf"} 4' in text
+    assert 'demo_seconds_count{stage="rules"} 4' in text
+
+
+def test_counter_rejects_unknown_labels():
+    counter = metrics.Counter("demo_total", "Demo.", ("decision",), registry=metrics.Registry())
+    counter.inc(decision="BLOCK")
+    assert counter.value(decision="BLOCK") == 1.0
+    try:
+        counter.inc(outcome="BLOCK")
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+
+
+def test_sampling_profiler_sees_busy_thread():
+    sampler = SamplingProfiler(interval_ms=2)
+    sampler.start()
+    deadline = time.perf_counter() + 0.2
+    while time.perf_counter() < deadline:
+        sum(range(1000))
+    sampler.stop()
+
+    report = sampler.report()
+    assert report["samples"] > 0
+    assert any("test_sampling_profiler_sees_busy_thread" in row["frame"] for row in report["top_total"])
+
+
+if __name__ == "__main__":
+    test_histogram_renders_cumulative_prometheus_buckets()
+    test_counter_rejects_unknown_labels()
+    test_sampling_profiler_sees_busy_thread()
+    print("\n🎉 All metrics tests passed!")
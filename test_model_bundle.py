@@ -0,0 +1,47 @@
+import json
+import os
+import tempfile
+import warnings
+
+import numpy as np
+
+import model_bundle
+from fraud_rules import FEATURE_COLUMNS
+
+warnings.filterwarnings("ignore")
+
+
+def test_bundle_roundtrip_matches_legacy_artifacts():
+    import joblib
+
+    with open("src/data/test_transactions.json") as f:
+        records = json.load(f)[:50]
+    X = np.array([[r[c] for c in FEATURE_COLUMNS] for r in records], dtype=np.float32)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manifest = model_bundle.export_legacy_artifacts(tmp)
+        bundle = model_bundle.load_bundle(tmp)
+
+        legacy = joblib.load("model.pkl")
+        assert np.array_equal(legacy.predict_proba(X), bundle["model"].predict_proba(X))
+        assert np.allclose(joblib.load("scaler.pkl").mean_, bundle["scaler"].mean_)
+        assert bundle["iso_meta"]["score_min"] == float(joblib.load("iso_metadata.pkl")["score_min"])
+        assert bundle["manifest"]["model_version"] == manifest["model_version"]
+
+
+def test_checksum_mismatch_is_rejected():
+    with tempfile.TemporaryDirectory() as tmp:
+        model_bundle.export_legacy_artifacts(tmp)
+        with open(os.path.join(tmp, model_bundle.BOOSTER_FILE), "ab") as f:
+            f.write(b"tampered")
+        try:
+            model_bundle.load_bundle(tmp, build_explainer=False)
+            assert False, "corrupted bundle should not load"
+        except ValueError as e:
+            assert "Checksum mismatch" in str(e)
+
+
+if __name__ == "__main__":
+    test_bundle_roundtrip_matches_legacy_artifacts()
+    test_checksum_mismatch_is_rejected()
+    print("\n🎉 All model bundle tests passed!")
@@ -0,0 +1,53 @@
+import tempfile
+
+import numpy as np
+
+from fraud_pipeline.cache import StageCache, load_arrays, load_json, save_arrays, save_json, stage_key
+
+
+def test_only_changed_stages_recompute():
+    calls = []
+
+    def run(cache, iso_trees):
+        def stage(name, params, inputs, value):
+            def compute():
+                calls.append(name)
+                return value
+            return cache.run(name, params, inputs, compute, save_json, load_json)
+
+        data, data_key = stage("columnar", {"size": 3}, [], {"rows": 3})
+        _, split_key = stage("split", {"seed": 42}, [data_key], {"train": 2})
+        _, xgb_key = stage("xgb", {"depth": 6}, [split_key], {"trees": 400})
+        _, iso_key = stage("iso", {"n_estimators": iso_trees}, [split_key], {"trees": iso_trees})
+        return xgb_key, iso_key
+
+    with tempfile.TemporaryDirectory() as tmp:
+        first = run(StageCache(tmp), 100)
+        assert calls == ["columnar", "split", "xgb", "iso"]
+
+        calls.clear()
+        second = run(StageCache(tmp), 200)
+        assert calls == ["iso"]
+        assert second[0] == first[0] and second[1] != first[1]
+
+        calls.clear()
+        run(StageCache(tmp, enabled=False), 200)
+        assert calls == ["columnar", "split", "xgb", "iso"]
+
+
+def test_arrays_roundtrip_and_keys_are_stable():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = StageCache(tmp)
+        idx = {"train_idx": np.arange(5), "test_idx": np.arange(5, 7)}
+        cache.run("split", {}, ["a"], lambda: idx, save_arrays, load_arrays)
+        loaded, _ = cache.run("split", {}, ["a"], lambda: None, save_arrays, load_arrays)
+        assert np.array_equal(loaded["test_idx"], idx["test_idx"])
+
+    assert stage_key("xgb", {"a": 1, "b": 2}) == stage_key("xgb", {"b": 2, "a": 1})
+    assert stage_key("xgb", {"a": 1}, ["x"]) != stage_key("xgb", {"a": 1}, ["y"])
+
+
+if __name__ == "__main__":
+    test_only_changed_stages_recompute()
+    test_arrays_roundtrip_and_keys_are_stable()
+    print("\n🎉 All pipeline cache tests passed!")
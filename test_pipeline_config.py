@@ -0,0 +1,47 @@
+import subprocess
+import sys
+
+import pytest
+
+from fraud_pipeline import PipelineArtifacts, PipelineConfig, create_pipeline_config
+from fraud_pipeline.config import XGB_PARAMS
+
+
+def test_config_validates_models_and_mode():
+    with pytest.raises(ValueError):
+        PipelineConfig(models=("iso",))
+    with pytest.raises(ValueError):
+        PipelineConfig(models=("xgb", "lstm"))
+    with pytest.raises(ValueError):
+        PipelineConfig(training_mode="turbo")
+
+
+def test_param_overrides_merge_with_defaults():
+    config = PipelineConfig(xgb_params={"max_depth": 3})
+    assert config.xgb_params["max_depth"] == 3
+    assert config.xgb_params["n_estimators"] == XGB_PARAMS["n_estimators"]
+
+
+def test_config_from_environment(monkeypatch):
+    monkeypatch.setenv("PIPELINE_MODELS", "xgb")
+    monkeypatch.setenv("PIPELINE_TRAINING_MODE", "fast")
+    config = create_pipeline_config(explainer=False)
+    assert config.models == ("xgb",)
+    assert config.training_mode == "fast"
+    assert config.explainer is False
+
+
+def test_artifacts_without_iso():
+    artifacts = PipelineArtifacts(model=None, scaler=None, explainer=None, iso=None,
+                                  threshold=0.5, X_test=None, y_test=None)
+    assert artifacts.iso_meta is None
+    assert artifacts.stage_keys == {}
+
+
+def test_import_does_not_load_training_stack():
+    code = (
+        "import sys, fraud_pipeline; "
+        "print(sorted(m for m in ('fraud_pipeline.training', 'shap', 'matplotlib', 'kagglehub') if m in sys.modules))"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert out.strip() == "[]"
@@ -0,0 +1,116 @@
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from fraud_rules import RuleEngine
+import pytest
+
+from result_cache import IdempotencyConflict, ResultCache, payload_hash
+
+TXN = {"Time": 10.0, "Amount": 99.5, "V1": -1.2}
+
+
+def test_key_modes():
+    assert ResultCache("key").key_for(TXN) is None
+    assert ResultCache("key").key_for(TXN, "abc") == "key:abc"
+
+    cache = ResultCache("payload")
+    # Field order doesn't matter, model and rules versions do
+    same = cache.key_for(dict(reversed(list(TXN.items()))), None, "m1", "r1")
+    assert cache.key_for(TXN, None, "m1", "r1") == same
+    assert cache.key_for(TXN, None, "m1", "r2") != same
+    assert cache.key_for(TXN, None, "m2", "r1") != same
+
+
+def test_lru_and_ttl():
+    cache = ResultCache(max_entries=2, ttl_sec=0.05)
+    cache.put("a", {"n": 1})
+    cache.put("b", {"n": 2})
+    cache.get("a")                  # "b" is now least recently used
+    cache.put("c", {"n": 3})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"n": 1}
+
+    time.sleep(0.06)
+    assert cache.get("a") is None
+    assert cache.evictions == 2
+
+
+def test_concurrent_duplicates_score_once():
+    cache = ResultCache()
+    calls = []
+
+    async def score():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"txn_id": "txn_1"}
+
+    async def fire():
+        return await asyncio.gather(*[cache.aget_or_compute("key:k", score) for _ in range(5)])
+
+    results = asyncio.run(fire())
+    assert len(calls) == 1
+    assert [cached for _, cached in results].count(False) == 1
+    assert {r["txn_id"] for r, _ in results} == {"txn_1"}
+
+
+def test_failed_score_is_not_cached():
+    cache = ResultCache()
+
+    async def fail():
+        raise RuntimeError("db down")
+
+    async def run():
+        try:
+            await cache.aget_or_compute("key:k", fail)
+        except RuntimeError:
+            pass
+        return await cache.aget_or_compute("key:k", lambda: asyncio.sleep(0, {"txn_id": "txn_2"}))
+
+    assert asyncio.run(run()) == ({"txn_id": "txn_2"}, False)
+
+
+def test_reused_key_with_other_payload_conflicts():
+    cache = ResultCache()
+    original = payload_hash(TXN)
+    assert payload_hash(dict(reversed(list(TXN.items())))) == original
+    cache.put("key:k", {"txn_id": "txn_1"}, original)
+
+    assert cache.get("key:k", original) == {"txn_id": "txn_1"}
+    with pytest.raises(IdempotencyConflict):
+        cache.get("key:k", payload_hash({**TXN, "Amount": 1.0}))
+
+    async def reuse():
+        return await cache.aget_or_compute("key:k", lambda: asyncio.sleep(0, {}), payload_hash({}))
+
+    with pytest.raises(IdempotencyConflict):
+        asyncio.run(reuse())
+
+
+def test_rules_version_changes_on_reload():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "rules.json")
+        with open(path, "w") as f:
+            json.dump({"velocity": {"enabled": True, "time_window_sec": 5, "weight": 2.5}}, f)
+        engine = RuleEngine(path)
+        before = engine.version
+
+        engine.reload_config()
+        assert engine.version == before
+
+        with open(path, "w") as f:
+            json.dump({"velocity": {"enabled": True, "time_window_sec": 3, "weight": 2.5}}, f)
+        engine.reload_config()
+        assert engine.version != before
+
+
+if __name__ == "__main__":
+    test_key_modes()
+    test_lru_and_ttl()
+    test_concurrent_duplicates_score_once()
+    test_failed_score_is_not_cached()
+    test_reused_key_with_other_payload_conflicts()
+    test_rules_version_changes_on_reload()
+    print("\n🎉 All result cache tests passed!")
@@ -0,0 +1,127 @@
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel
+
+import db
+import memory_db
+import rule_backtest
+import scoring
+from fraud_rules import FEATURE_COLUMNS, RuleEngine
+from rule_backtest import Backtester, apply_suggestions
+
+with open("src/data/test_transactions.json") as f:
+    TRANSACTIONS = json.load(f)
+
+X = np.array([[t[c] for c in FEATURE_COLUMNS] for t in TRANSACTIONS], dtype=np.float64)
+
+with open("fraud_rules.json") as f:
+    CONFIG = json.load(f)
+
+LOWER_PCA = [{"target_rule": "high_risk_pca", "parameter": "default_threshold", "proposed_value": 1.0}]
+
+
+def test_apply_suggestions_only_changes_known_parameters():
+    proposed, applied = apply_suggestions(CONFIG, LOWER_PCA + [
+        {"target_rule": "velocity", "parameter": "no_such_param", "proposed_value": 1},
+        {"target_rule": "no_such_rule", "parameter": "weight", "proposed_value": 1},
+    ])
+    assert applied == 1
+    assert proposed["high_risk_pca"]["default_threshold"] == 1.0
+    # The input config is left alone
+    assert CONFIG["high_risk_pca"]["default_threshold"] != 1.0
+
+
+class Suggestion(BaseModel):
+    target_rule: str
+    parameter: str
+    proposed_value: float
+
+
+def test_apply_suggestions_accepts_pydantic_models():
+    proposed, applied = apply_suggestions(CONFIG, [Suggestion(**LOWER_PCA[0])])
+    assert applied == 1
+    assert proposed == apply_suggestions(CONFIG, LOWER_PCA)[0]
+
+
+def test_last_txn_times_match_per_user_loop():
+    rng = np.random.default_rng(0)
+    times = rng.random(200).cumsum()
+    users = rng.choice(["a", "b", "c"], 200)
+
+    seen, expected = {}, []
+    for t, user in zip(times, users):
+        expected.append(seen.get(user, np.nan))
+        seen[user] = t
+    assert np.array_equal(rule_backtest.last_txn_times(times, users), expected, equal_nan=True)
+
+    shared = rule_backtest.last_txn_times(times)
+    assert np.isnan(shared[0]) and np.array_equal(shared[1:], times[:-1])
+
+
+def test_decisions_match_score_matrix_math():
+    rng = np.random.default_rng(1)
+    ml_scores = {"xgb": rng.random(len(X)), "iso": rng.random(len(X))}
+    backtester = Backtester(X, ml_scores)
+
+    result = backtester.evaluate(CONFIG)
+    rule_scores, _ = RuleEngine().evaluate_many(X, backtester.last_txn_time)
+    risk = scoring.blend_risk(ml_scores["xgb"], ml_scores["iso"], rule_scores)
+    assert np.allclose(result["risk"], risk)
+    assert [rule_backtest.DECISIONS[c] for c in result["decision_codes"]] == list(scoring.decide_many(risk))
+
+
+def test_compare_reports_deltas_and_labels():
+    rng = np.random.default_rng(2)
+    ml_scores = {"xgb": rng.random(len(X)), "iso": rng.random(len(X))}
+    labels = (rng.random(len(X)) < 0.1).astype(np.int8)
+    report = Backtester(X, ml_scores, labels).compare_suggestions(CONFIG, LOWER_PCA)
+
+    cur, new = report["current"], report["proposed"]
+    assert report["rows"] == len(X) and report["labeled"]
+    assert sum(cur["decisions"].values()) == sum(new["decisions"].values()) == len(X)
+    # A lower threshold can only add PCA hits, so nothing gets unflagged
+    assert new["rule_hit_rates"]["r2_high_risk_pca"] >= cur["rule_hit_rates"]["r2_high_risk_pca"]
+    assert report["unflagged"] == 0
+    assert new["flagged"] - cur["flagged"] == report["newly_flagged"]
+    assert report["delta"]["flag_rate"] == new["flag_rate"] - cur["flag_rate"]
+    assert new["recall"] >= cur["recall"]
+
+    same = Backtester(X).compare(CONFIG, CONFIG)
+    assert same["rules_only"] and same["current"]["decisions"] is None
+    assert same["newly_flagged"] == same["unflagged"] == 0
+
+
+def test_load_file_and_db():
+    df = pd.DataFrame(X, columns=FEATURE_COLUMNS).assign(user_id="u1", Class=0)
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path, parquet_path = os.path.join(tmp, "history.csv"), os.path.join(tmp, "history.parquet")
+        df.to_csv(csv_path, index=False)
+        df.to_parquet(parquet_path, index=False)
+        for path in (csv_path, parquet_path):
+            history = rule_backtest.load_file(path, limit=50)
+            assert np.allclose(history["X"], X[:50])
+            assert (history["labels"] == 0).all() and (history["user_ids"] == "u1").all()
+
+    database = memory_db.MemoryDatabase()
+    database.insert("transactions_raw", [
+        {"txn_id": f"txn_{i}", "user_id": "u1", "raw_payload": json.dumps(txn)}
+        for i, txn in enumerate(TRANSACTIONS[:10])
+    ])
+    db.init_pool(database)
+    history = rule_backtest.load_db(10)
+    assert history["X"].shape == (10, len(FEATURE_COLUMNS))
+    assert history["labels"] is None
+
+
+if __name__ == "__main__":
+    test_apply_suggestions_only_changes_known_parameters()
+    test_apply_suggestions_accepts_pydantic_models()
+    test_last_txn_times_match_per_user_loop()
+    test_decisions_match_score_matrix_math()
+    test_compare_reports_deltas_and_labels()
+    test_load_file_and_db()
+    print("\n🎉 All rule back-testing tests passed!")
@@ -0,0 +1,80 @@
+import json
+
+import numpy as np
+
+import rule_search
+from fraud_rules import FEATURE_COLUMNS, compile_rules, evaluate_plan
+from rule_backtest import apply_suggestions, last_txn_times
+from rule_search import RuleMasks, apply_overrides, search
+
+with open("src/data/test_transactions.json") as f:
+    TRANSACTIONS = json.load(f)
+
+X = np.array([[t[c] for c in FEATURE_COLUMNS] for t in TRANSACTIONS], dtype=np.float64)
+LAST = last_txn_times(X[:, 0])
+
+with open("fraud_rules.json") as f:
+    CONFIG = json.load(f)
+
+# Labels the current PCA rule only partly explains
+LABELS = (np.abs(X[:, FEATURE_COLUMNS.index("V14")]) > 4).astype(np.int8)
+
+SMALL_SPACE = {
+    "high_risk_pca": {"default_threshold": [2, 4, 5], "components": [["V14"], ["V12", "V14"]]},
+    "amount_anomaly": {"weight": [0.25, 0.5]},
+}
+
+
+def test_masks_match_evaluate_plan():
+    masks = RuleMasks(X, LAST, LABELS)
+    configs = [
+        CONFIG,
+        apply_overrides(CONFIG, [(("high_risk_pca", "components"), ["V1", "V99"]), (("velocity", "time_window_sec"), 30)]),
+        apply_overrides(CONFIG, [(("amount_anomaly", "enabled"), False), (("combo_pattern", "weight"), 3)]),
+    ]
+    for config in configs:
+        expected, _ = evaluate_plan(compile_rules(config), X, LAST)
+        assert np.array_equal(masks.rule_scores(config), expected)
+
+
+def test_coordinate_search_improves_and_emits_suggestions():
+    rng = np.random.default_rng(0)
+    masks = RuleMasks(X, LAST, LABELS, ml_risk=0.7 * rng.random(len(X)))
+    result = search(masks, CONFIG, "coordinate", space=SMALL_SPACE, workers=1)
+
+    assert result["best"] > result["baseline"]
+    assert result["best"] == masks.score(result["config"])
+
+    suggestions = rule_search.to_suggestions(result, masks, CONFIG)
+    assert suggestions
+    for s in suggestions:
+        assert set(s) == {"target_rule", "parameter", "current_value", "proposed_value", "reasoning"}
+        assert s["current_value"] == CONFIG[s["target_rule"]][s["parameter"]] != s["proposed_value"]
+    # /apply_rules turns them into the best config found
+    assert apply_suggestions(CONFIG, suggestions)[0] == result["config"]
+
+
+def test_parallel_grid_matches_serial():
+    masks = RuleMasks(X, LAST, LABELS, objective="pr_auc")
+    serial = search(masks, CONFIG, "grid", space=SMALL_SPACE, workers=1)
+    parallel = search(masks, CONFIG, "grid", space=SMALL_SPACE, workers=2)
+
+    # Grid = every combination, current values included
+    assert serial["evaluations"] == 4 * 3 * 3
+    assert parallel["best"] == serial["best"] and parallel["changes"] == serial["changes"]
+
+
+def test_grid_sample_is_capped_and_keeps_current_config():
+    params = rule_search.search_space(CONFIG)
+    candidates = rule_search._grid_candidates(params, 50, seed=1)
+    assert len(candidates) == 50
+    assert candidates[0] == ()
+    assert len(set(map(repr, candidates))) == 50
+
+
+if __name__ == "__main__":
+    test_masks_match_evaluate_plan()
+    test_coordinate_search_improves_and_emits_suggestions()
+    test_parallel_grid_matches_serial()
+    test_grid_sample_is_capped_and_keeps_current_config()
+    print("\n🎉 All rule search tests passed!")
@@ -0,0 +1,71 @@
+import io
+import json
+import time
+import warnings
+
+import numpy as np
+
+import scoring
+from fraud_rules import FEATURE_COLUMNS, RuleEngine
+from stream_scoring import NdjsonSink, StreamScorer, parse_records, windows
+
+warnings.filterwarnings("ignore")
+
+with open("src/data/test_transactions.json") as f:
+    TRANSACTIONS = json.load(f)[:100]
+
+
+def as_csv(transactions):
+    header = ["Time"] + [f"V{i}" for i in range(1, 29)] + ["Amount", "Class"]
+    lines = [",".join(header)]
+    for txn in transactions:
+        lines.append(",".join(str(txn[c]) for c in header[:-1]) + ',"0"')
+    return lines
+
+
+def test_csv_and_ndjson_parse_to_the_same_rows():
+    stats = {"bad_records": 0}
+    ndjson = [json.dumps(t) for t in TRANSACTIONS[:10]] + ["{not json", ""]
+    from_json = list(parse_records(ndjson, stats=stats))
+    from_csv = list(parse_records(as_csv(TRANSACTIONS[:10]) + ["1,2,3"], stats=stats))
+
+    assert [f for f, _ in from_json] == [f for f, _ in from_csv]
+    assert from_json[0][0] == [float(TRANSACTIONS[0][c]) for c in FEATURE_COLUMNS]
+    assert from_csv[0][1] == {"Class": 0}
+    assert stats["bad_records"] == 2
+
+
+def test_windows_are_bounded_and_flush_on_timeout():
+    assert [len(w) for w in windows(range(10), 4)] == [4, 4, 2]
+
+    def slow():
+        yield 1
+        time.sleep(0.2)
+        yield 2
+
+    # The first record is scored on its own instead of waiting for the second
+    assert list(windows(slow(), 64, max_wait=0.02)) == [[1], [2]]
+
+
+def test_stream_matches_batch_scoring():
+    components, _ = scoring.load_components()
+    engine = RuleEngine()
+    scorer = StreamScorer(components, engine, window_size=32, history=False)
+
+    out = io.StringIO()
+    summary = scorer.run(parse_records(as_csv(TRANSACTIONS)), NdjsonSink(out))
+    rows = [json.loads(line) for line in out.getvalue().splitlines()]
+
+    X = np.array([[t[c] for c in FEATURE_COLUMNS] for t in TRANSACTIONS], dtype=np.float64)
+    expected = scoring.score_matrix(X, components, engine)
+    assert summary["rows"] == len(rows) == len(TRANSACTIONS) and summary["windows"] == 4
+    assert np.allclose([r["risk_score"] for r in rows], expected["risk"])
+    assert [r["decision"] for r in rows] == list(expected["decision"])
+    assert rows[0]["txn_id"] == "stream_1" and rows[-1]["txn_id"] == f"stream_{len(TRANSACTIONS)}"
+
+
+if __name__ == "__main__":
+    test_csv_and_ndjson_parse_to_the_same_rows()
+    test_windows_are_bounded_and_flush_on_timeout()
+    test_stream_matches_batch_scoring()
+    print("\n🎉 All streaming scorer tests passed!")
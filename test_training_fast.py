@@ -0,0 +1,41 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import average_precision_score
+from sklearn.model_selection import cross_val_predict
+from xgboost import XGBClassifier
+
+from fraud_pipeline.training import best_f1_threshold, cv_predict_parallel
+
+warnings.filterwarnings("ignore")
+
+rng = np.random.default_rng(0)
+X = pd.DataFrame(rng.normal(size=(3000, 5)), columns=[f"f{i}" for i in range(5)])
+y = pd.Series((X["f0"] + 0.5 * X["f1"] + rng.normal(scale=0.5, size=len(X)) > 1.5).astype(int))
+
+
+def make_model(n_jobs=-1):
+    return XGBClassifier(n_estimators=200, max_depth=3, learning_rate=0.1, eval_metric="aucpr",
+                         tree_method="hist", random_state=42, n_jobs=n_jobs)
+
+
+def test_parallel_folds_match_cross_val_predict():
+    oof, rounds = cv_predict_parallel(make_model, X, y, cv=3)
+    expected = cross_val_predict(make_model(), X, y, cv=3, method="predict_proba")[:, 1]
+    assert rounds == [200, 200, 200]
+    assert np.allclose(oof, expected, atol=1e-6)
+
+
+def test_early_stopping_cuts_rounds_without_losing_quality():
+    oof, rounds = cv_predict_parallel(make_model, X, y, cv=3, early_stopping_rounds=10)
+    reference, _ = cv_predict_parallel(make_model, X, y, cv=3)
+    assert max(rounds) < 200
+    assert average_precision_score(y, oof) > average_precision_score(y, reference) - 0.05
+    assert 0.0 < best_f1_threshold(y, oof) < 1.0
+
+
+if __name__ == "__main__":
+    test_parallel_folds_match_cross_val_predict()
+    test_early_stopping_cuts_rounds_without_losing_quality()
+    print("\n🎉 Fast training mode tests passed!")
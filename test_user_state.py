@@ -0,0 +1,133 @@
+import time
+
+from user_state import MemoryUserStateStore, RedisUserStateStore
+
+
+class FakeRedis:
+    """Just the hash commands RedisUserStateStore uses, returning bytes like redis-py."""
+
+    def __init__(self):
+        self.hashes = {}
+        self.calls = []
+
+    def hget(self, key, field):
+        self.calls.append("hget")
+        return self.hashes.get(key, {}).get(field)
+
+    def hmget(self, key, *fields):
+        self.calls.append("hmget")
+        return [self.hashes.get(key, {}).get(f) for f in fields]
+
+    def hset(self, key, field, value):
+        self.hashes.setdefault(key, {})[field] = str(value).encode()
+
+    def hincrby(self, key, field, amount):
+        h = self.hashes.setdefault(key, {})
+        h[field] = str(int(h.get(field, 0)) + amount).encode()
+
+    def hincrbyfloat(self, key, field, amount):
+        h = self.hashes.setdefault(key, {})
+        h[field] = repr(float(h.get(field, 0)) + amount).encode()
+
+    def expire(self, key, seconds):
+        pass
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.queued = []
+
+    def __getattr__(self, name):
+        return lambda *args: self.queued.append((getattr(self.client, name), args))
+
+    def execute(self):
+        return [method(*args) for method, args in self.queued]
+
+
+def test_miss_then_seed_then_hit():
+    store = MemoryUserStateStore()
+    assert store.get("u1") is None
+    # No history in the DB is cached too, so the lookup is not repeated
+    store.seed("u1", None)
+    assert store.get("u1").last_txn_time is None
+    store.record("u1", 1000.0, 25.0)
+    assert store.get("u1").last_txn_time == 1000.0
+    assert store.misses == 1
+
+
+def test_lru_memory_cap():
+    store = MemoryUserStateStore(max_users=2)
+    store.record("a", 1.0, 1.0)
+    store.record("b", 2.0, 1.0)
+    store.get("a")                  # "b" is now least recently used
+    store.record("c", 3.0, 1.0)
+    assert len(store) == 2
+    assert store.get("b") is None
+    assert store.get("a") is not None
+
+
+def test_ttl_expiry():
+    store = MemoryUserStateStore(ttl_sec=0.01)
+    store.record("a", 1.0, 1.0)
+    time.sleep(0.02)
+    assert store.get("a") is None
+
+
+def test_rolling_window_stats():
+    store = MemoryUserStateStore(windows=(60, 3600))
+    now = 10_000.0
+    store.record("a", now - 4000, 500.0)   # outside both windows
+    store.record("a", now - 600, 100.0)    # 1 h window only
+    store.record("a", now - 10, 20.0)
+    store.record("a", now - 5, 30.0)
+    stats = store.window_stats("a", now=now)
+    assert stats[60] == {"count": 2, "amount_sum": 50.0}
+    assert stats[3600] == {"count": 3, "amount_sum": 150.0}
+
+
+def test_redis_store_miss_seed_record():
+    store = RedisUserStateStore(FakeRedis())
+    assert store.get("u1") is None
+    assert store.window_stats("u1") is None
+    store.seed("u1", None)
+    assert store.get("u1").last_txn_time is None
+    store.record("u1", 1000.0, 25.0)
+    assert store.get("u1").last_txn_time == 1000.0
+    # Seeding never moves an existing user backwards
+    store.seed("u1", 10.0)
+    assert store.get("u1").last_txn_time == 1000.0
+
+
+def test_redis_rolling_window_counters():
+    client = FakeRedis()
+    store = RedisUserStateStore(client, windows=(60, 3600))
+    now = 10_000.0
+    store.record("a", now - 4000, 500.0)
+    store.record("a", now - 600, 100.0)
+    for i in range(50):
+        store.record("a", now - 10 + i * 0.1, 1.0)
+    stats = store.window_stats("a", now=now)
+    assert stats[60] == {"count": 50, "amount_sum": 50.0}
+    assert stats[3600] == {"count": 51, "amount_sum": 150.0}
+
+    # The scoring path is one HGET, and window reads stay fixed-size however busy the user is
+    client.calls.clear()
+    store.get("a")
+    assert client.calls == ["hget"]
+    client.calls.clear()
+    store.window_stats("a", now=now)
+    assert client.calls.count("hmget") == 2 * RedisUserStateStore.WINDOW_BUCKETS
+
+
+if __name__ == "__main__":
+    test_miss_then_seed_then_hit()
+    test_lru_memory_cap()
+    test_ttl_expiry()
+    test_rolling_window_stats()
+    test_redis_store_miss_seed_record()
+    test_redis_rolling_window_counters()
+    print("\n🎉 All user state tests passed!")
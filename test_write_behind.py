@@ -0,0 +1,60 @@
+import queue
+from datetime import datetime, timezone
+
+import db
+import memory_db
+from write_behind import WriteBehindQueue
+
+
+def make_records(n):
+    return [{
+        "txn_id": f"txn_{i}",
+        "user_id": "user_demo",
+        "device_id": "device_demo",
+        "ip": "127.0.0.1",
+        "amount": 10.0 + i,
+        "timestamp": datetime.now(timezone.utc),
+        "raw_payload": "{}",
+        "risk_score": 0.1,
+        "decision": "ALLOW",
+        "reason": "XGBoost-based scoring"
+    } for i in range(n)]
+
+
+def test_flushes_in_bulk_and_drains_on_stop():
+    database = memory_db.MemoryDatabase()
+    db.init_pool(database)
+
+    wbq = WriteBehindQueue(max_size=1000, flush_size=100, flush_interval=0.05)
+    wbq.start()
+    for record in make_records(250):
+        wbq.put(record)
+    wbq.stop()
+
+    # Everything written, in a handful of transactions instead of 250
+    assert wbq.pending() == 0
+    assert len(database.rows("decisions")) == 250
+    assert len(database.rows("transactions_raw")) == 250
+    assert database.commits == wbq.flushes <= 5
+
+
+def test_backpressure_when_full():
+    db.init_pool(memory_db.MemoryDatabase())
+
+    # Flusher not started: the queue fills up and put() must block, then time out
+    wbq = WriteBehindQueue(max_size=3, flush_size=10)
+    for record in make_records(3):
+        wbq.put(record)
+    try:
+        wbq.put(make_records(1)[0], timeout=0.01)
+        assert False, "put() should block on a full queue"
+    except queue.Full:
+        pass
+    wbq.stop()
+    assert wbq.flushed == 3
+
+
+if __name__ == "__main__":
+    test_flushes_in_bulk_and_drains_on_stop()
+    test_backpressure_when_full()
+    print("\n🎉 All write-behind tests passed!")
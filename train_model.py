@@ -1,17 +1,51 @@
+import argparse
+import os
+
 import joblib
-from financial_transaction_fraud_detection import run_full_ml_pipeline
+
+import model_bundle
+from fraud_pipeline import create_pipeline_config, run_pipeline
+from fraud_pipeline.cache import DEFAULT_CACHE_DIR
+
+parser = argparse.ArgumentParser(description="Train (or re-use cached stages of) the fraud models")
+parser.add_argument("--data", default=None, help="Local creditcard.csv (skips Kaggle Hub)")
+parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+parser.add_argument("--no-cache", action="store_true", help="Recompute every stage")
+parser.add_argument("--plot", action="store_true", help="Show the SHAP feature-importance plot")
+parser.add_argument("--fast", action="store_true", help="Parallel CV folds with early stopping")
+args = parser.parse_args()
 
 print("🚀 Starting full ML training pipeline...")
 
-# Run the complete pipeline (training + tuning + shap)
-model, scaler, explainer, X_test = run_full_ml_pipeline()
+# Run the complete pipeline (training + tuning + shap); unchanged stages come from the cache
+config = create_pipeline_config(
+    models=("xgb", "iso"),
+    cache_dir=args.cache_dir,
+    plot=args.plot,
+    **({"data_path": args.data} if args.data else {}),
+    **({"use_cache": False} if args.no_cache else {}),
+    **({"training_mode": "fast"} if args.fast else {})
+)
+artifacts = run_pipeline(config)
 
 print("✅ Training complete. Saving model artifacts...")
 
 # Save all important artifacts for API inference
-joblib.dump(model, "model.pkl")
-joblib.dump(scaler, "scaler.pkl")
-joblib.dump(explainer, "explainer.pkl")
+joblib.dump(artifacts.model, "model.pkl")
+joblib.dump(artifacts.scaler, "scaler.pkl")
+joblib.dump(artifacts.explainer, "explainer.pkl")
+joblib.dump(artifacts.iso["model"], "iso_forest_model.pkl")
+joblib.dump(artifacts.iso["scaler"], "iso_scaler.pkl")
+joblib.dump(artifacts.iso_meta, "iso_metadata.pkl")
+
+# The API loads the bundle before the pickles, so it must be re-exported too
+bundle_path = os.getenv("MODEL_BUNDLE_PATH", model_bundle.DEFAULT_BUNDLE_PATH)
+with model_bundle.artifact_lock(os.getenv("TRAIN_LOCK_PATH", "artifacts.lock")):
+    manifest = model_bundle.save_bundle(
+        bundle_path,
+        artifacts.model, artifacts.scaler, artifacts.iso["model"], artifacts.iso["scaler"], artifacts.iso_meta
+    )
 
 print("🎉 All artifacts saved successfully!")
-print("📦 Saved files: model.pkl, scaler.pkl, explainer.pkl")
+print("📦 Saved files: model.pkl, scaler.pkl, explainer.pkl, iso_forest_model.pkl, iso_scaler.pkl, iso_metadata.pkl")
+print(f"📦 Model bundle {manifest['model_version']} written to {bundle_path}/")
@@ -0,0 +1,215 @@
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+# Rolling windows (seconds) kept per user for velocity-style rules
+DEFAULT_WINDOWS = (60, 3600)
+
+
+# --------------------------------------
+# PER-USER STATE
+# --------------------------------------
+class UserState:
+    """Last transaction time plus the recent (timestamp, amount) events of one user."""
+
+    __slots__ = ("last_txn_time", "events", "touched_at")
+
+    def __init__(self, last_txn_time=None, max_events=256):
+        self.last_txn_time = last_txn_time
+        self.events = deque(maxlen=max_events)
+        self.touched_at = time.monotonic()
+
+    def window_stats(self, now, windows=DEFAULT_WINDOWS):
+        """Returns {window_sec: {"count": n, "amount_sum": s}} for events in (now - window, now]."""
+        stats = {w: {"count": 0, "amount_sum": 0.0} for w in windows}
+        for ts, amount in reversed(self.events):
+            age = now - ts
+            if age >= max(windows):
+                break
+            for w in windows:
+                if age < w:
+                    stats[w]["count"] += 1
+                    stats[w]["amount_sum"] += amount
+        return stats
+
+
+class MemoryUserStateStore:
+    """
+    In-process user-state cache keyed by user_id with LRU + TTL eviction.
+
+    Args:
+        max_users (int): Memory cap; least recently used users are evicted beyond it.
+        ttl_sec (float): Entries untouched for longer than this are dropped.
+        max_events (int): Recent events kept per user for the rolling windows.
+        windows (tuple): Rolling window sizes in seconds.
+    """
+
+    def __init__(self, max_users=100_000, ttl_sec=24 * 3600, max_events=256, windows=DEFAULT_WINDOWS):
+        self.max_users = max_users
+        self.ttl_sec = ttl_sec
+        self.max_events = max_events
+        self.windows = tuple(windows)
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._users)
+
+    def get(self, user_id):
+        """Returns the cached UserState, or None on a miss (caller warms it from the DB)."""
+        now = time.monotonic()
+        with self._lock:
+            state = self._users.get(user_id)
+            if state is not None and now - state.touched_at > self.ttl_sec:
+                del self._users[user_id]
+                self.evictions += 1
+                state = None
+            if state is None:
+                self.misses += 1
+                return None
+            self._users.move_to_end(user_id)
+            state.touched_at = now
+            self.hits += 1
+            return state
+
+    def seed(self, user_id, last_txn_time):
+        """Caches what the DB knows about a user (None = no history, also cached)."""
+        with self._lock:
+            state = self._users.get(user_id)
+            if state is None:
+                state = UserState(last_txn_time, self.max_events)
+                self._insert(user_id, state)
+            elif last_txn_time is not None and (state.last_txn_time or 0) < last_txn_time:
+                state.last_txn_time = last_txn_time
+            return state
+
+    def record(self, user_id, txn_time, amount):
+        """Registers a newly scored transaction."""
+        with self._lock:
+            state = self._users.get(user_id)
+            if state is None:
+                state = UserState(None, self.max_events)
+                self._insert(user_id, state)
+            else:
+                self._users.move_to_end(user_id)
+            state.last_txn_time = txn_time
+            state.events.append((txn_time, float(amount)))
+            state.touched_at = time.monotonic()
+
+    def window_stats(self, user_id, now=None):
+        state = self.get(user_id)
+        if state is None:
+            return None
+        return state.window_stats(time.time() if now is None else now, self.windows)
+
+    def _insert(self, user_id, state):
+        self._users[user_id] = state
+        while len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+            self.evictions += 1
+
+
+# --------------------------------------
+# REDIS-BACKED STORE (shared by several workers)
+# --------------------------------------
+class RedisUserStateStore:
+    """
+    Same interface as MemoryUserStateStore, backed by any client exposing the
+    redis-py API (hget/hset/hmget/hincrby/hincrbyfloat/expire/pipeline), so every
+    worker sees the same per-user history. Memory is capped by the server's
+    maxmemory policy plus the per-key TTL.
+
+    Rolling windows are kept as per-window counters: each window is split into
+    WINDOW_BUCKETS time buckets stored as small hashes ({"n", "amount"}) that
+    expire on their own, so get() is a single HGET and window_stats() reads a
+    fixed number of buckets no matter how active the user is. Counts are exact
+    to within one bucket (window / WINDOW_BUCKETS) at the old edge.
+    """
+
+    WINDOW_BUCKETS = 12
+
+    def __init__(self, client, ttl_sec=24 * 3600, windows=DEFAULT_WINDOWS, prefix="user_state"):
+        self.client = client
+        self.ttl_sec = int(ttl_sec)
+        self.windows = tuple(windows)
+        self.prefix = prefix
+
+    def _key(self, user_id):
+        return f"{self.prefix}:{user_id}"
+
+    def _bucket(self, window, ts):
+        return int(ts // (window / self.WINDOW_BUCKETS))
+
+    def _bucket_key(self, user_id, window, bucket):
+        return f"{self.prefix}:{user_id}:w{window}:{bucket}"
+
+    def get(self, user_id):
+        value = self.client.hget(self._key(user_id), "last_txn_time")
+        if value is None:
+            return None
+        return UserState(None if value in (b"", "") else float(value), max_events=0)
+
+    def seed(self, user_id, last_txn_time):
+        key = self._key(user_id)
+        if self.client.hget(key, "last_txn_time") is None:
+            pipe = self.client.pipeline()
+            pipe.hset(key, "last_txn_time", "" if last_txn_time is None else repr(last_txn_time))
+            pipe.expire(key, self.ttl_sec)
+            pipe.execute()
+        return self.get(user_id)
+
+    def record(self, user_id, txn_time, amount):
+        key = self._key(user_id)
+        pipe = self.client.pipeline()
+        pipe.hset(key, "last_txn_time", repr(txn_time))
+        pipe.expire(key, self.ttl_sec)
+        for w in self.windows:
+            bucket_key = self._bucket_key(user_id, w, self._bucket(w, txn_time))
+            pipe.hincrby(bucket_key, "n", 1)
+            pipe.hincrbyfloat(bucket_key, "amount", float(amount))
+            # A bucket is only read while it overlaps its window
+            pipe.expire(bucket_key, int(w + w / self.WINDOW_BUCKETS) + 1)
+        pipe.execute()
+
+    def window_stats(self, user_id, now=None):
+        if self.client.hget(self._key(user_id), "last_txn_time") is None:
+            return None
+        now = time.time() if now is None else now
+
+        pipe = self.client.pipeline()
+        for w in self.windows:
+            current = self._bucket(w, now)
+            for bucket in range(current - self.WINDOW_BUCKETS + 1, current + 1):
+                pipe.hmget(self._bucket_key(user_id, w, bucket), "n", "amount")
+        values = iter(pipe.execute())
+
+        stats = {}
+        for w in self.windows:
+            count, amount_sum = 0, 0.0
+            for _ in range(self.WINDOW_BUCKETS):
+                n, amount = next(values)
+                count += int(n or 0)
+                amount_sum += float(amount or 0.0)
+            stats[w] = {"count": count, "amount_sum": amount_sum}
+        return stats
+
+
+def create_user_state_store():
+    """Builds the store selected by USER_STATE_BACKEND (memory | redis)."""
+    backend = os.getenv("USER_STATE_BACKEND", "memory")
+    ttl_sec = float(os.getenv("USER_STATE_TTL_SEC", str(24 * 3600)))
+
+    if backend == "redis":
+        import redis
+        client = redis.Redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+        return RedisUserStateStore(client, ttl_sec=ttl_sec)
+
+    return MemoryUserStateStore(
+        max_users=int(os.getenv("USER_STATE_MAX_USERS", "100000")),
+        ttl_sec=ttl_sec
+    )
@@ -0,0 +1,151 @@
+import asyncio
+import queue
+import threading
+import time
+import traceback
+
+import psycopg2.extras
+
+import db
+
+# --------------------------------------
+# BULK INSERTS (one transaction for all three tables)
+# --------------------------------------
+def persist_records(records):
+    """
+    Writes scored transactions to transactions_raw, ml_scores and decisions
+    with one multi-row INSERT per table and a single commit.
+
+    Each record is a dict with txn_id, user_id, device_id, ip, amount,
+    timestamp, raw_payload, risk_score, decision and reason.
+    """
+    if not records:
+        return
+
+    with db.connection() as conn:
+        with conn.cursor() as cur:
+            psycopg2.extras.execute_values(cur, """
+                INSERT INTO fraud.transactions_raw
+                (txn_id, user_id, device_id, ip, amount, timestamp, raw_payload)
+                VALUES %s
+            """, [
+                (r["txn_id"], r["user_id"], r["device_id"], r["ip"], r["amount"], r["timestamp"], r["raw_payload"])
+                for r in records
+            ], page_size=len(records))
+
+            psycopg2.extras.execute_values(cur, """
+                INSERT INTO fraud.ml_scores
+                (txn_id, xgb_score, iso_score, combined_risk)
+                VALUES %s
+            """, [
+                (r["txn_id"], r["risk_score"], None, r["risk_score"])
+                for r in records
+            ], page_size=len(records))
+
+            psycopg2.extras.execute_values(cur, """
+                INSERT INTO fraud.decisions
+                (txn_id, final_risk, decision, reason)
+                VALUES %s
+            """, [
+                (r["txn_id"], r["risk_score"], r["decision"], r["reason"])
+                for r in records
+            ], page_size=len(records))
+
+
+# --------------------------------------
+# WRITE-BEHIND QUEUE
+# --------------------------------------
+class WriteBehindQueue:
+    """
+    Bounded in-memory queue of scored transactions, flushed to Postgres in bulk
+    by a background thread so DB latency stays off the request path.
+
+    Args:
+        max_size (int): Queue capacity. put() blocks when full (backpressure).
+        flush_size (int): Maximum records written per flush/transaction.
+        flush_interval (float): Seconds to wait for a batch to fill up.
+        max_retries (int): Flush attempts before a batch is dropped.
+    """
+
+    def __init__(self, max_size=10000, flush_size=500, flush_interval=0.5, max_retries=3):
+        self.queue = queue.Queue(maxsize=max_size)
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+
+        self.flushed = 0
+        self.flushes = 0
+        self.dropped = 0
+
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        """Stops the flusher after draining everything still queued."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        # Anything that slipped in after the thread exited
+        while not self.queue.empty():
+            self._flush(self._drain(None))
+
+    def put(self, record, timeout=None):
+        """Enqueues a record, blocking while the queue is full. Raises queue.Full on timeout."""
+        self.queue.put(record, timeout=timeout)
+
+    async def aput_many(self, records):
+        """Enqueues without blocking the event loop; waits in a worker thread when full."""
+        for i, record in enumerate(records):
+            try:
+                self.queue.put_nowait(record)
+            except queue.Full:
+                await asyncio.get_running_loop().run_in_executor(None, self._put_all, records[i:])
+                return
+
+    def _put_all(self, records):
+        for record in records:
+            self.queue.put(record)
+
+    def pending(self):
+        return self.queue.qsize()
+
+    def _drain(self, deadline):
+        batch = []
+        while len(batch) < self.flush_size:
+            try:
+                if deadline is None:
+                    batch.append(self.queue.get_nowait())
+                else:
+                    batch.append(self.queue.get(timeout=max(deadline - time.monotonic(), 0)))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not (self._stop.is_set() and self.queue.empty()):
+            # Stop waiting for stragglers once shutdown has begun
+            deadline = None if self._stop.is_set() else time.monotonic() + self.flush_interval
+            self._flush(self._drain(deadline))
+
+    def _flush(self, batch):
+        if not batch:
+            return
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                persist_records(batch)
+                self.flushed += len(batch)
+                self.flushes += 1
+                return
+            except Exception:
+                traceback.print_exc()
+                if attempt < self.max_retries:
+                    time.sleep(self.flush_interval * attempt)
+        self.dropped += len(batch)
+        print(f"❌ Write-behind dropped {len(batch)} records after {self.max_retries} attempts")